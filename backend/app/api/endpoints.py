@@ -1,33 +1,60 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form  # ✅ Agregado Form
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Request, Response  # ✅ Agregado Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_db, get_read_db
 from app import crud, schemas
+from app.models import ChangeOperationEnum
 from app.api import upload
-from app.services.excel_service import ExcelService
-from app.utils.response import APIResponse
+from app import server
+from app.services.excel_service import ExcelService, PREVIEW_DEFAULT_LIMIT, VALIDATION_MODES
+from app.services import excel_pipeline
+from app.services.admission import excel_admission, estimate_cost, AdmissionRejectedError
+from app.services.upload_store import upload_store, UploadNotFoundError, UploadConflictError
+from app.config import get_settings
+from app.services.analytics_service import payroll_snapshot
+from app.services.employee_cache import employee_cache
+from app.services.write_coalescer import employee_writes
+from app.services.payroll_engine import payroll_engine, PayrollRunNotFoundError, PayrollRunStateError
+from app.utils.response import APIResponse, ResponseType
+from app.utils import http_cache
+from app.utils.idempotency import IdempotentRoute
+from app.utils.sse import SSE_HEADERS
 from app.utils.logger_config import get_logger
+import asyncio
 import json  # ✅ AGREGADO
 import os
 
 logger = get_logger(__name__)
-router = APIRouter()
+settings = get_settings()
+# Los POST/PUT/DELETE aceptan el header Idempotency-Key
+router = APIRouter(route_class=IdempotentRoute)
 
 # ==================== EMPLOYEES CRUD ====================
 
 @router.get("/employees", response_model=dict)
-async def get_all_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_employees(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                            fields: Optional[str] = None, db: Session = Depends(get_read_db)):
     """
     **Obtener Lista de Empleados**
     
     Retorna lista paginada de todos los empleados registrados.
+    Incluye `ETag` (versión de los campos retornados); con un
+    `If-None-Match` vigente responde 304 sin cuerpo.
+    `change_cursor` sirve como `since` de `GET /employees/changes` para
+    sincronizar solo los cambios posteriores.
     
     **Parámetros:**
     - skip: Número de registros a saltar (paginación)
     - limit: Cantidad máxima de registros a retornar
+    - fields: Campos a retornar separados por coma (ej. `id,nombre,cargo`);
+      solo esas columnas se leen de la BD. Por defecto, todos
     
     **Retorna:**
     - HTTP 200: Lista de empleados obtenida exitosamente
+    - HTTP 304: La página no cambió
+    - HTTP 422: Campo desconocido en `fields`
     - HTTP 500: Error del servidor
     
     **Ejemplo de respuesta:**
@@ -41,62 +68,166 @@ async def get_all_employees(skip: int = 0, limit: int = 100, db: Session = Depen
             "employees": [...],
             "total": 50,
             "skip": 0,
-            "limit": 100
+            "limit": 100,
+            "change_cursor": 1234
         }
     }
 ```
     """
     try:
-        employees = crud.get_employees(db, skip=skip, limit=limit)
+        selected = schemas.parse_fields(fields, schemas.EMPLOYEE_FIELDS)
+    except ValueError as e:
+        return APIResponse.validation_error(message=str(e))
+    
+    try:
+        # Antes del listado: los cambios posteriores quedan después del cursor
+        change_cursor = crud.get_change_cursor(db)
+        employees = crud.get_employees(db, skip=skip, limit=limit, fields=selected)
         total = db.query(crud.Employee).count()
         
+        # Validación condicional antes de serializar
+        versions = http_cache.collection_version(employees, selected or schemas.EMPLOYEE_FIELDS)
+        etag = http_cache.make_etag("employees", skip, limit, total, *(selected or ()), *versions)
+        if http_cache.is_not_modified(request, etag):
+            return http_cache.not_modified(etag)
+        http_cache.apply_cache_headers(response, etag)
+        
         return APIResponse.success(
             title="Empleados Obtenidos",
             message=f"Se encontraron {len(employees)} empleados",
             data={
-                "employees": [schemas.EmployeeResponse.from_orm(emp) for emp in employees],
+                "employees": [
+                    schemas.select_fields(emp, selected) if selected else schemas.EmployeeResponse.from_orm(emp)
+                    for emp in employees
+                ],
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "change_cursor": change_cursor
             }
         )
     except Exception as e:
-        logger.error(f"Error obteniendo empleados: {e}")
+        logger.error("Error obteniendo empleados: %s", e)
         return APIResponse.server_error(
             message="Error al obtener lista de empleados",
             error=str(e)
         )
 
+# Debe declararse antes de /employees/{employee_id}
+@router.get("/employees/changes", response_model=dict)
+async def get_employee_changes(since: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    """
+    **Feed de Cambios de Empleados**
+    
+    Inserciones, actualizaciones y eliminaciones posteriores al cursor `since`,
+    en orden. Dentro de una página solo se entrega el último cambio de cada
+    empleado, con su estado actual (`employee` es null en eliminaciones).
+    Los cambios de los últimos CHANGE_FEED_SETTLE_SECONDS segundos se entregan
+    en la siguiente consulta.
+    
+    **Parámetros:**
+    - since: Cursor (`next_cursor` de la página anterior, `change_cursor` de
+      `GET /employees` o 0 para recibir todo)
+    - limit: Cantidad máxima de cambios a leer (1-CHANGE_FEED_MAX_LIMIT)
+    
+    **Retorna:**
+    - HTTP 200: Cambios obtenidos (`next_cursor`, `has_more`)
+    - HTTP 422: Parámetros inválidos
+    - HTTP 500: Error del servidor
+    """
+    if since < 0 or not 0 < limit <= settings.CHANGE_FEED_MAX_LIMIT:
+        return APIResponse.validation_error(
+            message=f"since debe ser >= 0 y limit entre 1 y {settings.CHANGE_FEED_MAX_LIMIT}"
+        )
+    
+    try:
+        changes, has_more = crud.get_employee_changes(db, since, limit, settings.CHANGE_FEED_SETTLE_SECONDS)
+        
+        # Último cambio por empleado, en el orden en que ocurrió
+        latest = {}
+        for change in changes:
+            latest.pop(change.employee_id, None)
+            latest[change.employee_id] = change
+        employees = crud.get_employees_by_ids(db, [
+            employee_id for employee_id, change in latest.items()
+            if change.operation != ChangeOperationEnum.DELETE
+        ])
+        
+        items = []
+        for employee_id, change in latest.items():
+            employee = employees.get(employee_id)
+            items.append(schemas.EmployeeChangeResponse(
+                cursor=change.id,
+                employee_id=employee_id,
+                # Eliminado más adelante: su tombstone llega en una página siguiente
+                operation=change.operation.value if employee is not None else ChangeOperationEnum.DELETE.value,
+                changed_at=change.changed_at,
+                employee=schemas.EmployeeResponse.from_orm(employee) if employee is not None else None
+            ))
+        
+        return APIResponse.success(
+            title="Cambios Obtenidos",
+            message=f"Se encontraron {len(items)} empleados con cambios",
+            data={
+                "changes": items,
+                "next_cursor": changes[-1].id if changes else since,
+                "has_more": has_more,
+                "limit": limit
+            }
+        )
+    except Exception as e:
+        logger.error("Error obteniendo cambios de empleados: %s", e)
+        return APIResponse.server_error(error=str(e))
+
 @router.get("/employees/{employee_id}", response_model=dict)
-async def get_employee(employee_id: int, db: Session = Depends(get_db)):
+async def get_employee(employee_id: int, request: Request, response: Response, fields: Optional[str] = None,
+                       db: Session = Depends(get_db)):
     """
     **Obtener Empleado por ID**
     
     Retorna los datos de un empleado específico.
+    Incluye `ETag` (versión de los campos retornados); con un
+    `If-None-Match` vigente responde 304 sin cuerpo.
     
     **Parámetros:**
     - employee_id: ID del empleado a buscar
+    - fields: Campos a retornar separados por coma (ej. `id,nombre,cargo`).
+      El empleado se lee del cache (fila completa), solo se recorta la respuesta
     
     **Retorna:**
     - HTTP 200: Empleado encontrado
+    - HTTP 304: El empleado no cambió
     - HTTP 404: Empleado no encontrado
+    - HTTP 422: Campo desconocido en `fields`
     - HTTP 500: Error del servidor
     """
     try:
-        employee = crud.get_employee(db, employee_id)
+        selected = schemas.parse_fields(fields, schemas.EMPLOYEE_FIELDS)
+    except ValueError as e:
+        return APIResponse.validation_error(message=str(e))
+    
+    try:
+        employee = crud.get_employee_cached(db, employee_id)
         if not employee:
             return APIResponse.not_found(
                 title="Empleado No Encontrado",
                 message=f"No existe empleado con ID {employee_id}"
             )
         
+        etag = http_cache.make_etag(
+            "employee", *(selected or ()), http_cache.resource_version(employee, selected or schemas.EMPLOYEE_FIELDS)
+        )
+        if http_cache.is_not_modified(request, etag):
+            return http_cache.not_modified(etag)
+        http_cache.apply_cache_headers(response, etag)
+        
         return APIResponse.success(
             title="Empleado Encontrado",
             message="Datos del empleado obtenidos exitosamente",
-            data=schemas.EmployeeResponse.from_orm(employee)
+            data=schemas.select_fields(employee, selected) if selected else schemas.EmployeeResponse.from_orm(employee)
         )
     except Exception as e:
-        logger.error(f"Error obteniendo empleado {employee_id}: {e}")
+        logger.error("Error obteniendo empleado %s: %s", employee_id, e)
         return APIResponse.server_error(error=str(e))
 
 @router.post("/employees", response_model=dict)
@@ -104,7 +235,9 @@ async def create_employee(employee: schemas.EmployeeCreate, db: Session = Depend
     """
     **Crear Nuevo Empleado**
     
-    Crea un nuevo registro de empleado en la base de datos.
+    Crea un nuevo registro de empleado en la base de datos. Con el header
+    `Idempotency-Key` un reintento con la misma clave retorna la respuesta
+    original (header `Idempotent-Replayed: true`) sin crear otro empleado.
     
     **Body:**
 ```json
@@ -117,13 +250,19 @@ async def create_employee(employee: schemas.EmployeeCreate, db: Session = Depend
     }
 ```
     
+    Con EMPLOYEE_WRITE_COALESCING las altas concurrentes se agrupan y se
+    confirman juntas (hasta WRITE_COALESCE_MAX_DELAY_MS de espera adicional).
+    
     **Retorna:**
     - HTTP 201: Empleado creado exitosamente
     - HTTP 422: Error de validación
     - HTTP 500: Error del servidor
     """
     try:
-        new_employee = crud.create_employee(db, employee)
+        if settings.EMPLOYEE_WRITE_COALESCING:
+            new_employee = await employee_writes.create(employee)
+        else:
+            new_employee = crud.create_employee(db, employee)
         return APIResponse.success(
             title="Empleado Creado",
             message=f"Empleado {new_employee.nombre} creado exitosamente",
@@ -131,7 +270,7 @@ async def create_employee(employee: schemas.EmployeeCreate, db: Session = Depend
             status_code=201
         )
     except Exception as e:
-        logger.error(f"Error creando empleado: {e}")
+        logger.error("Error creando empleado: %s", e)
         return APIResponse.server_error(error=str(e))
 
 @router.put("/employees/{employee_id}", response_model=dict)
@@ -162,7 +301,53 @@ async def update_employee(employee_id: int, employee: schemas.EmployeeUpdate, db
             data=schemas.EmployeeResponse.from_orm(updated_employee)
         )
     except Exception as e:
-        logger.error(f"Error actualizando empleado {employee_id}: {e}")
+        logger.error("Error actualizando empleado %s: %s", employee_id, e)
+        return APIResponse.server_error(error=str(e))
+
+@router.patch("/employees/{employee_id}", response_model=dict)
+async def patch_employee(employee_id: int, employee: schemas.EmployeePatch, db: Session = Depends(get_db)):
+    """
+    **Actualizar Empleado Parcialmente**
+    
+    Actualiza solo los campos enviados (un único UPDATE; los campos omitidos
+    o en null no cambian).
+    
+    **Body (ejemplo):**
+```json
+    {
+        "sueldo": 5500.00
+    }
+```
+    
+    **Parámetros:**
+    - employee_id: ID del empleado a actualizar
+    
+    **Retorna:**
+    - HTTP 200: Empleado actualizado
+    - HTTP 404: Empleado no encontrado
+    - HTTP 422: Body sin campos para actualizar
+    - HTTP 500: Error del servidor
+    """
+    changes = employee.dict(exclude_none=True)
+    if not changes:
+        return APIResponse.validation_error(
+            message="Debe enviar al menos un campo para actualizar"
+        )
+    
+    try:
+        updated_employee = crud.patch_employee(db, employee_id, changes)
+        if not updated_employee:
+            return APIResponse.not_found(
+                message=f"No existe empleado con ID {employee_id}"
+            )
+        
+        return APIResponse.success(
+            title="Empleado Actualizado",
+            message=f"Empleado {updated_employee.nombre} actualizado exitosamente",
+            data=schemas.EmployeeResponse.from_orm(updated_employee)
+        )
+    except Exception as e:
+        logger.error("Error actualizando empleado %s: %s", employee_id, e)
         return APIResponse.server_error(error=str(e))
 
 @router.delete("/employees/{employee_id}", response_model=dict)
@@ -192,13 +377,17 @@ async def delete_employee(employee_id: int, db: Session = Depends(get_db)):
             message=f"Empleado con ID {employee_id} eliminado exitosamente"
         )
     except Exception as e:
-        logger.error(f"Error eliminando empleado {employee_id}: {e}")
+        logger.error("Error eliminando empleado %s: %s", employee_id, e)
         return APIResponse.server_error(error=str(e))
 
 # ==================== EXCEL OPERATIONS ====================
 
 @router.post("/excel/validate", response_model=dict)
-async def validate_excel(file: UploadFile = File(...)):
+async def validate_excel(
+    file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),
+    mode: str = "full"
+):
     """
     **Validar Archivo Excel**
     
@@ -206,26 +395,55 @@ async def validate_excel(file: UploadFile = File(...)):
     Verifica columnas requeridas y formato de datos.
     
     **Archivo:**
-    - Formato: .xlsx o .xls
+    - Formato: .xlsx, .xls, .csv o .parquet (CSV y Parquet tienen una sola hoja, "Hoja1")
     - Columnas requeridas: nombre, edad, sexo, cargo, sueldo
     
+    **Parámetros:**
+    - file: Archivo Excel (opcional si se envía upload_id)
+    - upload_id: ID de un archivo ya subido (ver /uploads)
+    - mode: `full` (por defecto) valida todas las filas; `headers` lee solo la
+      fila de encabezado de cada hoja y responde en milisegundos
+    
+    La validación `full` pasa por el control de admisión por memoria: espera
+    en cola si no cabe en EXCEL_MEMORY_BUDGET_MB y responde 429 con
+    `Retry-After` si la cola está llena o la espera se agota.
+    
     **Retorna:**
     - HTTP 200: Validación completada
     - HTTP 400: Archivo inválido
     - HTTP 422: Error de formato
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
     """
     try:
         # Validar extensión
-        if not file.filename.endswith(('.xlsx', '.xls')):
+        if file is not None and os.path.splitext(file.filename)[1].lower() not in settings.ALLOWED_EXTENSIONS:
             return APIResponse.validation_error(
-                message="Solo se permiten archivos Excel (.xlsx, .xls)"
+                message=f"Formatos permitidos: {', '.join(sorted(settings.ALLOWED_EXTENSIONS))}"
             )
         
-        # Leer contenido
-        content = await file.read()
+        if mode not in VALIDATION_MODES:
+            return APIResponse.validation_error(
+                message=f"Modo de validación inválido: {mode}",
+                error=f"Modos permitidos: {', '.join(VALIDATION_MODES)}"
+            )
         
-        # Procesar y validar
-        result = ExcelService.process_excel_file(content)
+        # Guardar en disco (o resolver el upload_id); el archivo se lee mapeado en memoria
+        resolved = await upload.resolve_upload(file, upload_id)
+        if resolved is None:
+            return APIResponse.validation_error(
+                message="Debe enviar el archivo o un upload_id"
+            )
+        upload_id = resolved[0]
+        
+        # Procesar y validar (en un hilo, con la memoria estimada reservada)
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        if mode == "headers":
+            result = await asyncio.to_thread(ExcelService.validate_file, path, mode)
+        else:
+            cost = await asyncio.to_thread(estimate_cost, path)
+            async with excel_admission.reserve(cost, "validate"):
+                result = await asyncio.to_thread(ExcelService.validate_file, path, mode)
+        result["upload_id"] = upload_id
         
         if len(result['invalid_sheets']) > 0:
             return APIResponse.warning(
@@ -240,8 +458,21 @@ async def validate_excel(file: UploadFile = File(...)):
             data=result
         )
         
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
     except Exception as e:
-        logger.error(f"Error validando Excel: {e}")
+        logger.error("Error validando Excel: %s", e)
         return APIResponse.error(
             title="Error de Validación",
             message="No se pudo validar el archivo Excel",
@@ -268,21 +499,32 @@ async def get_sheets():
 
 @router.post("/excel/preview", response_model=dict)
 async def preview_excel_data(
-    file: UploadFile = File(...),
-    sheets: str = Form(...)  # ✅ Cambiar a Form y recibir como string
+    file: Optional[UploadFile] = File(None),
+    sheets: str = Form(...),  # ✅ Cambiar a Form y recibir como string
+    upload_id: Optional[str] = Form(None),
+    offset: int = Form(0),
+    limit: int = Form(PREVIEW_DEFAULT_LIMIT)
 ):
     """
     **Preview de Datos**
     
     Muestra una vista previa de los datos de las hojas seleccionadas.
+    Solo se leen las filas de la ventana solicitada; el total de filas se obtiene
+    de la dimensión de la hoja. El archivo queda guardado temporalmente y cada
+    preview incluye su `upload_id` para pedir más páginas sin volver a subirlo.
     
     **Parámetros:**
-    - file: Archivo Excel
+    - file: Archivo Excel (opcional si se envía upload_id)
+    - upload_id: ID de un archivo ya subido (opcional si se envía file)
     - sheets: JSON string con array de nombres de hojas ["Hoja1", "Hoja2"]
+    - offset: Primera fila de datos a retornar (por hoja, desde 0)
+    - limit: Cantidad máxima de filas por hoja
     
     **Retorna:**
     - HTTP 200: Preview generado
     - HTTP 400: Error en parámetros
+    - HTTP 404: upload_id inexistente o expirado
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
     """
     try:
         # Parsear el JSON string a lista
@@ -293,11 +535,26 @@ async def preview_excel_data(
                 message="El parámetro 'sheets' debe ser un array JSON"
             )
         
-        # Leer contenido del archivo
-        content = await file.read()
+        if offset < 0 or not 0 < limit <= settings.PREVIEW_MAX_LIMIT:
+            return APIResponse.validation_error(
+                message=f"offset debe ser >= 0 y limit entre 1 y {settings.PREVIEW_MAX_LIMIT}"
+            )
+        
+        # Guardar el archivo para poder paginar sin volver a subirlo
+        resolved = await upload.resolve_upload(file, upload_id)
+        if resolved is None:
+            return APIResponse.validation_error(
+                message="Debe enviar el archivo o un upload_id"
+            )
+        upload_id = resolved[0]
         
         # Generar preview
-        previews = ExcelService.get_preview_data(content, selected_sheets)
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        cost = await asyncio.to_thread(estimate_cost, path, selected_sheets, offset, limit)
+        async with excel_admission.reserve(cost, "preview"):
+            previews = await asyncio.to_thread(ExcelService.get_preview_data, path, selected_sheets, offset, limit)
+        for preview in previews:
+            preview["upload_id"] = upload_id
         
         total_rows = sum(p['total_rows'] for p in previews)
         
@@ -311,33 +568,121 @@ async def preview_excel_data(
         return APIResponse.validation_error(
             message="Formato JSON inválido en el parámetro 'sheets'"
         )
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
+    except Exception as e:
+        logger.error("Error generando preview: %s", e)
+        return APIResponse.error(
+            title="Error de Preview",
+            message="Error al generar preview",
+            error=str(e)
+        )
+
+@router.get("/excel/preview/{upload_id}", response_model=dict)
+async def preview_excel_page(upload_id: str, sheet: str, offset: int = 0, limit: int = PREVIEW_DEFAULT_LIMIT):
+    """
+    **Página de Preview**
+    
+    Retorna una página de filas de una hoja de un archivo ya subido
+    (ver `upload_id` en la respuesta de `POST /excel/preview`).
+    
+    **Parámetros:**
+    - upload_id: ID del archivo subido
+    - sheet: Nombre de la hoja
+    - offset: Primera fila de datos a retornar (desde 0)
+    - limit: Cantidad máxima de filas
+    
+    **Retorna:**
+    - HTTP 200: Página generada
+    - HTTP 404: upload_id u hoja inexistente
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
+    """
+    if offset < 0 or not 0 < limit <= settings.PREVIEW_MAX_LIMIT:
+        return APIResponse.validation_error(
+            message=f"offset debe ser >= 0 y limit entre 1 y {settings.PREVIEW_MAX_LIMIT}"
+        )
+    
+    try:
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        cost = await asyncio.to_thread(estimate_cost, path, [sheet], offset, limit)
+        async with excel_admission.reserve(cost, "preview"):
+            previews = await asyncio.to_thread(ExcelService.get_preview_data, path, [sheet], offset, limit)
+        if not previews:
+            return APIResponse.not_found(
+                title="Hoja No Encontrada",
+                message=f"La hoja '{sheet}' no existe en el archivo"
+            )
+        
+        preview = previews[0]
+        preview["upload_id"] = upload_id
+        return APIResponse.success(
+            title="Preview Generado",
+            message=f"Filas {offset + 1} a {offset + len(preview['data'])} de {preview['total_rows']}",
+            data=preview
+        )
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
     except Exception as e:
-        logger.error(f"Error generando preview: {e}")
+        logger.error("Error generando preview: %s", e)
         return APIResponse.error(
+            title="Error de Preview",
             message="Error al generar preview",
             error=str(e)
         )
 
 @router.post("/excel/import", response_model=dict)
 async def import_excel_data(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
     sheets: str = Form(...),  # ✅ Cambiar a Form y recibir como string
+    upload_id: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     """
     **Importar Datos desde Excel**
     
-    Importa los datos de las hojas seleccionadas a la base de datos.
+    Importa los datos de las hojas seleccionadas a la base de datos en una
+    sola transacción (un savepoint por hoja). Con IMPORT_TRANSACTION_POLICY=
+    best_effort las hojas que fallan se descartan solas y se listan en
+    `failed_sheets`; con all_or_nothing (por defecto) no se importa nada.
+    Con el header `Idempotency-Key` un reintento con la misma clave retorna
+    la respuesta de la importación original (o espera a que termine si sigue
+    en curso) en lugar de importar de nuevo.
     
     **Parámetros:**
-    - file: Archivo Excel
+    - file: Archivo Excel (opcional si se envía upload_id)
+    - upload_id: ID de un archivo ya subido (ver /uploads)
     - sheets: JSON string con array de nombres de hojas
     
     **Retorna:**
     - HTTP 201: Datos importados exitosamente
     - HTTP 400: Error en importación
+    - HTTP 404: upload_id inexistente o expirado
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
     - HTTP 500: Error del servidor
     """
+    filename = file.filename if file is not None else None
     try:
         # Parsear el JSON string a lista
         selected_sheets = json.loads(sheets)
@@ -347,39 +692,45 @@ async def import_excel_data(
                 message="El parámetro 'sheets' debe ser un array JSON"
             )
         
-        content = await file.read()
-        filename = file.filename
+        resolved = await upload.resolve_upload(file, upload_id)
+        if resolved is None:
+            return APIResponse.validation_error(
+                message="Debe enviar el archivo o un upload_id"
+            )
+        upload_id, meta = resolved
+        filename = meta["filename"]
         
-        # Preparar datos
-        data_to_import = ExcelService.prepare_data_for_import(content, selected_sheets)
+        # Importar con la memoria estimada reservada (control de admisión)
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        cost = await asyncio.to_thread(estimate_cost, path, selected_sheets)
+        async with excel_admission.reserve(cost, "import"):
+            summary = await asyncio.to_thread(excel_pipeline.run_import, db, path, selected_sheets, filename)
         
-        if not data_to_import:
+        failed = [sheet["sheet_name"] for sheet in summary.get("failed_sheets", [])]
+        if not summary["imported_rows"]:
+            if failed:
+                return APIResponse.error(
+                    title="Error de Importación",
+                    message=f"Ninguna hoja se pudo importar: {', '.join(failed)}",
+                    error="; ".join(sheet["error"] for sheet in summary["failed_sheets"])
+                )
             return APIResponse.error(
                 title="Sin Datos",
                 message="No hay datos para importar en las hojas seleccionadas"
             )
         
-        # Importar en bulk
-        imported_count = crud.create_employees_bulk(db, data_to_import)
-        
-        # Registrar importación
-        for sheet in selected_sheets:
-            crud.create_import_record(
-                db, 
-                sheet_name=sheet,
-                rows=imported_count,
-                filename=filename,
-                status="success"
+        if failed:
+            return APIResponse.success(
+                title="Importación Parcial",
+                message=f"Se importaron {summary['sheets_processed']} hojas; descartadas: {', '.join(failed)}",
+                data=summary,
+                status_code=201
             )
         
         return APIResponse.success(
             title="Importación Exitosa",
             message=f"Los datos fueron cargados correctamente a la base de datos",
-            data={
-                "imported_rows": imported_count,
-                "sheets_processed": len(selected_sheets),
-                "filename": filename
-            },
+            data=summary,
             status_code=201
         )
         
@@ -387,31 +738,291 @@ async def import_excel_data(
         return APIResponse.validation_error(
             message="Formato JSON inválido en el parámetro 'sheets'"
         )
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
     except Exception as e:
-        logger.error(f"Error importando datos: {e}")
-        
-        # Registrar error
-        try:
-            crud.create_error_record(
-                db,
-                sheet_name="ALL",
-                error_type="IMPORT_ERROR",
-                error_msg=str(e),
-                filename=file.filename
+        logger.error("Error importando datos: %s", e)
+        
+        # Registrar la importación fallida y su error
+        excel_pipeline.record_import_failure(db, filename or upload_id, e)
+        
+        return APIResponse.server_error(
+            title="Error de Importación",
+            message="Error al importar datos a la base de datos",
+            error=str(e)
+        )
+
+@router.get("/excel/validate/stream")
+async def validate_excel_stream(upload_id: str):
+    """
+    **Validar Archivo con Progreso (SSE)**
+    
+    Validación completa de un archivo ya subido, transmitida como
+    Server-Sent Events (`text/event-stream`, compatible con EventSource):
+    - `started`: hojas y filas totales estimadas
+    - `sheet_started`: hoja leída (filas)
+    - `progress`: cada 5000 filas (filas validadas, errores acumulados, % y `eta_seconds`)
+    - `sheet_done`: resultado de la hoja apenas termina (hasta 100 errores y `error_count`)
+    - `done`: resultado completo (igual a `POST /excel/validate`) o `error`
+    
+    **Parámetros:**
+    - upload_id: ID de un archivo ya subido (ver /uploads o /excel/validate?mode=headers)
+    
+    **Retorna:**
+    - HTTP 200: Stream de eventos
+    - HTTP 404: upload_id inexistente o expirado
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
+    """
+    try:
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        cost = await asyncio.to_thread(estimate_cost, path)
+        reservation = await excel_admission.acquire(cost, "validate")
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
+    except Exception as e:
+        logger.error("Error validando Excel: %s", e)
+        return APIResponse.error(
+            title="Error de Validación",
+            message="No se pudo validar el archivo Excel",
+            error=str(e)
+        )
+    
+    stream = excel_pipeline.stream_validation(reservation, path)
+    return StreamingResponse(stream.events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/excel/import/stream")
+async def import_excel_stream(
+    file: Optional[UploadFile] = File(None),
+    sheets: str = Form(...),
+    upload_id: Optional[str] = Form(None)
+):
+    """
+    **Importar Datos con Progreso (SSE)**
+    
+    Igual que `POST /excel/import`, pero responde con Server-Sent Events
+    mientras importa:
+    - `started`: hojas y filas totales estimadas
+    - `sheet_started`: hoja leída y transformada (filas y tiempos)
+    - `progress`: cada lote insertado (filas insertadas, % y `eta_seconds`)
+    - `sheet_done`: hoja insertada con su telemetría
+    - `sheet_failed`: hoja descartada (IMPORT_TRANSACTION_POLICY=best_effort)
+    - `done`: resumen (igual al `data` de `POST /excel/import`) o `error`
+    
+    Todas las hojas se confirman juntas al final; la importación continúa
+    aunque el cliente cierre la conexión (ver `/excel/imports`).
+    
+    **Parámetros:**
+    - file: Archivo Excel (opcional si se envía upload_id)
+    - upload_id: ID de un archivo ya subido (ver /uploads)
+    - sheets: JSON string con array de nombres de hojas
+    
+    **Retorna:**
+    - HTTP 200: Stream de eventos
+    - HTTP 404: upload_id inexistente o expirado
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
+    """
+    try:
+        selected_sheets = json.loads(sheets)
+        if not isinstance(selected_sheets, list):
+            return APIResponse.validation_error(
+                message="El parámetro 'sheets' debe ser un array JSON"
             )
-        except:
-            pass
         
+        resolved = await upload.resolve_upload(file, upload_id)
+        if resolved is None:
+            return APIResponse.validation_error(
+                message="Debe enviar el archivo o un upload_id"
+            )
+        upload_id, meta = resolved
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        cost = await asyncio.to_thread(estimate_cost, path, selected_sheets)
+        reservation = await excel_admission.acquire(cost, "import")
+    except json.JSONDecodeError:
+        return APIResponse.validation_error(
+            message="Formato JSON inválido en el parámetro 'sheets'"
+        )
+    except AdmissionRejectedError as e:
+        return upload.too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(
+            title="Archivo No Encontrado",
+            message=str(e)
+        )
+    except UploadConflictError as e:
+        return APIResponse.error(
+            title="Subida Incompleta",
+            message=str(e),
+            status_code=409
+        )
+    except Exception as e:
+        logger.error("Error importando datos: %s", e)
         return APIResponse.server_error(
             title="Error de Importación",
             message="Error al importar datos a la base de datos",
             error=str(e)
         )
+    
+    stream = excel_pipeline.stream_import(reservation, path, selected_sheets, meta["filename"])
+    return StreamingResponse(stream.events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/excel/imports", response_model=dict)
+async def get_import_history(
+    skip: int = 0,
+    limit: int = 100,
+    file_name: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    **Historial de Importaciones**
+    
+    Retorna las importaciones más recientes primero. Los filtros por fecha y
+    nombre de archivo usan los índices de `import_date` y `(file_name, import_date)`.
+    
+    **Parámetros:**
+    - file_name / sheet_name / status: Coincidencia exacta
+    - date_from / date_to: Rango de `import_date` (ISO 8601, date_to excluido)
+    - skip / limit: Paginación
+    
+    **Retorna:**
+    - HTTP 200: Historial obtenido (`has_more` indica si hay otra página)
+    - HTTP 500: Error del servidor
+    """
+    try:
+        records = crud.get_import_records(
+            db, skip=skip, limit=limit + 1, file_name=file_name, sheet_name=sheet_name,
+            status=status, date_from=date_from, date_to=date_to
+        )
+        return APIResponse.success(
+            title="Historial de Importaciones",
+            message=f"Se encontraron {min(len(records), limit)} importaciones",
+            data={
+                "imports": [schemas.DataImportedResponse.from_orm(record) for record in records[:limit]],
+                "has_more": len(records) > limit,
+                "skip": skip,
+                "limit": limit
+            }
+        )
+    except Exception as e:
+        logger.error("Error obteniendo historial de importaciones: %s", e)
+        return APIResponse.server_error(error=str(e))
+
+@router.get("/excel/imports/performance", response_model=dict)
+async def get_import_performance(
+    file_name: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    **Rendimiento de Importaciones**
+    
+    Telemetría de las hojas importadas agregada por día: filas, tiempo
+    promedio por etapa (lectura, validación, transformación, inserción),
+    filas/s y pico de memoria. El detalle por hoja está en `/excel/imports`.
+    
+    **Parámetros:**
+    - file_name: Coincidencia exacta
+    - date_from / date_to: Rango de `import_date` (ISO 8601, date_to excluido)
+    
+    **Retorna:**
+    - HTTP 200: Serie diaria obtenida
+    - HTTP 500: Error del servidor
+    """
+    try:
+        days = crud.get_import_performance(db, file_name=file_name, date_from=date_from, date_to=date_to)
+        return APIResponse.success(
+            title="Rendimiento de Importaciones",
+            message=f"Telemetría de {len(days)} días",
+            data={"days": days}
+        )
+    except Exception as e:
+        logger.error("Error obteniendo rendimiento de importaciones: %s", e)
+        return APIResponse.server_error(error=str(e))
+
+@router.get("/excel/imports/{import_id}/errors", response_model=dict)
+async def get_import_errors(
+    import_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    sheet_name: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    **Errores de una Importación**
+    
+    Retorna el detalle de errores de la importación (índice `(import_id, sheet_name)`).
+    `error_count` es el total registrado; el detalle más antiguo que
+    IMPORT_ERROR_RETENTION_DAYS lo elimina la tarea de retención.
+    
+    **Parámetros:**
+    - sheet_name: Coincidencia exacta
+    - date_from / date_to: Rango de `error_date` (ISO 8601, date_to excluido)
+    - skip / limit: Paginación
+    
+    **Retorna:**
+    - HTTP 200: Errores obtenidos
+    - HTTP 404: Importación no encontrada
+    - HTTP 500: Error del servidor
+    """
+    try:
+        record = crud.get_import_record(db, import_id)
+        if not record:
+            return APIResponse.not_found(
+                title="Importación No Encontrada",
+                message=f"No existe importación con ID {import_id}"
+            )
+        errors = crud.get_import_errors(
+            db, import_id, skip=skip, limit=limit + 1, sheet_name=sheet_name,
+            date_from=date_from, date_to=date_to
+        )
+        return APIResponse.success(
+            title="Errores de Importación",
+            message=f"Se encontraron {min(len(errors), limit)} errores",
+            data={
+                "import": schemas.DataImportedResponse.from_orm(record),
+                "errors": [schemas.DataErrorResponse.from_orm(error) for error in errors[:limit]],
+                "error_count": record.error_count,
+                "has_more": len(errors) > limit,
+                "skip": skip,
+                "limit": limit
+            }
+        )
+    except Exception as e:
+        logger.error("Error obteniendo errores de la importación %s: %s", import_id, e)
+        return APIResponse.server_error(error=str(e))
 
 # ==================== STATISTICS ====================
 
 @router.get("/statistics", response_model=dict)
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(db: Session = Depends(get_read_db)):
     """
     **Obtener Estadísticas**
     
@@ -436,7 +1047,223 @@ async def get_statistics(db: Session = Depends(get_db)):
             data=stats
         )
     except Exception as e:
-        logger.error(f"Error obteniendo estadísticas: {e}")
+        logger.error("Error obteniendo estadísticas: %s", e)
+        return APIResponse.server_error(error=str(e))
+
+@router.get("/statistics/advanced", response_model=dict)
+async def get_advanced_statistics(
+    percentiles: str = "10,25,50,75,90",
+    bins: int = 10,
+    db: Session = Depends(get_read_db)
+):
+    """
+    **Estadísticas Avanzadas**
+    
+    Calculadas en memoria sobre un snapshot columnar (numpy) de los empleados,
+    sin consultar MySQL salvo en la carga inicial o al expirar el snapshot:
+    - Percentiles de sueldo y edad
+    - Histogramas de sueldo y edad
+    - Pivote cargo × sexo (cantidad y sueldo promedio)
+    - Brecha salarial (sueldo promedio de cada sexo respecto a Masculino)
+    
+    **Parámetros:**
+    - percentiles: Lista separada por comas (0-100), ej: "10,50,90"
+    - bins: Número de intervalos de los histogramas (1-100)
+    
+    **Retorna:**
+    - HTTP 200: Estadísticas obtenidas
+    - HTTP 422: Parámetros inválidos
+    - HTTP 500: Error del servidor
+    """
+    try:
+        requested = [float(p) for p in percentiles.split(",") if p.strip()]
+        if not requested or any(p < 0 or p > 100 for p in requested) or not 1 <= bins <= 100:
+            raise ValueError
+    except ValueError:
+        return APIResponse.validation_error(
+            message="Los percentiles deben estar entre 0 y 100 y bins entre 1 y 100"
+        )
+    
+    try:
+        payroll_snapshot.ensure_fresh(db)
+        stats = payroll_snapshot.advanced_statistics(requested, bins)
+        
+        return APIResponse.success(
+            title="Estadísticas Avanzadas Obtenidas",
+            message="Estadísticas calculadas sobre el snapshot en memoria",
+            data=stats
+        )
+    except Exception as e:
+        logger.error("Error obteniendo estadísticas avanzadas: %s", e)
+        return APIResponse.server_error(error=str(e))
+
+# ==================== PAYROLL ====================
+
+@router.post("/payroll/runs", response_model=dict)
+async def create_payroll_run(body: schemas.PayrollRunCreate, db: Session = Depends(get_db)):
+    """
+    **Ejecutar Corrida de Nómina**
+    
+    Calcula devengado, deducciones, impuesto, neto y aportes de todos los
+    empleados para el periodo y guarda una línea por empleado. El cálculo es
+    vectorizado (numpy) y las líneas se insertan en lotes.
+    
+    **Body:**
+```json
+    {
+        "periodo": "2026-10",
+        "reglas": {
+            "bonificaciones": [{"nombre": "Bono", "tasa": 0.1, "cargos": ["Gerente"]}],
+            "deducciones": [{"nombre": "Salud", "tasa": 0.04}],
+            "aportes": [{"nombre": "Salud", "tasa": 0.085}],
+            "impuesto": [{"desde": 0, "tasa": 0}, {"desde": 5000, "tasa": 0.1}]
+        }
+    }
+```
+    Sin `reglas` se usan las de PAYROLL_RULES_FILE (o las incluidas).
+    
+    **Retorna:**
+    - HTTP 201: Corrida completada (totales y tiempos por etapa)
+    - HTTP 422: Error de validación
+    - HTTP 500: Error del servidor (la corrida queda con status "failed")
+    """
+    try:
+        rules = body.reglas.dict() if body.reglas is not None else None
+        # El cálculo y el INSERT masivo tardan segundos: fuera del event loop
+        payroll_run, timings = await asyncio.to_thread(payroll_engine.run, db, body.periodo, rules)
+        return APIResponse.success(
+            title="Corrida de Nómina Completada",
+            message=f"Nómina {payroll_run.periodo} calculada para {payroll_run.total_empleados} empleados",
+            data={"run": schemas.PayrollRunResponse.from_orm(payroll_run), "timings": timings},
+            status_code=201
+        )
+    except Exception as e:
+        logger.error("Error ejecutando corrida de nómina: %s", e)
+        return APIResponse.server_error(
+            message="Error al ejecutar la corrida de nómina",
+            error=str(e)
+        )
+
+@router.post("/payroll/runs/{run_id}/recompute", response_model=dict)
+async def recompute_payroll_run(run_id: int, verify: bool = False, db: Session = Depends(get_db)):
+    """
+    **Recalcular Corrida de Nómina (incremental)**
+    
+    Recalcula solo los empleados modificados desde la marca de agua de la
+    corrida (employees.updated_at), quita las líneas de empleados eliminados y
+    ajusta los totales con las diferencias, usando las reglas de la corrida.
+    
+    **Parámetros:**
+    - verify: Comparar el resultado con un recálculo completo (líneas y totales)
+    
+    **Retorna:**
+    - HTTP 200: Corrida recalculada (resumen y, con verify, la verificación)
+    - HTTP 404: Corrida no encontrada
+    - HTTP 409: La corrida no está completada
+    - HTTP 500: Error del servidor
+    """
+    try:
+        payroll_run, summary = await asyncio.to_thread(payroll_engine.recompute, db, run_id, verify)
+        return APIResponse.success(
+            title="Corrida de Nómina Recalculada",
+            message=f"Se recalcularon {summary['recomputed']} empleados modificados",
+            data={"run": schemas.PayrollRunResponse.from_orm(payroll_run), **summary}
+        )
+    except PayrollRunNotFoundError as e:
+        return APIResponse.not_found(title="Corrida No Encontrada", message=str(e))
+    except PayrollRunStateError as e:
+        return APIResponse.error(title="Corrida No Recalculable", message=str(e), status_code=409)
+    except Exception as e:
+        logger.error("Error recalculando corrida de nómina %s: %s", run_id, e)
+        return APIResponse.server_error(
+            message="Error al recalcular la corrida de nómina",
+            error=str(e)
+        )
+
+@router.get("/payroll/runs", response_model=dict)
+async def get_payroll_runs(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    """
+    **Listar Corridas de Nómina**
+    
+    Retorna las corridas más recientes primero, con sus totales.
+    
+    **Retorna:**
+    - HTTP 200: Lista de corridas
+    - HTTP 500: Error del servidor
+    """
+    try:
+        runs = crud.get_payroll_runs(db, skip=skip, limit=limit)
+        return APIResponse.success(
+            title="Corridas de Nómina Obtenidas",
+            message=f"Se encontraron {len(runs)} corridas",
+            data={
+                "runs": [schemas.PayrollRunResponse.from_orm(run) for run in runs],
+                "skip": skip,
+                "limit": limit
+            }
+        )
+    except Exception as e:
+        logger.error("Error obteniendo corridas de nómina: %s", e)
+        return APIResponse.server_error(error=str(e))
+
+@router.get("/payroll/runs/{run_id}", response_model=dict)
+async def get_payroll_run(run_id: int, db: Session = Depends(get_read_db)):
+    """
+    **Obtener Corrida de Nómina**
+    
+    **Retorna:**
+    - HTTP 200: Corrida encontrada
+    - HTTP 404: Corrida no encontrada
+    - HTTP 500: Error del servidor
+    """
+    try:
+        payroll_run = crud.get_payroll_run(db, run_id)
+        if not payroll_run:
+            return APIResponse.not_found(
+                title="Corrida No Encontrada",
+                message=f"No existe corrida de nómina con ID {run_id}"
+            )
+        return APIResponse.success(
+            title="Corrida de Nómina Encontrada",
+            message=f"Corrida {payroll_run.periodo} ({payroll_run.status})",
+            data=schemas.PayrollRunResponse.from_orm(payroll_run)
+        )
+    except Exception as e:
+        logger.error("Error obteniendo corrida de nómina %s: %s", run_id, e)
+        return APIResponse.server_error(error=str(e))
+
+@router.get("/payroll/runs/{run_id}/lines", response_model=dict)
+async def get_payroll_lines(run_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    """
+    **Líneas de una Corrida de Nómina**
+    
+    Retorna el detalle por empleado (paginado, ordenado por employee_id).
+    
+    **Retorna:**
+    - HTTP 200: Líneas obtenidas
+    - HTTP 404: Corrida no encontrada
+    - HTTP 500: Error del servidor
+    """
+    try:
+        payroll_run = crud.get_payroll_run(db, run_id)
+        if not payroll_run:
+            return APIResponse.not_found(
+                title="Corrida No Encontrada",
+                message=f"No existe corrida de nómina con ID {run_id}"
+            )
+        lines = crud.get_payroll_lines(db, run_id, skip=skip, limit=limit)
+        return APIResponse.success(
+            title="Líneas de Nómina Obtenidas",
+            message=f"Se encontraron {len(lines)} líneas",
+            data={
+                "lines": [schemas.PayrollLineResponse.from_orm(line) for line in lines],
+                "total": payroll_run.total_empleados,
+                "skip": skip,
+                "limit": limit
+            }
+        )
+    except Exception as e:
+        logger.error("Error obteniendo líneas de la corrida %s: %s", run_id, e)
         return APIResponse.server_error(error=str(e))
 
 # ==================== SYSTEM ====================
@@ -444,21 +1271,83 @@ async def get_statistics(db: Session = Depends(get_db)):
 @router.post("/system/restart", response_model=dict)
 async def restart_container():
     """
-    **Reiniciar Contenedor**
+    **Reiniciar Workers**
     
-    Endpoint para reiniciar el contenedor de la aplicación.
+    Solicita al proceso maestro (`python -m app.server`) un reinicio escalonado:
+    cada worker se reemplaza por uno nuevo solo cuando este ya acepta conexiones,
+    por lo que el servicio no deja de responder.
     
-    **Advertencia:** Esta operación reiniciará el servicio.
+    **Advertencia:** Los requests en curso de cada worker se completan antes de detenerlo.
     
     **Retorna:**
-    - HTTP 200: Solicitud de reinicio aceptada
+    - HTTP 200: Reinicio escalonado iniciado
+    - HTTP 409: La API no se ejecuta bajo el launcher de producción
     """
-    logger.warning("⚠️ Solicitud de reinicio de contenedor recibida")
+    logger.warning("⚠️ Solicitud de reinicio de workers recibida")
+    
+    if not server.request_graceful_restart():
+        return APIResponse.error(
+            title="Reinicio No Disponible",
+            message="La API no se ejecuta bajo el launcher de producción (python -m app.server)",
+            status_code=409
+        )
     
     return APIResponse.info(
-        title="Reinicio Programado",
-        message="El contenedor se reiniciará en breve",
-        data={"action": "restart", "status": "pending"}
+        title="Reinicio en Curso",
+        message="Los workers se están reiniciando de forma escalonada",
+        data={"action": "restart", "status": "restarting"}
+    )
+
+@router.get("/system/cache", response_model=dict)
+async def get_cache_stats():
+    """
+    **Métricas del Cache de Empleados**
+    
+    Retorna tamaño, aciertos, fallos, desalojos y tasa de aciertos del cache
+    usado por `GET /employees/{id}`.
+    
+    **Retorna:**
+    - HTTP 200: Métricas obtenidas
+    """
+    return APIResponse.success(
+        title="Métricas de Cache",
+        message="Métricas del cache de empleados obtenidas",
+        data=employee_cache.stats()
+    )
+
+@router.get("/system/admission", response_model=dict)
+async def get_admission_stats():
+    """
+    **Métricas del Control de Admisión**
+    
+    Presupuesto y memoria estimada en uso, operaciones activas, profundidad
+    de la cola, tiempos de espera y rechazos (429) de `/excel/validate`,
+    `/excel/preview` y `/excel/import` en este worker.
+    
+    **Retorna:**
+    - HTTP 200: Métricas obtenidas
+    """
+    return APIResponse.success(
+        title="Métricas de Admisión",
+        message="Métricas del control de admisión obtenidas",
+        data=excel_admission.stats()
+    )
+
+@router.get("/system/writes", response_model=dict)
+async def get_write_coalescer_stats():
+    """
+    **Métricas de la Agrupación de Altas**
+    
+    Lotes escritos, empleados por lote y tiempo de escritura de las altas
+    agrupadas de `POST /employees` (EMPLOYEE_WRITE_COALESCING) en este worker.
+    
+    **Retorna:**
+    - HTTP 200: Métricas obtenidas
+    """
+    return APIResponse.success(
+        title="Métricas de Escritura",
+        message="Métricas de la agrupación de altas obtenidas",
+        data=employee_writes.stats()
     )
 
 @router.get("/system/routes", response_model=dict)
@@ -477,6 +1366,16 @@ async def get_all_routes():
             "method": "GET",
             "description": "Health check - Verifica estado del servicio"
         },
+        {
+            "path": "/health/live",
+            "method": "GET",
+            "description": "Liveness probe - Proceso activo (no consulta la BD)"
+        },
+        {
+            "path": "/health/ready",
+            "method": "GET",
+            "description": "Readiness probe - Estado de BD cacheado, pool y executor"
+        },
         {
             "path": "/api/v1/ping",
             "method": "GET",
@@ -487,6 +1386,11 @@ async def get_all_routes():
             "method": "GET",
             "description": "Obtener lista de empleados (paginado)"
         },
+        {
+            "path": "/api/v1/employees/changes",
+            "method": "GET",
+            "description": "Feed de cambios (inserciones, actualizaciones, eliminaciones) desde un cursor"
+        },
         {
             "path": "/api/v1/employees/{id}",
             "method": "GET",
@@ -502,6 +1406,11 @@ async def get_all_routes():
             "method": "PUT",
             "description": "Actualizar empleado"
         },
+        {
+            "path": "/api/v1/employees/{id}",
+            "method": "PATCH",
+            "description": "Actualizar campos de un empleado"
+        },
         {
             "path": "/api/v1/employees/{id}",
             "method": "DELETE",
@@ -510,7 +1419,7 @@ async def get_all_routes():
         {
             "path": "/api/v1/excel/validate",
             "method": "POST",
-            "description": "Validar estructura de archivo Excel"
+            "description": "Validar estructura de archivo Excel (mode=full|headers)"
         },
         {
             "path": "/api/v1/excel/sheets",
@@ -522,20 +1431,120 @@ async def get_all_routes():
             "method": "POST",
             "description": "Preview de datos de hojas seleccionadas"
         },
+        {
+            "path": "/api/v1/excel/preview/{upload_id}",
+            "method": "GET",
+            "description": "Página de preview (offset/limit) de un archivo ya subido"
+        },
         {
             "path": "/api/v1/excel/import",
             "method": "POST",
             "description": "Importar datos a base de datos"
         },
+        {
+            "path": "/api/v1/excel/validate/stream",
+            "method": "GET",
+            "description": "Validación completa con progreso por hoja y por bloque (Server-Sent Events)"
+        },
+        {
+            "path": "/api/v1/excel/import/stream",
+            "method": "POST",
+            "description": "Importación con progreso por hoja y por lote insertado (Server-Sent Events)"
+        },
+        {
+            "path": "/api/v1/excel/imports",
+            "method": "GET",
+            "description": "Historial de importaciones (filtros por archivo, hoja, estado y fechas)"
+        },
+        {
+            "path": "/api/v1/excel/imports/performance",
+            "method": "GET",
+            "description": "Telemetría de importaciones por día (tiempos por etapa, filas/s, pico de memoria)"
+        },
+        {
+            "path": "/api/v1/excel/imports/{import_id}/errors",
+            "method": "GET",
+            "description": "Errores de una importación (filtros por hoja y fechas)"
+        },
+        {
+            "path": "/api/v1/uploads",
+            "method": "POST",
+            "description": "Iniciar subida por partes (reanudable)"
+        },
+        {
+            "path": "/api/v1/uploads/{upload_id}",
+            "method": "GET",
+            "description": "Estado de una subida (bytes recibidos)"
+        },
+        {
+            "path": "/api/v1/uploads/{upload_id}/parts",
+            "method": "PUT",
+            "description": "Subir una parte en el offset indicado"
+        },
+        {
+            "path": "/api/v1/uploads/{upload_id}/complete",
+            "method": "POST",
+            "description": "Completar subida y verificar SHA-256"
+        },
+        {
+            "path": "/api/v1/uploads/{upload_id}",
+            "method": "DELETE",
+            "description": "Cancelar subida"
+        },
         {
             "path": "/api/v1/statistics",
             "method": "GET",
             "description": "Obtener estadísticas de empleados"
         },
+        {
+            "path": "/api/v1/statistics/advanced",
+            "method": "GET",
+            "description": "Percentiles, histogramas, pivote cargo×sexo y brecha salarial (en memoria)"
+        },
+        {
+            "path": "/api/v1/payroll/runs",
+            "method": "POST",
+            "description": "Ejecutar corrida de nómina (devengado a neto, vectorizado)"
+        },
+        {
+            "path": "/api/v1/payroll/runs/{run_id}/recompute",
+            "method": "POST",
+            "description": "Recalcular solo empleados modificados desde la marca de agua (verify=true compara con recálculo completo)"
+        },
+        {
+            "path": "/api/v1/payroll/runs",
+            "method": "GET",
+            "description": "Listar corridas de nómina"
+        },
+        {
+            "path": "/api/v1/payroll/runs/{run_id}",
+            "method": "GET",
+            "description": "Obtener corrida de nómina con totales"
+        },
+        {
+            "path": "/api/v1/payroll/runs/{run_id}/lines",
+            "method": "GET",
+            "description": "Líneas por empleado de una corrida (paginado)"
+        },
         {
             "path": "/api/v1/system/restart",
             "method": "POST",
-            "description": "Reiniciar contenedor"
+            "description": "Reinicio escalonado de los workers"
+        },
+        {
+            "path": "/api/v1/system/cache",
+            "method": "GET",
+            "description": "Métricas del cache de empleados (hit rate, desalojos)"
+        },
+        {
+            "path": "/api/v1/system/admission",
+            "method": "GET",
+            "description": "Control de admisión por memoria de /excel (cola, esperas, rechazos 429)"
+        },
+        {
+            "path": "/api/v1/system/writes",
+            "method": "GET",
+            "description": "Agrupación de altas de empleados (lotes, empleados por lote)"
         },
         {
             "path": "/api/v1/system/routes",
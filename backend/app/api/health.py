@@ -1,25 +1,26 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session 
-from sqlalchemy import text
-from app.database import get_db
-from app.utils.response import APIResponse
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.health_service import health_monitor
+from app.utils.response import APIResponse, ResponseType
 from app.utils.logger_config import get_logger
+from app import __version__
 from datetime import datetime
 
 logger = get_logger(__name__)
 router = APIRouter()
 
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """
     **Health Check Endpoint**
-    
+
     Verifica el estado de salud de la API y la conexión a la base de datos.
-    
+    El estado de la BD proviene del chequeo en segundo plano (no se consulta la BD en cada probe).
+
     **Retorna:**
     - HTTP 200: Servicio operativo
     - HTTP 503: Servicio no disponible
-    
+
     **Ejemplo de respuesta exitosa:**
 ```json
     {
@@ -35,36 +36,86 @@ async def health_check(db: Session = Depends(get_db)):
     }
 ```
     """
-    try:
-        # Verificar conexión a BD
-        db.execute(text("SELECT 1"))
-        db_status = "connected"
-        
-        return APIResponse.success(
-            title="Servicio Operativo",
-            message="API y base de datos funcionando correctamente",
-            data={
-                "timestamp": datetime.now().isoformat(),
-                "database": db_status,
-                "version": "1.0.0"
-            }
+    if health_monitor.db_status != "connected":
+        return JSONResponse(
+            status_code=503,
+            content=APIResponse.error(
+                title="Servicio No Disponible",
+                message="Error en la conexión con la base de datos",
+                error=health_monitor.db_error or f"database {health_monitor.db_status}",
+                status_code=503
+            )
         )
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return APIResponse.error(
-            title="Servicio No Disponible",
-            message="Error en la conexión con la base de datos",
-            error=str(e),
-            status_code=503
+
+    return APIResponse.success(
+        title="Servicio Operativo",
+        message="API y base de datos funcionando correctamente",
+        data={
+            "timestamp": datetime.now().isoformat(),
+            "database": health_monitor.db_status,
+            "last_check": health_monitor.last_check.isoformat() if health_monitor.last_check else None,
+            "version": __version__
+        }
+    )
+
+@router.get("/health/live")
+async def liveness():
+    """
+    **Liveness Probe**
+
+    Indica que el proceso está vivo y atendiendo requests. No consulta la base de datos.
+
+    **Retorna:**
+    - HTTP 200: Proceso activo
+    """
+    return APIResponse.success(
+        title="Servicio Vivo",
+        message="El proceso está activo",
+        data={"timestamp": datetime.now().isoformat()}
+    )
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    **Readiness Probe**
+
+    Indica si la instancia puede recibir tráfico. Usa el estado de BD cacheado
+    del primario y de la réplica (refrescado cada HEALTH_CHECK_INTERVAL
+    segundos), la saturación de los pools de conexiones y la profundidad de la
+    cola del executor de asyncio.to_thread.
+
+    **Retorna:**
+    - HTTP 200: Lista para recibir tráfico
+    - HTTP 503: No lista (BD o réplica caída, estado obsoleto, pool saturado o
+      cola del executor sobre READINESS_MAX_EXECUTOR_QUEUE)
+    """
+    state = health_monitor.readiness()
+
+    if not state["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content=APIResponse.format_response(
+                status_code=503,
+                type_=ResponseType.ERROR,
+                title="Servicio No Listo",
+                message=", ".join(state["reasons"]),
+                data=state
+            )
         )
 
+    return APIResponse.success(
+        title="Servicio Listo",
+        message="La instancia puede recibir tráfico",
+        data=state
+    )
+
 @router.get("/ping")
 async def ping():
     """
     **Ping Endpoint**
-    
+
     Endpoint simple para verificar que la API está respondiendo.
-    
+
     **Retorna:**
     - HTTP 200: API activa
     """
@@ -72,4 +123,4 @@ async def ping():
         title="Pong",
         message="API está activa",
         data={"timestamp": datetime.now().isoformat()}
-    )
\ No newline at end of file
+    )
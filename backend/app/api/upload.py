@@ -1,26 +1,244 @@
-from fastapi import APIRouter, UploadFile, File
-from app.utils.response import APIResponse
+from fastapi import APIRouter, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from tempfile import SpooledTemporaryFile
+from typing import Optional, Tuple, Dict, Any
+from app.config import get_settings
+from app.utils.response import APIResponse, ResponseType
 from app.utils.logger_config import get_logger
-from app.services.excel_service import ExcelService
+from app.services.admission import excel_admission, estimate_cost, AdmissionRejectedError
+from app.services.excel_service import ExcelService, VALIDATION_MODES
+from app.services.upload_store import upload_store, UploadNotFoundError, UploadConflictError
+import asyncio
 import os
 
 logger = get_logger(__name__)
+settings = get_settings()
 router = APIRouter()
 
+# Las partes se reciben en un archivo temporal que pasa a disco al superar este tamaño
+PART_SPOOL_SIZE = 1024 * 1024
+
+
+class UploadInit(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: Optional[int] = Field(None, ge=0)
+
+
+class UploadComplete(BaseModel):
+    sha256: Optional[str] = Field(None, min_length=64, max_length=64)
+
+
+async def resolve_upload(file: Optional[UploadFile], upload_id: Optional[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Guardar el archivo recibido en el UploadStore (copiando por bloques) o
+    resolver un upload_id existente; retorna (upload_id, metadatos) o None si
+    no se envió ninguno de los dos
+    El UploadStore hace I/O de disco bloqueante: se llama en un hilo.
+    """
+    if file is not None:
+        upload_id = await asyncio.to_thread(upload_store.save_file, file.file, file.filename)
+    elif not upload_id:
+        return None
+    return upload_id, await asyncio.to_thread(upload_store.get_meta, upload_id)
+
+
+def _upload_status(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "upload_id": meta["upload_id"],
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "received": meta["received"],
+        "status": meta["status"],
+        "sha256": meta.get("sha256"),
+        "part_max_size": settings.UPLOAD_PART_MAX_SIZE,
+    }
+
+
+def too_busy(e: AdmissionRejectedError) -> JSONResponse:
+    """HTTP 429 con Retry-After cuando el control de admisión rechaza el request"""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)},
+        content=APIResponse.format_response(
+            status_code=429,
+            type_=ResponseType.ERROR,
+            title="Servidor Ocupado",
+            message=str(e),
+            data={"retry_after": e.retry_after, **excel_admission.stats()}
+        )
+    )
+
+
+def _conflict(e: UploadConflictError) -> Dict[str, Any]:
+    return APIResponse.format_response(
+        status_code=409,
+        type_=ResponseType.ERROR,
+        title="Conflicto de Subida",
+        message=str(e),
+        data={"received": e.received}
+    )
+
+# ==================== SUBIDA POR PARTES ====================
+
+@router.post("/uploads", response_model=dict)
+async def create_upload(body: UploadInit):
+    """
+    **Iniciar Subida por Partes**
+    
+    Crea una subida reanudable. Luego se envían las partes en orden con
+    `PUT /uploads/{upload_id}/parts?offset=N` (cuerpo binario) y se cierra con
+    `POST /uploads/{upload_id}/complete`. El `upload_id` final sirve para
+    validar, hacer preview e importar sin volver a subir el archivo.
+    
+    **Retorna:**
+    - HTTP 201: Subida creada
+    - HTTP 422: Extensión o tamaño no permitidos
+    """
+    file_ext = os.path.splitext(body.filename)[1].lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        return APIResponse.validation_error(
+            message=f"Formatos permitidos: {', '.join(sorted(settings.ALLOWED_EXTENSIONS))}",
+            error=f"Extensión detectada: {file_ext}"
+        )
+    if body.size is not None and body.size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return APIResponse.validation_error(
+            message=f"El archivo excede el tamaño máximo permitido ({settings.CHUNKED_UPLOAD_MAX_SIZE} bytes)"
+        )
+    
+    meta = await asyncio.to_thread(upload_store.create_upload, body.filename, body.size)
+    return APIResponse.success(
+        title="Subida Iniciada",
+        message="Envíe las partes del archivo en orden",
+        data=_upload_status(meta),
+        status_code=201
+    )
+
+@router.get("/uploads/{upload_id}", response_model=dict)
+async def get_upload(upload_id: str):
+    """
+    **Estado de una Subida**
+    
+    Permite reanudar tras un corte: `received` es el offset de la próxima parte.
+    """
+    try:
+        meta = await asyncio.to_thread(upload_store.get_meta, upload_id)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(title="Subida No Encontrada", message=str(e))
+    if "status" not in meta:
+        # Archivo subido en una sola request (preview / validate)
+        meta = {**meta, "upload_id": upload_id, "received": meta["size"], "status": "complete"}
+    return APIResponse.success(
+        title="Estado de Subida",
+        message=f"{meta['received']} bytes recibidos",
+        data=_upload_status(meta)
+    )
+
+@router.put("/uploads/{upload_id}/parts", response_model=dict)
+async def upload_part(upload_id: str, offset: int, request: Request):
+    """
+    **Subir una Parte**
+    
+    El cuerpo del request son los bytes de la parte. `offset` debe coincidir con
+    los bytes ya recibidos; reenviar una parte ya recibida no tiene efecto.
+    
+    **Retorna:**
+    - HTTP 200: Parte recibida (`received` actualizado)
+    - HTTP 404: Subida inexistente o expirada
+    - HTTP 409: Offset inesperado (ver `received`) o subida ya completada
+    - HTTP 422: La parte excede UPLOAD_PART_MAX_SIZE
+    """
+    try:
+        with SpooledTemporaryFile(max_size=PART_SPOOL_SIZE) as part:
+            length = 0
+            async for chunk in request.stream():
+                length += len(chunk)
+                if length > settings.UPLOAD_PART_MAX_SIZE:
+                    return APIResponse.validation_error(
+                        message=f"La parte excede el tamaño máximo ({settings.UPLOAD_PART_MAX_SIZE} bytes)"
+                    )
+                part.write(chunk)
+            # Lock del archivo, copia y (tras reanudar en otro worker) re-hash desde disco
+            meta = await asyncio.to_thread(upload_store.write_part, upload_id, offset, part)
+        
+        return APIResponse.success(
+            title="Parte Recibida",
+            message=f"{meta['received']} bytes recibidos",
+            data=_upload_status(meta)
+        )
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(title="Subida No Encontrada", message=str(e))
+    except UploadConflictError as e:
+        return _conflict(e)
+
+@router.post("/uploads/{upload_id}/complete", response_model=dict)
+async def complete_upload(upload_id: str, body: Optional[UploadComplete] = None):
+    """
+    **Completar Subida**
+    
+    Verifica el tamaño declarado y, si se envía, el SHA-256 del archivo.
+    
+    **Retorna:**
+    - HTTP 200: Archivo listo (incluye su SHA-256)
+    - HTTP 404: Subida inexistente o expirada
+    - HTTP 409: Subida incompleta o SHA-256 distinto
+    """
+    try:
+        meta = await asyncio.to_thread(upload_store.complete_upload, upload_id, body.sha256 if body else None)
+        logger.info("📦 Subida %s completada (%s bytes)", upload_id, meta["size"], extra={"upload_id": upload_id})
+        return APIResponse.success(
+            title="Subida Completada",
+            message=f"Archivo {meta['filename']} recibido ({meta['size']} bytes)",
+            data=_upload_status(meta)
+        )
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(title="Subida No Encontrada", message=str(e))
+    except UploadConflictError as e:
+        return _conflict(e)
+
+@router.delete("/uploads/{upload_id}", response_model=dict)
+async def abort_upload(upload_id: str):
+    """
+    **Cancelar Subida**
+    
+    Elimina la subida y sus partes.
+    """
+    try:
+        await asyncio.to_thread(upload_store.delete, upload_id)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(title="Subida No Encontrada", message=str(e))
+    return APIResponse.success(
+        title="Subida Eliminada",
+        message=f"La subida {upload_id} fue eliminada"
+    )
+
+# ==================== VALIDACIÓN ====================
+
 @router.post("/validate")
-async def validate_excel(file: UploadFile = File(...)):
+async def validate_excel(
+    file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),
+    mode: str = "full"
+):
     """
     **Validar Archivo Excel**
     
     Valida la estructura y formato de un archivo Excel de nómina.
     
     **Parámetros:**
-    - file: Archivo Excel (.xlsx o .xls)
+    - file: Archivo Excel (.xlsx o .xls), CSV o Parquet; opcional si se envía upload_id
+    - upload_id: ID de un archivo ya subido (ver /uploads)
+    - mode: `full` (por defecto) o `headers` (solo columnas, sin validar filas)
+    
+    La validación completa pasa por el control de admisión por memoria (igual
+    que /excel/validate): espera en cola si no cabe en EXCEL_MEMORY_BUDGET_MB
+    y responde 429 con `Retry-After` si la cola está llena o la espera se agota.
     
     **Retorna:**
     - HTTP 200: Validación exitosa
     - HTTP 400: Archivo inválido
     - HTTP 422: Error de formato
+    - HTTP 429: Capacidad agotada (reintentar después de `Retry-After` segundos)
     - HTTP 500: Error del servidor
     
     **Ejemplo de respuesta exitosa:**
@@ -41,36 +259,54 @@ async def validate_excel(file: UploadFile = File(...)):
 ```
     """
     try:
-        # Validar extensión
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in ['.xlsx', '.xls']:
+        if mode not in VALIDATION_MODES:
             return APIResponse.validation_error(
-                message="Solo se permiten archivos Excel (.xlsx, .xls)",
-                error=f"Extensión detectada: {file_ext}"
+                message=f"Modo de validación inválido: {mode}",
+                error=f"Modos permitidos: {', '.join(VALIDATION_MODES)}"
             )
         
-        # Validar tamaño del archivo (10MB máximo)
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
+        if file is not None:
+            # Validar extensión
+            file_ext = os.path.splitext(file.filename)[1].lower()
+            if file_ext not in settings.ALLOWED_EXTENSIONS:
+                return APIResponse.validation_error(
+                    message=f"Formatos permitidos: {', '.join(sorted(settings.ALLOWED_EXTENSIONS))}",
+                    error=f"Extensión detectada: {file_ext}"
+                )
+            
+            # Validar tamaño del archivo (MAX_UPLOAD_SIZE; los mayores se suben por partes)
+            file.file.seek(0, 2)
+            file_size = file.file.tell()
+            file.file.seek(0)
+            
+            if file_size > settings.MAX_UPLOAD_SIZE:
+                return APIResponse.validation_error(
+                    message=f"El archivo excede el tamaño máximo permitido ({settings.MAX_UPLOAD_SIZE / 1024 / 1024:.0f}MB)",
+                    error=f"Tamaño del archivo: {file_size / 1024 / 1024:.2f}MB"
+                )
         
-        max_size = 10 * 1024 * 1024  # 10MB
-        if file_size > max_size:
+        # Guardar en disco (o resolver el upload_id) y validar leyendo el archivo mapeado
+        resolved = await resolve_upload(file, upload_id)
+        if resolved is None:
             return APIResponse.validation_error(
-                message=f"El archivo excede el tamaño máximo permitido (10MB)",
-                error=f"Tamaño del archivo: {file_size / 1024 / 1024:.2f}MB"
+                message="Debe enviar el archivo o un upload_id"
             )
+        upload_id, meta = resolved
         
-        # Leer contenido del archivo
-        contents = await file.read()
-        
-        # Procesar y validar con ExcelService
-        result = ExcelService.process_excel_file(contents)
+        # Procesar y validar (en un hilo, con la memoria estimada reservada)
+        path = await asyncio.to_thread(upload_store.path, upload_id)
+        if mode == "headers":
+            result = await asyncio.to_thread(ExcelService.validate_file, path, mode)
+        else:
+            cost = await asyncio.to_thread(estimate_cost, path)
+            async with excel_admission.reserve(cost, "validate"):
+                result = await asyncio.to_thread(ExcelService.validate_file, path, mode)
         
         # Agregar información del archivo al resultado
-        result['filename'] = file.filename
-        result['size'] = file_size
-        result['content_type'] = file.content_type
+        result['filename'] = meta['filename']
+        result['size'] = meta['size']
+        result['content_type'] = file.content_type if file is not None else None
+        result['upload_id'] = upload_id
         
         # Determinar tipo de respuesta según validación
         if len(result['invalid_sheets']) > 0:
@@ -86,14 +322,20 @@ async def validate_excel(file: UploadFile = File(...)):
             data=result
         )
         
+    except AdmissionRejectedError as e:
+        return too_busy(e)
+    except UploadNotFoundError as e:
+        return APIResponse.not_found(title="Archivo No Encontrado", message=str(e))
+    except UploadConflictError as e:
+        return _conflict(e)
     except ValueError as ve:
-        logger.error(f"Error de validación: {ve}")
+        logger.error("Error de validación: %s", ve)
         return APIResponse.validation_error(
             message="Error al validar el archivo",
             error=str(ve)
         )
     except Exception as e:
-        logger.error(f"Error inesperado validando archivo: {e}")
+        logger.error("Error inesperado validando archivo: %s", e)
         return APIResponse.error(
             title="Error de Validación",
             message="No se pudo validar el archivo Excel",
@@ -25,6 +25,11 @@ class Settings(BaseSettings):
     DB_PORT: int = int(os.getenv("DB_PORT", "3306"))
     DB_USER: str = os.getenv("DB_USER", "nomina_user")
     DB_NAME: str = os.getenv("DB_NAME", "nomina_db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_URL: str = os.getenv("DB_URL", "")  # URL completa del primario (reemplaza DB_HOST/DB_*; ej. sqlite:///./dev.db en pruebas)
+    DB_READ_URL: str = os.getenv("DB_READ_URL", "")  # Réplica de lectura; vacío = las lecturas van al primario
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # Tras escribir, el cliente lee del primario
     
     # Leer contraseña desde Docker secret o variable de entorno
     @property
@@ -44,14 +49,103 @@ class Settings(BaseSettings):
     
     # Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
-    ALLOWED_EXTENSIONS: set = {".xlsx", ".xls"}
-    
+    ALLOWED_EXTENSIONS: set = {".xlsx", ".xls", ".csv", ".parquet"}
+    XLSX_READER: str = os.getenv("XLSX_READER", "openpyxl")  # openpyxl | calamine (requiere python-calamine)
+    CSV_DELIMITER: str = os.getenv("CSV_DELIMITER", ",")
+    CSV_ENCODING: str = os.getenv("CSV_ENCODING", "utf-8-sig")  # utf-8-sig acepta el BOM que agrega Excel
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "")  # Vacío = directorio temporal del sistema
+    UPLOAD_TTL: float = float(os.getenv("UPLOAD_TTL", "3600"))  # Segundos que se conserva un archivo subido
+    PREVIEW_MAX_LIMIT: int = int(os.getenv("PREVIEW_MAX_LIMIT", "1000"))
+    CHUNKED_UPLOAD_MAX_SIZE: int = int(os.getenv("CHUNKED_UPLOAD_MAX_SIZE", str(500 * 1024 * 1024)))  # Tamaño máximo de una subida por partes
+    UPLOAD_PART_MAX_SIZE: int = int(os.getenv("UPLOAD_PART_MAX_SIZE", str(16 * 1024 * 1024)))  # Tamaño máximo de cada parte
+    IMPORT_INSERT_BATCH: int = int(os.getenv("IMPORT_INSERT_BATCH", "5000"))  # Empleados por flush al importar
+    IMPORT_TRANSACTION_POLICY: str = os.getenv("IMPORT_TRANSACTION_POLICY", "all_or_nothing")  # all_or_nothing | best_effort (hojas fallidas se descartan solas)
+
+    # Agrupación de altas individuales de empleados (POST /employees) en una transacción por lote
+    EMPLOYEE_WRITE_COALESCING: bool = os.getenv("EMPLOYEE_WRITE_COALESCING", "false").lower() == "true"
+    WRITE_COALESCE_MAX_BATCH: int = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "100"))  # Empleados máximos por lote
+    WRITE_COALESCE_MAX_DELAY_MS: float = float(os.getenv("WRITE_COALESCE_MAX_DELAY_MS", "5"))  # Espera máxima para juntar un lote
+
+    # Control de admisión por memoria de /excel/validate, /excel/preview y /excel/import (por worker)
+    EXCEL_MEMORY_BUDGET_MB: int = int(os.getenv("EXCEL_MEMORY_BUDGET_MB", "512"))  # Memoria estimada en uso a la vez
+    EXCEL_BYTES_PER_CELL: int = int(os.getenv("EXCEL_BYTES_PER_CELL", "200"))  # Estimación por celda (DataFrame + registros)
+    EXCEL_ADMISSION_MAX_QUEUE: int = int(os.getenv("EXCEL_ADMISSION_MAX_QUEUE", "10"))  # Requests en espera antes de responder 429
+    EXCEL_ADMISSION_TIMEOUT: float = float(os.getenv("EXCEL_ADMISSION_TIMEOUT", "30"))  # Segundos máximos en cola (luego 429)
+
+    # Header Idempotency-Key en los endpoints que modifican datos (tabla idempotency_keys, compartida por los workers)
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "86400"))  # Segundos que se conserva una respuesta
+    IDEMPOTENCY_LOCK_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "30"))  # Sin renovar, una clave en curso se considera abandonada
+    IDEMPOTENCY_HASH_MAX_BYTES: int = int(os.getenv("IDEMPOTENCY_HASH_MAX_BYTES", str(1024 * 1024)))  # Cuerpos hasta este tamaño entran en la huella
+    IDEMPOTENCY_PURGE_INTERVAL: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))  # Segundos entre limpiezas de claves vencidas
+
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_JSON: bool = os.getenv("LOG_JSON", "false").lower() == "true"
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_RATE_LIMIT: int = int(os.getenv("LOG_RATE_LIMIT", "20"))  # Mensajes por plantilla y ventana (0 = sin límite)
+    LOG_RATE_WINDOW: float = float(os.getenv("LOG_RATE_WINDOW", "10"))  # Segundos
+
+    # Health / Readiness
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))  # Segundos entre chequeos de BD
+    HEALTH_STALE_AFTER: float = float(os.getenv("HEALTH_STALE_AFTER", "30"))  # Estado de BD más antiguo = no listo
+    READINESS_MAX_POOL_SATURATION: float = float(os.getenv("READINESS_MAX_POOL_SATURATION", "0.95"))
+    READINESS_MAX_EXECUTOR_QUEUE: int = int(os.getenv("READINESS_MAX_EXECUTOR_QUEUE", "100"))  # Tareas en espera (0 = sin límite)
+    # Hilos del executor de asyncio.to_thread (Excel, nómina, tareas periódicas); 0 = default de Python
+    EXECUTOR_MAX_WORKERS: int = int(os.getenv("EXECUTOR_MAX_WORKERS", "0"))
+
+    # Startup: "standard" verifica el esquema antes de aceptar tráfico,
+    # "fast" lo hace en segundo plano junto al warm-up (readiness espera a que termine)
+    STARTUP_MODE: str = os.getenv("STARTUP_MODE", "standard")
+
+    # Analítica en memoria (/statistics/advanced)
+    ANALYTICS_MAX_AGE: float = float(os.getenv("ANALYTICS_MAX_AGE", "300"))  # Segundos antes de recargar el snapshot
+
+    # Cache de empleados (GET /employees/{id})
+    EMPLOYEE_CACHE_BACKEND: str = os.getenv("EMPLOYEE_CACHE_BACKEND", "local")  # local | none
+    EMPLOYEE_CACHE_SIZE: int = int(os.getenv("EMPLOYEE_CACHE_SIZE", "10000"))
+    EMPLOYEE_CACHE_TTL: float = float(os.getenv("EMPLOYEE_CACHE_TTL", "60"))  # Segundos (0 = sin expiración)
+
+    # Retención del historial de importaciones (tarea periódica, borra en lotes)
+    IMPORT_ERROR_RETENTION_DAYS: int = int(os.getenv("IMPORT_ERROR_RETENTION_DAYS", "90"))  # 0 = conservar siempre
+    IMPORT_HISTORY_RETENTION_DAYS: int = int(os.getenv("IMPORT_HISTORY_RETENTION_DAYS", "0"))  # 0 = conservar siempre
+    RETENTION_INTERVAL: float = float(os.getenv("RETENTION_INTERVAL", "3600"))  # Segundos entre ejecuciones
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))  # Filas por transacción
+    RETENTION_MAX_BATCHES: int = int(os.getenv("RETENTION_MAX_BATCHES", "50"))  # Lotes por ejecución (el resto queda para la siguiente)
+
+    # Feed de cambios (GET /employees/changes)
+    CHANGE_FEED_MAX_LIMIT: int = int(os.getenv("CHANGE_FEED_MAX_LIMIT", "1000"))
+    CHANGE_FEED_SETTLE_SECONDS: float = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "2"))  # Cambios más recientes se entregan en la siguiente consulta
+
+    # Corridas de nómina (POST /payroll/runs)
+    PAYROLL_RULES_FILE: str = os.getenv("PAYROLL_RULES_FILE", "")  # JSON con las reglas por defecto (vacío = reglas incluidas)
+    PAYROLL_WORKERS: int = int(os.getenv("PAYROLL_WORKERS", "1"))  # Procesos de cálculo (1 = en el proceso, 0 = según CPUs)
+    PAYROLL_CHUNK_SIZE: int = int(os.getenv("PAYROLL_CHUNK_SIZE", "250000"))  # Empleados por lote de cálculo
+    PAYROLL_PARALLEL_MIN_ROWS: int = int(os.getenv("PAYROLL_PARALLEL_MIN_ROWS", "500000"))  # Por debajo se calcula en el proceso
+    PAYROLL_INSERT_BATCH: int = int(os.getenv("PAYROLL_INSERT_BATCH", "10000"))  # Filas por INSERT masivo de payroll_lines
+    PAYROLL_WATERMARK_LAG: float = float(os.getenv("PAYROLL_WATERMARK_LAG", "5"))  # Segundos de solape al buscar cambios desde la marca de agua
+
+    # Servidor de producción (python -m app.server)
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", "0"))  # 0 = según número de CPUs
+    WORKER_MAX_REQUESTS: int = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))  # 0 = sin reciclaje
+    WORKER_MAX_REQUESTS_JITTER: int = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+    WORKER_MAX_MEMORY_MB: int = int(os.getenv("WORKER_MAX_MEMORY_MB", "1024"))  # 0 = sin límite
+    WORKER_GRACEFUL_TIMEOUT: int = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+    WORKER_BOOT_TIMEOUT: int = int(os.getenv("WORKER_BOOT_TIMEOUT", "60"))
+
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_URL:
+            return self.DB_URL
         # ✅ Codificar la contraseña para caracteres especiales
         encoded_password = quote_plus(self.DB_PASSWORD)
         return f"mysql+pymysql://{self.DB_USER}:{encoded_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
+    @property
+    def DATABASE_READ_URL(self) -> str:
+        return self.DB_READ_URL or self.DATABASE_URL
+    
     class Config:
         case_sensitive = True
 
@@ -1,67 +1,220 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Employee, DataImported, DataError
+from sqlalchemy import delete, func, update
+from app.models import Employee, EmployeeChange, ChangeOperationEnum, DataImported, DataError, PayrollRun, PayrollLine
 from app.schemas import EmployeeCreate, EmployeeUpdate
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple
+from datetime import datetime, timedelta
+from app.services.analytics_service import payroll_snapshot
+from app.services.employee_cache import employee_cache, CachedEmployee
+from app.services.cargo_registry import cargo_registry
+from app.config import get_settings
 from app.utils.logger_config import get_logger
 
 logger = get_logger(__name__)
+settings = get_settings()
+
+# Notificación de escrituras a las estructuras en memoria derivadas de employees
+def _on_employee_saved(employee: Employee) -> None:
+    employee_cache.put(employee)
+    payroll_snapshot.upsert(employee)
+
+def _on_employee_deleted(employee_id: int) -> None:
+    employee_cache.invalidate(employee_id)
+    payroll_snapshot.delete(employee_id)
+
+def _on_employees_bulk_changed() -> None:
+    payroll_snapshot.invalidate()
+
+# Registro de cambios (misma transacción que la escritura)
+def _log_change(db: Session, employee_id: int, operation: ChangeOperationEnum) -> None:
+    db.add(EmployeeChange(employee_id=employee_id, operation=operation))
 
 # Employee CRUD
 def get_employee(db: Session, employee_id: int) -> Optional[Employee]:
     """Obtener empleado por ID"""
     return db.query(Employee).filter(Employee.id == employee_id).first()
 
-def get_employees(db: Session, skip: int = 0, limit: int = 100) -> List[Employee]:
-    """Obtener lista de empleados con paginación"""
-    return db.query(Employee).offset(skip).limit(limit).all()
+def get_employee_cached(db: Session, employee_id: int) -> Optional[CachedEmployee]:
+    """Obtener empleado por ID usando el cache (read-through)"""
+    cached = employee_cache.get(employee_id)
+    if cached is None:
+        db_employee = get_employee(db, employee_id)
+        if db_employee is None:
+            return None
+        cached = employee_cache.put(db_employee)
+    return cached
+
+def get_employees(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Any]:
+    """
+    Obtener lista de empleados con paginación
+    Con `fields` solo se seleccionan esas columnas (más id y updated_at, que
+    usa el ETag) y se retornan filas en lugar de modelos.
+    """
+    if not fields:
+        return db.query(Employee).order_by(Employee.id).offset(skip).limit(limit).all()
+    columns = [getattr(Employee, name) for name in dict.fromkeys(("id", "updated_at", *fields))]
+    return db.query(*columns).order_by(Employee.id).offset(skip).limit(limit).all()
+
+def get_employees_by_ids(db: Session, employee_ids: List[int]) -> Dict[int, Employee]:
+    """Obtener empleados por ID (los inexistentes se omiten)"""
+    if not employee_ids:
+        return {}
+    return {employee.id: employee for employee in db.query(Employee).filter(Employee.id.in_(employee_ids))}
 
 def create_employee(db: Session, employee: EmployeeCreate) -> Employee:
     """Crear nuevo empleado"""
-    db_employee = Employee(**employee.dict())
+    db_employee = Employee(**employee.dict(), cargo_id=cargo_registry.get_id(employee.cargo))
     db.add(db_employee)
+    db.flush()
+    _log_change(db, db_employee.id, ChangeOperationEnum.INSERT)
     db.commit()
     db.refresh(db_employee)
-    logger.info(f"✅ Empleado creado: {db_employee.nombre} (ID: {db_employee.id})")
+    _on_employee_saved(db_employee)
+    logger.info("✅ Empleado creado: %s (ID: %s)", db_employee.nombre, db_employee.id, extra={"employee_id": db_employee.id})
     return db_employee
 
-def update_employee(db: Session, employee_id: int, employee: EmployeeUpdate) -> Optional[Employee]:
-    """Actualizar empleado existente"""
-    db_employee = get_employee(db, employee_id)
-    if db_employee:
-        for key, value in employee.dict().items():
-            setattr(db_employee, key, value)
-        db.commit()
-        db.refresh(db_employee)
-        logger.info(f"✅ Empleado actualizado: {db_employee.nombre} (ID: {db_employee.id})")
+def create_employees_batch(db: Session, employees: List[EmployeeCreate]) -> List[Employee]:
+    """
+    Crear varios empleados en una sola transacción (un flush y un commit)
+    Retorna los empleados en el mismo orden, con id y fechas asignados y
+    fuera de la sesión (el commit no los expira).
+    """
+    cargo_ids = cargo_registry.ids_for(employee.cargo for employee in employees)
+    created = [Employee(**employee.dict(), cargo_id=cargo_ids[employee.cargo]) for employee in employees]
+    db.add_all(created)
+    db.flush()
+    db.execute(EmployeeChange.__table__.insert(), [
+        {"employee_id": db_employee.id, "operation": ChangeOperationEnum.INSERT} for db_employee in created
+    ])
+    # Sin RETURNING las fechas asignadas por la BD se leen con una sola consulta
+    ids = [db_employee.id for db_employee in created if "created_at" not in db_employee.__dict__]
+    if ids:
+        db.query(Employee).populate_existing().filter(Employee.id.in_(ids)).all()
+    for db_employee in created:
+        db.expunge(db_employee)
+    db.commit()
+    for db_employee in created:
+        _on_employee_saved(db_employee)
+    logger.info("✅ %s empleados creados en un commit", len(created), extra={"rows": len(created)})
+    return created
+
+def patch_employee(db: Session, employee_id: int, changes: Dict[str, Any]) -> Optional[Employee]:
+    """
+    Actualizar solo los campos de `changes` con un único UPDATE
+    Con soporte de UPDATE ... RETURNING el empleado actualizado vuelve en la
+    misma sentencia; si no, se lee después del UPDATE (misma transacción).
+    Retorna None si el empleado no existe.
+    """
+    values = dict(changes)
+    if "cargo" in values:
+        values["cargo_id"] = cargo_registry.get_id(values["cargo"])
+    stmt = (
+        update(Employee)
+        .where(Employee.id == employee_id)
+        .values(**values)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    if db.get_bind().dialect.update_returning:
+        db_employee = db.execute(stmt.returning(Employee)).scalar_one_or_none()
+    elif db.execute(stmt).rowcount:
+        db_employee = db.query(Employee).populate_existing().filter(Employee.id == employee_id).one()
+    else:
+        db_employee = None
+    if db_employee is None:
+        db.rollback()
+        return None
+    _log_change(db, employee_id, ChangeOperationEnum.UPDATE)
+    # Fuera de la sesión el commit no lo expira (sin SELECT para refrescarlo)
+    db.expunge(db_employee)
+    db.commit()
+    _on_employee_saved(db_employee)
+    logger.info("✅ Empleado actualizado: %s (ID: %s)", db_employee.nombre, db_employee.id, extra={"employee_id": db_employee.id})
     return db_employee
 
+def update_employee(db: Session, employee_id: int, employee: EmployeeUpdate) -> Optional[Employee]:
+    """Actualizar empleado existente (todos los campos)"""
+    return patch_employee(db, employee_id, employee.dict())
+
 def delete_employee(db: Session, employee_id: int) -> bool:
-    """Eliminar empleado"""
-    db_employee = get_employee(db, employee_id)
-    if db_employee:
-        db.delete(db_employee)
-        db.commit()
-        logger.info(f"✅ Empleado eliminado: ID {employee_id}")
-        return True
-    return False
+    """Eliminar empleado (un solo DELETE; rowcount 0 = no existe)"""
+    result = db.execute(
+        delete(Employee).where(Employee.id == employee_id).execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        db.rollback()
+        return False
+    _log_change(db, employee_id, ChangeOperationEnum.DELETE)
+    db.commit()
+    _on_employee_deleted(employee_id)
+    logger.info("✅ Empleado eliminado: ID %s", employee_id, extra={"employee_id": employee_id})
+    return True
 
-def create_employees_bulk(db: Session, employees: List[Dict[str, Any]]) -> int:
-    """Crear múltiples empleados"""
-    count = 0
-    for emp_data in employees:
-        try:
-            db_employee = Employee(**emp_data)
-            db.add(db_employee)
-            count += 1
-        except Exception as e:
-            logger.error(f"Error creando empleado: {e}")
+def add_employees_bulk(db: Session, employees: List[Dict[str, Any]], batch_size: int,
+                       on_batch: Optional[Callable[[int], None]] = None) -> Tuple[int, int]:
+    """
+    Agregar empleados en lotes de batch_size (un flush por lote, sin commit)
+    Los empleados de cada lote se sacan de la sesión después del flush para
+    que la memoria no crezca con el tamaño de la importación. `on_batch`
+    recibe el total agregado después de cada lote.
+    Retorna (empleados agregados, lotes).
+    """
+    batch_size = max(batch_size, 1)
+    count = batches = 0
+    cargo_ids = cargo_registry.ids_for(emp_data["cargo"] for emp_data in employees)
+    for offset in range(0, len(employees), batch_size):
+        created = []
+        for emp_data in employees[offset:offset + batch_size]:
+            try:
+                db_employee = Employee(**emp_data, cargo_id=cargo_ids[emp_data["cargo"]])
+                db.add(db_employee)
+                created.append(db_employee)
+            except Exception as e:
+                logger.error("Error creando empleado: %s", e)
+                continue
+        if not created:
             continue
-    
+        db.flush()
+        db.execute(EmployeeChange.__table__.insert(), [
+            {"employee_id": db_employee.id, "operation": ChangeOperationEnum.INSERT} for db_employee in created
+        ])
+        for db_employee in created:
+            db.expunge(db_employee)
+        count += len(created)
+        batches += 1
+        if on_batch is not None:
+            on_batch(count)
+    return count, batches
+
+def commit_employees_bulk(db: Session, count: int) -> None:
+    """Confirmar los empleados agregados con add_employees_bulk"""
     db.commit()
-    logger.info(f"✅ {count} empleados creados en bulk")
+    _on_employees_bulk_changed()
+    logger.info("✅ %s empleados creados en bulk", count, extra={"rows": count})
+
+def create_employees_bulk(db: Session, employees: List[Dict[str, Any]]) -> int:
+    """Crear múltiples empleados"""
+    count, _ = add_employees_bulk(db, employees, settings.IMPORT_INSERT_BATCH)
+    commit_employees_bulk(db, count)
     return count
 
+def get_change_cursor(db: Session) -> int:
+    """Cursor actual del feed de cambios (último id registrado)"""
+    return db.query(func.max(EmployeeChange.id)).scalar() or 0
+
+def get_employee_changes(db: Session, since: int, limit: int, settle_seconds: float = 0) -> Tuple[List[EmployeeChange], bool]:
+    """
+    Cambios con id > since, en orden, y si quedan más
+    Con settle_seconds no se entregan los cambios más recientes: un id
+    asignado por una transacción aún abierta podría confirmarse después de
+    otro mayor, y el cliente lo saltaría al avanzar el cursor.
+    """
+    query = db.query(EmployeeChange).filter(EmployeeChange.id > since)
+    if settle_seconds:
+        db_now = db.query(func.now()).scalar()
+        query = query.filter(EmployeeChange.changed_at <= db_now - timedelta(seconds=settle_seconds))
+    changes = query.order_by(EmployeeChange.id).limit(limit + 1).all()
+    return changes[:limit], len(changes) > limit
+
 # Statistics
 def get_statistics(db: Session) -> Dict[str, Any]:
     """Obtener estadísticas de empleados"""
@@ -78,12 +231,23 @@ def get_statistics(db: Session) -> Dict[str, Any]:
             func.sum(Employee.sueldo).label('total_salary')
         ).group_by(Employee.sexo).all()
         
-        # Por cargo
-        by_cargo = db.query(
-            Employee.cargo,
+        # Por cargo: se agrupa por cargo_id (entero, índice cubriente) y los nombres salen del catálogo
+        by_cargo_id = db.query(
+            Employee.cargo_id,
             func.count(Employee.id).label('total'),
             func.avg(Employee.sueldo).label('avg_salary')
-        ).group_by(Employee.cargo).all()
+        ).group_by(Employee.cargo_id).all()
+        by_cargo = [
+            (cargo_registry.name(cargo_id), total, avg_salary)
+            for cargo_id, total, avg_salary in by_cargo_id if cargo_id is not None
+        ]
+        if len(by_cargo) < len(by_cargo_id):
+            # Filas escritas sin cargo_id (p.ej. por un worker con la versión anterior)
+            by_cargo += db.query(
+                Employee.cargo,
+                func.count(Employee.id).label('total'),
+                func.avg(Employee.sueldo).label('avg_salary')
+            ).filter(Employee.cargo_id.is_(None)).group_by(Employee.cargo).all()
         
         # Rango salarial
         min_salary = db.query(func.min(Employee.sueldo)).scalar() or 0
@@ -114,17 +278,19 @@ def get_statistics(db: Session) -> Dict[str, Any]:
             }
         }
     except Exception as e:
-        logger.error(f"Error obteniendo estadísticas: {e}")
+        logger.error("Error obteniendo estadísticas: %s", e)
         raise
 
 # Data Import Tracking
-def create_import_record(db: Session, sheet_name: str, rows: int, filename: str, status: str = "success") -> DataImported:
-    """Registrar importación exitosa"""
+def create_import_record(db: Session, sheet_name: str, rows: int, filename: str, status: str = "success",
+                         telemetry: Optional[Dict[str, Any]] = None) -> DataImported:
+    """Registrar importación exitosa (telemetry: columnas de SheetImport.telemetry())"""
     record = DataImported(
         sheet_name=sheet_name,
         rows_imported=rows,
         file_name=filename,
-        status=status
+        status=status,
+        **(telemetry or {})
     )
     db.add(record)
     db.commit()
@@ -132,9 +298,10 @@ def create_import_record(db: Session, sheet_name: str, rows: int, filename: str,
     return record
 
 def create_error_record(db: Session, sheet_name: str, error_type: str, error_msg: str, 
-                       filename: str, row_number: Optional[int] = None) -> DataError:
+                       filename: str, row_number: Optional[int] = None, import_id: Optional[int] = None) -> DataError:
     """Registrar error durante importación"""
     error = DataError(
+        import_id=import_id,
         sheet_name=sheet_name,
         error_type=error_type,
         error_message=error_msg,
@@ -142,6 +309,112 @@ def create_error_record(db: Session, sheet_name: str, error_type: str, error_msg
         file_name=filename
     )
     db.add(error)
+    if import_id is not None:
+        # El conteo sobrevive a la retención del detalle
+        db.query(DataImported).filter(DataImported.id == import_id).update(
+            {DataImported.error_count: DataImported.error_count + 1}, synchronize_session=False
+        )
     db.commit()
     db.refresh(error)
-    return error
\ No newline at end of file
+    return error
+
+def add_import_records(db: Session, records: List[Dict[str, Any]]) -> List[DataImported]:
+    """
+    Agregar varios registros de importación (columnas de DataImported) con un
+    solo flush y sin commit; retorna los registros con su id asignado
+    """
+    imports = [DataImported(**record) for record in records]
+    db.add_all(imports)
+    db.flush()
+    return imports
+
+def add_error_records(db: Session, errors: List[Dict[str, Any]]) -> None:
+    """
+    Agregar varios errores (columnas de DataError) en un solo INSERT y sin commit
+    El error_count de las importaciones referenciadas no se actualiza: se
+    asigna al crear el registro de importación.
+    """
+    if errors:
+        db.execute(DataError.__table__.insert(), errors)
+
+def get_import_records(db: Session, skip: int = 0, limit: int = 100, file_name: Optional[str] = None,
+                       sheet_name: Optional[str] = None, status: Optional[str] = None,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[DataImported]:
+    """Obtener historial de importaciones (más recientes primero)"""
+    query = db.query(DataImported)
+    if file_name:
+        query = query.filter(DataImported.file_name == file_name)
+    if sheet_name:
+        query = query.filter(DataImported.sheet_name == sheet_name)
+    if status:
+        query = query.filter(DataImported.status == status)
+    if date_from:
+        query = query.filter(DataImported.import_date >= date_from)
+    if date_to:
+        query = query.filter(DataImported.import_date < date_to)
+    return query.order_by(DataImported.import_date.desc(), DataImported.id.desc()).offset(skip).limit(limit).all()
+
+def get_import_performance(db: Session, file_name: Optional[str] = None, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Telemetría de importaciones agregada por día (solo hojas con telemetría)"""
+    day = func.date(DataImported.import_date)
+    query = db.query(
+        day.label("day"),
+        func.count(DataImported.id).label("sheets"),
+        func.sum(DataImported.rows_imported).label("rows"),
+        func.avg(DataImported.read_ms).label("avg_read_ms"),
+        func.avg(DataImported.validate_ms).label("avg_validate_ms"),
+        func.avg(DataImported.transform_ms).label("avg_transform_ms"),
+        func.avg(DataImported.insert_ms).label("avg_insert_ms"),
+        func.avg(DataImported.total_ms).label("avg_total_ms"),
+        func.max(DataImported.total_ms).label("max_total_ms"),
+        func.avg(DataImported.rows_per_second).label("avg_rows_per_second"),
+        func.max(DataImported.peak_memory_mb).label("max_peak_memory_mb"),
+    ).filter(DataImported.total_ms.isnot(None))
+    if file_name:
+        query = query.filter(DataImported.file_name == file_name)
+    if date_from:
+        query = query.filter(DataImported.import_date >= date_from)
+    if date_to:
+        query = query.filter(DataImported.import_date < date_to)
+    return [
+        {key: round(value, 1) if isinstance(value, float) else value for key, value in row._mapping.items()}
+        for row in query.group_by(day).order_by(day).all()
+    ]
+
+def get_import_record(db: Session, import_id: int) -> Optional[DataImported]:
+    """Obtener importación por ID"""
+    return db.query(DataImported).filter(DataImported.id == import_id).first()
+
+def get_import_errors(db: Session, import_id: int, skip: int = 0, limit: int = 100,
+                      sheet_name: Optional[str] = None, date_from: Optional[datetime] = None,
+                      date_to: Optional[datetime] = None) -> List[DataError]:
+    """Obtener errores de una importación"""
+    query = db.query(DataError).filter(DataError.import_id == import_id)
+    if sheet_name:
+        query = query.filter(DataError.sheet_name == sheet_name)
+    if date_from:
+        query = query.filter(DataError.error_date >= date_from)
+    if date_to:
+        query = query.filter(DataError.error_date < date_to)
+    return query.order_by(DataError.id).offset(skip).limit(limit).all()
+
+# Payroll runs
+def get_payroll_runs(db: Session, skip: int = 0, limit: int = 100) -> List[PayrollRun]:
+    """Obtener corridas de nómina (más recientes primero)"""
+    return db.query(PayrollRun).order_by(PayrollRun.id.desc()).offset(skip).limit(limit).all()
+
+def get_payroll_run(db: Session, run_id: int) -> Optional[PayrollRun]:
+    """Obtener corrida de nómina por ID"""
+    return db.query(PayrollRun).filter(PayrollRun.id == run_id).first()
+
+def get_payroll_lines(db: Session, run_id: int, skip: int = 0, limit: int = 100) -> List[PayrollLine]:
+    """Obtener líneas de una corrida ordenadas por empleado"""
+    return (
+        db.query(PayrollLine)
+        .filter(PayrollLine.run_id == run_id)
+        .order_by(PayrollLine.employee_id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
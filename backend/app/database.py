@@ -1,4 +1,8 @@
+import math
+import time
+from fastapi import Request, Response
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
@@ -7,16 +11,29 @@ from app.utils.logger_config import get_logger
 logger = get_logger(__name__)
 settings = get_settings()
 
-# Crear engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=False
-)
+# Momento de la última escritura del cliente (read-your-writes): se envía en
+# el header de respuesta X-Last-Write, que el cliente repite en sus requests,
+# y en una cookie para los clientes del mismo origen
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "last_write"
+
+def _create_engine(url: str) -> Engine:
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=3600,
+        echo=False
+    )
+
+# Crear engines: primario (escrituras) y réplica de lectura (DB_READ_URL, por defecto el mismo)
+engine = _create_engine(settings.DATABASE_URL)
+read_engine = engine if settings.DATABASE_READ_URL == settings.DATABASE_URL else _create_engine(settings.DATABASE_READ_URL)
 
 # Session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base
 Base = declarative_base()
@@ -29,7 +46,52 @@ def get_db():
     try:
         yield db
     except Exception as e:
-        logger.error(f"Error en sesión de base de datos: {str(e)}")
+        logger.error("Error en sesión de base de datos: %s", e)
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def replica_enabled() -> bool:
+    return read_engine is not engine
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    El cliente escribió hace menos de READ_YOUR_WRITES_SECONDS (header
+    X-Last-Write o cookie last_write)
+    """
+    for value in (request.headers.get(LAST_WRITE_HEADER), request.cookies.get(LAST_WRITE_COOKIE)):
+        try:
+            last_write = float(value or "")
+        except ValueError:
+            continue
+        if time.time() - last_write < settings.READ_YOUR_WRITES_SECONDS:
+            return True
+    return False
+
+def mark_write(response: Response) -> None:
+    """
+    Registrar la escritura del cliente para que sus próximas lecturas vayan al primario
+    El header sirve a clientes de otro origen (la cookie no viaja sin credenciales).
+    """
+    now = f"{time.time():.3f}"
+    response.headers[LAST_WRITE_HEADER] = now
+    response.set_cookie(
+        LAST_WRITE_COOKIE, now,
+        max_age=max(int(math.ceil(settings.READ_YOUR_WRITES_SECONDS)), 1), httponly=True, samesite="lax"
+    )
+
+def get_read_db(request: Request):
+    """
+    Dependency para endpoints de solo lectura: sesión sobre la réplica
+    Si el cliente acaba de escribir (read-your-writes) se usa el primario.
+    """
+    session_factory = SessionLocal if reads_from_primary(request) else ReadSessionLocal
+    db = session_factory()
+    try:
+        yield db
+    except Exception as e:
+        logger.error("Error en sesión de base de datos: %s", e)
         db.rollback()
         raise
     finally:
@@ -38,10 +100,26 @@ def get_db():
 def init_db():
     """
     Inicializar base de datos
+    Verifica la versión del esquema y solo aplica las migraciones pendientes.
     """
+    from app.migrations import run_migrations
     try:
-        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         logger.info("✅ Base de datos inicializada correctamente")
     except Exception as e:
-        logger.error(f"❌ Error al inicializar base de datos: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error("❌ Error al inicializar base de datos: %s", e)
+        raise
+
+def prefill_pool():
+    """
+    Abrir las conexiones base de los pools (primario y réplica) para que los
+    primeros requests no paguen el connect
+    """
+    size = 0
+    for pool_engine in {engine, read_engine}:
+        pool_size = pool_engine.pool.size() if hasattr(pool_engine.pool, "size") else 1
+        connections = [pool_engine.connect() for _ in range(pool_size)]
+        for conn in connections:
+            conn.close()
+        size += pool_size
+    return size
@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.database import init_db
+from app.database import LAST_WRITE_HEADER, init_db, mark_write, replica_enabled
+from app.services.health_service import health_monitor
+from app.services.warmup_service import warmup
+from app.services.payroll_engine import payroll_engine
+from app.services.retention_service import retention
+from app.services.write_coalescer import employee_writes
 from app.api import endpoints, health, upload  
 from app.api import endpoints, health
-from app.utils.logger_config import get_logger
+from app.utils.idempotency import MUTATING_METHODS, idempotency_store
+from app.utils.background import install_default_executor
+from app.utils.logger_config import get_logger, set_request_id, reset_request_id
+import uuid
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -23,8 +31,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "Idempotent-Replayed", LAST_WRITE_HEADER],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """
+    Asignar un ID a cada request para correlacionar los logs
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = set_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.middleware("http")
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Con réplica de lectura: tras una escritura del cliente, sus lecturas van
+    al primario durante READ_YOUR_WRITES_SECONDS (header X-Last-Write que el
+    cliente repite, o cookie last_write)
+    """
+    response = await call_next(request)
+    if replica_enabled() and request.method in MUTATING_METHODS and response.status_code < 400:
+        mark_write(response)
+    return response
+
 # Incluir routers
 app.include_router(health.router, tags=["Health"])
 app.include_router(upload.router, prefix=settings.API_PREFIX, tags=["Upload"])  # ✅ AGREGAR ESTA LÍNEA
@@ -36,13 +71,24 @@ async def startup_event():
     Inicialización al arrancar la aplicación
     """
     logger.info("🚀 Iniciando Nomina System API...")
-    logger.info(f"📌 Versión: {settings.VERSION}")
+    logger.info("📌 Versión: %s", settings.VERSION)
+    
+    logger.info("📌 Modo de arranque: %s", settings.STARTUP_MODE)
     
     try:
-        init_db()
+        # asyncio.to_thread usa el executor por defecto: uno medible para readiness
+        install_default_executor()
+        if settings.STARTUP_MODE != "fast":
+            init_db()
+            warmup.mark_schema_ready()
+        health_monitor.start()
+        retention.start()
+        idempotency_store.start()
+        # Pool, ORM y pandas se precargan después de reportar "live"
+        warmup.start()
         logger.info("✅ Aplicación iniciada correctamente")
     except Exception as e:
-        logger.error(f"❌ Error en startup: {e}")
+        logger.error("❌ Error en startup: %s", e)
         raise
 
 @app.on_event("shutdown")
@@ -51,6 +97,12 @@ async def shutdown_event():
     Limpieza al cerrar la aplicación
     """
     logger.info("👋 Cerrando Nomina System API...")
+    await employee_writes.drain()
+    await health_monitor.stop()
+    await retention.stop()
+    await idempotency_store.stop()
+    await warmup.stop()
+    payroll_engine.shutdown()
 
 @app.get("/")
 async def root():
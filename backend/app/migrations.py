@@ -0,0 +1,346 @@
+"""
+Migraciones versionadas del esquema
+
+Cada migración tiene un número de versión y una función que recibe la conexión.
+La versión aplicada se guarda en la tabla `schema_version`, de modo que en un
+arranque normal solo se consulta esa tabla en lugar de reflejar todo el esquema.
+"""
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Lock con nombre que serializa run_migrations entre procesos (ver _migration_lock)
+MIGRATION_LOCK_NAME = "nomina_migrations"
+# Segundos que un worker espera a que otro termine de migrar (MySQL)
+MIGRATION_LOCK_TIMEOUT = 300
+
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+def _initial_schema(conn: Connection) -> None:
+    """
+    Versión 1: tablas base (employees, data_imported, data_errors)
+    """
+    from app.database import Base
+    import app.models  # noqa: F401  (registra los modelos en Base.metadata)
+    Base.metadata.create_all(bind=conn)
+
+
+def _cargo_lookup(conn: Connection) -> None:
+    """
+    Versión 2: catálogo `cargos` y employees.cargo_id (FK) con backfill
+    En una BD nueva la versión 1 ya crea ambos con los modelos actuales, por
+    eso cada paso verifica si hace falta.
+    """
+    from app.models import Cargo, Employee
+    inspector = inspect(conn)
+    if not inspector.has_table(Cargo.__tablename__):
+        Cargo.__table__.create(bind=conn)
+
+    columns = {column["name"] for column in inspector.get_columns(Employee.__tablename__)}
+    add_column = "cargo_id" not in columns
+    if add_column:
+        references = " REFERENCES cargos(id)" if conn.dialect.name == "sqlite" else " NULL"
+        conn.execute(text(f"ALTER TABLE employees ADD COLUMN cargo_id INTEGER{references}"))
+    for index in Employee.__table__.indexes:
+        if "cargo_id" in index.columns:
+            index.create(bind=conn, checkfirst=True)
+    if add_column and conn.dialect.name != "sqlite":
+        # Después del índice compuesto, para que la FK lo use en vez de crear otro
+        conn.execute(text(
+            "ALTER TABLE employees ADD CONSTRAINT fk_employees_cargo_id "
+            "FOREIGN KEY (cargo_id) REFERENCES cargos(id)"
+        ))
+
+    # Backfill: un registro por cargo distinto y el id en cada empleado
+    conn.execute(text(
+        "INSERT INTO cargos (nombre) SELECT DISTINCT cargo FROM employees "
+        "WHERE cargo NOT IN (SELECT nombre FROM cargos)"
+    ))
+    result = conn.execute(text(
+        "UPDATE employees SET cargo_id = (SELECT id FROM cargos WHERE cargos.nombre = employees.cargo) "
+        "WHERE cargo_id IS NULL"
+    ))
+    logger.info("🔧 cargo_id asignado a %s empleados", result.rowcount)
+
+
+def _payroll_runs(conn: Connection) -> None:
+    """
+    Versión 3: tablas de corridas de nómina (payroll_runs, payroll_lines)
+    """
+    from app.models import PayrollLine, PayrollRun
+    PayrollRun.__table__.create(bind=conn, checkfirst=True)
+    PayrollLine.__table__.create(bind=conn, checkfirst=True)
+
+
+def _payroll_watermarks(conn: Connection) -> None:
+    """
+    Versión 4: marca de agua de las corridas e índice en employees.updated_at
+    """
+    from app.models import Employee, PayrollRun
+    columns = {column["name"] for column in inspect(conn).get_columns(PayrollRun.__tablename__)}
+    for name in ("watermark", "recomputed_at"):
+        if name not in columns:
+            column_type = PayrollRun.__table__.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE payroll_runs ADD COLUMN {name} {column_type} NULL"))
+    for index in Employee.__table__.indexes:
+        if "updated_at" in index.columns:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _employee_changes(conn: Connection) -> None:
+    """
+    Versión 5: registro de cambios (employee_changes)
+    Los empleados existentes se registran como inserciones para que un
+    cliente que sincroniza desde el cursor 0 reciba la plantilla completa.
+    """
+    from app.models import EmployeeChange
+    EmployeeChange.__table__.create(bind=conn, checkfirst=True)
+    # En una BD nueva la tabla ya existe (versión 1), pero init.sql pudo cargar empleados
+    if conn.execute(select(EmployeeChange.id).limit(1)).first() is not None:
+        return
+    result = conn.execute(text(
+        "INSERT INTO employee_changes (employee_id, operation, changed_at) "
+        "SELECT id, 'INSERT', updated_at FROM employees ORDER BY id"
+    ))
+    logger.info("🔧 %s empleados registrados en employee_changes", result.rowcount)
+
+
+def _column_names(conn: Connection, table_name: str) -> Set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+
+# Columnas de las tablas de historial que creaba init.sql → nombre en los modelos
+LEGACY_COLUMN_RENAMES = {
+    "data_imported": {"filename": "file_name", "created_at": "import_date"},
+    "data_errors": {"row_num": "row_number", "created_at": "error_date"},
+}
+
+
+def _constant_default(column: Column) -> Optional[str]:
+    """
+    DEFAULT (SQL) para las filas existentes al agregar una columna NOT NULL:
+    el server_default o el default constante del modelo, si no 0 o cadena vacía
+    None si el default es una función (p.ej. now()), que ALTER TABLE ADD no acepta.
+    """
+    server_default = getattr(column.server_default, "arg", None)
+    if isinstance(server_default, str):
+        return server_default
+    if server_default is not None:
+        return None
+    value = getattr(column.default, "arg", None)
+    if value is None:
+        value = "" if column.type.python_type is str else 0
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return None
+
+
+def _align_columns(conn: Connection, table: Table) -> Set[str]:
+    """
+    Ajustar una tabla existente a su modelo: renombrar las columnas de
+    LEGACY_COLUMN_RENAMES, agregar las que faltan y quitar NOT NULL de las
+    que el modelo no escribe (solo MySQL/PostgreSQL; SQLite no lo permite)
+    Retorna las columnas agregadas.
+    """
+    dialect = conn.dialect
+    quote = dialect.identifier_preparer.quote
+    columns = {column["name"]: column for column in inspect(conn).get_columns(table.name)}
+    for old, new in LEGACY_COLUMN_RENAMES.get(table.name, {}).items():
+        if old in columns and new not in columns:
+            conn.execute(text(f"ALTER TABLE {table.name} RENAME COLUMN {quote(old)} TO {quote(new)}"))
+            columns[new] = columns.pop(old)
+            logger.info("🔧 %s.%s renombrada a %s", table.name, old, new)
+
+    added = set()
+    for column in table.columns:
+        if column.name in columns:
+            continue
+        column_type = column.type.compile(dialect=dialect)
+        default = None if column.nullable else _constant_default(column)
+        definition = f"{column_type} NULL" if default is None else f"{column_type} NOT NULL DEFAULT {default}"
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {quote(column.name)} {definition}"))
+        added.add(column.name)
+        logger.info("🔧 %s.%s agregada", table.name, column.name)
+
+    for name, info in columns.items():
+        model_column = table.columns.get(name)
+        if info["nullable"] or (model_column is not None and not model_column.nullable):
+            continue
+        if model_column is None and (info.get("default") is not None or info.get("autoincrement") is True):
+            continue
+        if dialect.name in ("mysql", "mariadb"):
+            column_type = info["type"].compile(dialect=dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} MODIFY COLUMN {quote(name)} {column_type} NULL"))
+        elif dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {quote(name)} DROP NOT NULL"))
+        else:
+            logger.warning("⚠️ %s.%s es NOT NULL y no se puede modificar en %s", table.name, name, dialect.name)
+            continue
+        logger.info("🔧 %s.%s ahora acepta NULL", table.name, name)
+    return added
+
+
+def _import_history(conn: Connection) -> None:
+    """
+    Versión 6: índices del historial de importaciones, data_errors.import_id
+    (FK) y data_imported.error_count
+    Las tablas creadas por el init.sql anterior (filename, created_at,
+    row_num...) se ajustan a los modelos antes de crear los índices.
+    """
+    from app.models import DataError, DataImported
+    inspector = inspect(conn)
+    add_fk = "import_id" not in {column["name"] for column in inspector.get_columns(DataError.__tablename__)}
+    if add_fk:
+        references = " REFERENCES data_imported(id)" if conn.dialect.name == "sqlite" else " NULL"
+        conn.execute(text(f"ALTER TABLE data_errors ADD COLUMN import_id INTEGER{references}"))
+    imported_added = _align_columns(conn, DataImported.__table__)
+    errors_added = _align_columns(conn, DataError.__table__)
+    if "rows_imported" in imported_added and "successful_records" in _column_names(conn, "data_imported"):
+        # Importaciones registradas con el esquema de init.sql
+        conn.execute(text(
+            "UPDATE data_imported SET rows_imported = successful_records, "
+            "status = CASE WHEN import_status = 'failed' THEN 'error' ELSE 'success' END"
+        ))
+    if "file_name" in errors_added:
+        conn.execute(text(
+            "UPDATE data_errors SET file_name = (SELECT file_name FROM data_imported "
+            "WHERE data_imported.id = data_errors.import_id) WHERE import_id IS NOT NULL"
+        ))
+    for table in (DataImported.__table__, DataError.__table__):
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    if add_fk and conn.dialect.name != "sqlite":
+        # Después del índice compuesto, para que la FK lo use en vez de crear otro
+        conn.execute(text(
+            "ALTER TABLE data_errors ADD CONSTRAINT fk_data_errors_import_id "
+            "FOREIGN KEY (import_id) REFERENCES data_imported(id)"
+        ))
+
+
+def _import_telemetry(conn: Connection) -> None:
+    """
+    Versión 7: telemetría por hoja en data_imported (tiempos por etapa, filas/s,
+    pico de memoria y lotes de inserción)
+    """
+    from app.models import DataImported
+    columns = {column["name"] for column in inspect(conn).get_columns(DataImported.__tablename__)}
+    for name in ("read_ms", "validate_ms", "transform_ms", "insert_ms", "total_ms", "rows_per_second",
+                 "peak_memory_mb", "insert_batch_size", "insert_batches"):
+        if name not in columns:
+            column_type = DataImported.__table__.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE data_imported ADD COLUMN {name} {column_type} NULL"))
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    """
+    Versión 8: tabla idempotency_keys (Idempotency-Key compartida entre workers)
+    """
+    from app.models import IdempotencyKey
+    IdempotencyKey.__table__.create(bind=conn, checkfirst=True)
+
+
+# (versión, descripción, función) en orden ascendente
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Esquema inicial", _initial_schema),
+    (2, "Catálogo de cargos (employees.cargo_id)", _cargo_lookup),
+    (3, "Corridas de nómina (payroll_runs, payroll_lines)", _payroll_runs),
+    (4, "Marca de agua de corridas (employees.updated_at indexado)", _payroll_watermarks),
+    (5, "Registro de cambios de empleados (employee_changes)", _employee_changes),
+    (6, "Historial de importaciones (índices, data_errors.import_id)", _import_history),
+    (7, "Telemetría de importaciones (data_imported)", _import_telemetry),
+    (8, "Claves de idempotencia (idempotency_keys)", _idempotency_keys),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_current_version(conn: Connection) -> int:
+    """
+    Versión aplicada en la base de datos (0 si nunca se migró)
+    """
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+@contextmanager
+def _migration_lock(conn: Connection) -> Iterator[None]:
+    """
+    Lock de la base de datos mientras se migra: con `uvicorn --workers N` cada
+    worker corre run_migrations al arrancar y solo uno debe aplicarlas
+    - MySQL / MariaDB: GET_LOCK (de la sesión; se libera aunque el proceso muera)
+    - PostgreSQL: pg_advisory_lock
+    - SQLite: BEGIN IMMEDIATE (lock de escritura del archivo hasta el commit)
+    El lock de sesión se libera después del commit o rollback del bloque, para
+    que el siguiente worker lea la versión ya confirmada.
+    """
+    dialect = conn.dialect.name
+    params = {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+    release = None
+    if dialect in ("mysql", "mariadb"):
+        if conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), params).scalar() != 1:
+            raise RuntimeError(
+                f"No se obtuvo el lock de migraciones '{MIGRATION_LOCK_NAME}' en {MIGRATION_LOCK_TIMEOUT} s"
+            )
+        release = text("SELECT RELEASE_LOCK(:name)")
+    elif dialect == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), params)
+        release = text("SELECT pg_advisory_unlock(hashtext(:name))")
+    elif dialect == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if release is not None:
+            conn.execute(release, params)
+            conn.commit()
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Aplicar las migraciones pendientes y retornar la versión resultante
+    En un arranque normal solo se lee la versión; si hay migraciones pendientes
+    se toma el lock de migraciones y se vuelve a leer (otro proceso pudo
+    aplicarlas mientras se esperaba).
+    """
+    with engine.connect() as conn:
+        current = get_current_version(conn)
+    if current >= SCHEMA_VERSION:
+        logger.info("✅ Esquema al día (versión %s)", current)
+        return current
+
+    with engine.connect() as conn, _migration_lock(conn):
+        current = get_current_version(conn)
+        if current >= SCHEMA_VERSION:
+            conn.commit()
+            logger.info("✅ Esquema migrado por otro proceso (versión %s)", current)
+            return current
+
+        schema_version.create(bind=conn, checkfirst=True)
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("🔧 Aplicando migración %s: %s", version, description)
+            migrate(conn)
+            conn.execute(schema_version.insert().values(version=version, description=description))
+        conn.commit()
+
+    logger.info("✅ Esquema migrado de la versión %s a la %s", current, SCHEMA_VERSION)
+    return SCHEMA_VERSION
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -8,6 +9,24 @@ class SexoEnum(str, enum.Enum):
     FEMENINO = "Femenino"
     OTRO = "Otro"
 
+class ChangeOperationEnum(str, enum.Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+class Cargo(Base):
+    """
+    Catálogo de cargos (cada nombre se guarda una sola vez)
+    """
+    __tablename__ = "cargos"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nombre = Column(String(100), nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<Cargo(id={self.id}, nombre='{self.nombre}')>"
+
 class Employee(Base):
     """
     Modelo de Empleado
@@ -18,14 +37,36 @@ class Employee(Base):
     nombre = Column(String(100), nullable=False, index=True)
     edad = Column(Integer, nullable=False)
     sexo = Column(Enum(SexoEnum), nullable=False)
-    cargo = Column(String(100), nullable=False)
+    cargo = Column(String(100), nullable=False)  # Se conserva por compatibilidad; cargo_id es la referencia
+    cargo_id = Column(Integer, ForeignKey("cargos.id"), nullable=True)
     sueldo = Column(Float, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
+    
+    __table_args__ = (
+        # Cubre el GROUP BY cargo_id de las estadísticas (y sirve de índice para la FK)
+        Index("ix_employees_cargo_id_sueldo", "cargo_id", "sueldo"),
+    )
     
     def __repr__(self):
         return f"<Employee(id={self.id}, nombre='{self.nombre}', cargo='{self.cargo}')>"
 
+class EmployeeChange(Base):
+    """
+    Registro de cambios de employees (feed de sincronización incremental)
+    Se escribe en la misma transacción que el cambio; las eliminaciones
+    quedan como tombstone (operation=delete).
+    """
+    __tablename__ = "employee_changes"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Cursor del feed
+    employee_id = Column(Integer, nullable=False)
+    operation = Column(Enum(ChangeOperationEnum), nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<EmployeeChange(id={self.id}, employee_id={self.employee_id}, operation='{self.operation}')>"
+
 class DataImported(Base):
     """
     Registro de datos importados desde Excel
@@ -38,6 +79,22 @@ class DataImported(Base):
     file_name = Column(String(255), nullable=False)
     import_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     status = Column(String(50), nullable=False, default="success")
+    error_count = Column(Integer, nullable=False, default=0, server_default="0")  # Se conserva aunque la retención borre el detalle
+    # Telemetría de la hoja (NULL en importaciones anteriores o fallidas)
+    read_ms = Column(Float, nullable=True)
+    validate_ms = Column(Float, nullable=True)
+    transform_ms = Column(Float, nullable=True)
+    insert_ms = Column(Float, nullable=True)
+    total_ms = Column(Float, nullable=True)
+    rows_per_second = Column(Float, nullable=True)
+    peak_memory_mb = Column(Float, nullable=True)  # Pico de memoria residente del proceso
+    insert_batch_size = Column(Integer, nullable=True)
+    insert_batches = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_data_imported_import_date", "import_date"),
+        Index("ix_data_imported_file_name_import_date", "file_name", "import_date"),
+    )
     
     def __repr__(self):
         return f"<DataImported(id={self.id}, sheet='{self.sheet_name}', rows={self.rows_imported})>"
@@ -49,6 +106,7 @@ class DataError(Base):
     __tablename__ = "data_errors"
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    import_id = Column(Integer, ForeignKey("data_imported.id"), nullable=True)  # Nulo en errores anteriores al historial
     sheet_name = Column(String(100), nullable=False)
     error_type = Column(String(100), nullable=False)
     error_message = Column(Text, nullable=False)
@@ -56,5 +114,88 @@ class DataError(Base):
     file_name = Column(String(255), nullable=False)
     error_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        # Errores de una importación por hoja (y sirve de índice para la FK)
+        Index("ix_data_errors_import_id_sheet_name", "import_id", "sheet_name"),
+        # Filtros por fecha y lotes de la tarea de retención
+        Index("ix_data_errors_error_date", "error_date"),
+    )
+    
+    def __repr__(self):
+        return f"<DataError(id={self.id}, sheet='{self.sheet_name}', type='{self.error_type}')>"
+
+class PayrollRun(Base):
+    """
+    Corrida de nómina de un periodo (totales y reglas aplicadas)
+    """
+    __tablename__ = "payroll_runs"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    periodo = Column(String(20), nullable=False, index=True)
+    status = Column(String(50), nullable=False, default="running")
+    reglas = Column(Text, nullable=False)  # JSON del conjunto de reglas usado
+    total_empleados = Column(Integer, nullable=False, default=0)
+    total_devengado = Column(Float, nullable=False, default=0)
+    total_deducciones = Column(Float, nullable=False, default=0)
+    total_impuesto = Column(Float, nullable=False, default=0)
+    total_neto = Column(Float, nullable=False, default=0)
+    total_aportes = Column(Float, nullable=False, default=0)
+    duration_ms = Column(Float, nullable=True)
+    error_message = Column(Text, nullable=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)  # Hora de la BD al cargar los empleados (para recálculos)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    recomputed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<PayrollRun(id={self.id}, periodo='{self.periodo}', status='{self.status}')>"
+
+class PayrollLine(Base):
+    """
+    Resultado de una corrida para un empleado (devengado a neto)
+    employee_id no es FK: la línea se conserva aunque el empleado se elimine.
+    """
+    __tablename__ = "payroll_lines"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("payroll_runs.id", ondelete="CASCADE"), nullable=False)
+    employee_id = Column(Integer, nullable=False)
+    sueldo = Column(Float, nullable=False)
+    bonificaciones = Column(Float, nullable=False)
+    devengado = Column(Float, nullable=False)
+    deducciones = Column(Float, nullable=False)
+    impuesto = Column(Float, nullable=False)
+    neto = Column(Float, nullable=False)
+    aportes = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        # Páginas de una corrida por empleado (y sirve de índice para la FK)
+        Index("ix_payroll_lines_run_id_employee_id", "run_id", "employee_id"),
+    )
+    
+    def __repr__(self):
+        return f"<PayrollLine(run_id={self.run_id}, employee_id={self.employee_id}, neto={self.neto})>"
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada por Idempotency-Key (compartida por todos los workers)
+    La clave se inserta "en curso" al empezar el request original; su dueño
+    renueva locked_until mientras se ejecuta y al terminar guarda la respuesta.
+    Las fechas son UTC sin zona horaria.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    idempotency_key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 de método, ruta, query, tamaño y cuerpo
+    method = Column(String(10), nullable=False)
+    path = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False)  # in_progress | completed
+    status_code = Column(Integer, nullable=True)  # NULL en completed = respuesta no repetible (streaming)
+    response_headers = Column(Text, nullable=True)  # JSON [[nombre, valor], ...]
+    response_body = Column(LargeBinary().with_variant(LONGBLOB(), "mysql", "mariadb"), nullable=True)
+    locked_until = Column(DateTime, nullable=False)  # Vencido en una clave en curso = el worker dueño murió
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
     def __repr__(self):
-        return f"<DataError(id={self.id}, sheet='{self.sheet_name}', type='{self.error_type}')>"
\ No newline at end of file
+        return f"<IdempotencyKey(key='{self.idempotency_key}', status='{self.status}')>"
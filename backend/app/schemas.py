@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, validator
+import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 from enum import Enum
 
 class SexoEnum(str, Enum):
@@ -22,14 +23,50 @@ class EmployeeCreate(EmployeeBase):
 class EmployeeUpdate(EmployeeBase):
     pass
 
+class EmployeePatch(BaseModel):
+    """Actualización parcial: solo se modifican los campos enviados (null = sin cambio)"""
+    nombre: Optional[str] = Field(None, min_length=1, max_length=100)
+    edad: Optional[int] = Field(None, gt=0, lt=120)
+    sexo: Optional[SexoEnum] = None
+    cargo: Optional[str] = Field(None, min_length=1, max_length=100)
+    sueldo: Optional[float] = Field(None, gt=0)
+
 class EmployeeResponse(EmployeeBase):
     id: int
+    cargo_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+# Campos seleccionables con ?fields= (sparse fieldsets) en las lecturas de empleados
+EMPLOYEE_FIELDS = tuple(EmployeeResponse.model_fields)
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """
+    Campos pedidos en `fields` ("id,nombre,cargo"), sin repetir y en ese orden
+    None si no se pidió ninguno (respuesta completa); ValueError si alguno no existe.
+    """
+    if fields is None or not fields.strip():
+        return None
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(allowed)})")
+    return selected
+
+def select_fields(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """Solo los atributos `fields` de un empleado (modelo, fila o CachedEmployee)"""
+    return {name: getattr(obj, name) for name in fields}
+
+class EmployeeChangeResponse(BaseModel):
+    cursor: int
+    employee_id: int
+    operation: str
+    changed_at: datetime
+    employee: Optional[EmployeeResponse] = None  # None en eliminaciones
+
 # Excel Schemas
 class SheetInfo(BaseModel):
     name: str
@@ -50,6 +87,40 @@ class ExcelPreviewData(BaseModel):
 class ExcelUploadRequest(BaseModel):
     selected_sheets: List[str]
 
+class DataImportedResponse(BaseModel):
+    id: int
+    sheet_name: str
+    rows_imported: int
+    file_name: str
+    import_date: datetime
+    status: str
+    error_count: int = 0
+    read_ms: Optional[float] = None
+    validate_ms: Optional[float] = None
+    transform_ms: Optional[float] = None
+    insert_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    rows_per_second: Optional[float] = None
+    peak_memory_mb: Optional[float] = None
+    insert_batch_size: Optional[int] = None
+    insert_batches: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+class DataErrorResponse(BaseModel):
+    id: int
+    import_id: Optional[int] = None
+    sheet_name: str
+    error_type: str
+    error_message: str
+    row_number: Optional[int] = None
+    file_name: str
+    error_date: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Statistics Schemas
 class StatisticsBySexo(BaseModel):
     sexo: str
@@ -68,4 +139,70 @@ class StatisticsResponse(BaseModel):
     average_salary: float
     by_sexo: List[StatisticsBySexo]
     by_cargo: List[StatisticsByCargo]
-    salary_range: Dict[str, float]
\ No newline at end of file
+    salary_range: Dict[str, float]
+
+# Payroll Schemas
+class PayrollConcept(BaseModel):
+    """
+    Concepto de nómina: tasa sobre la base más un monto fijo,
+    opcionalmente limitado a algunos cargos
+    """
+    nombre: str = Field(..., min_length=1, max_length=100)
+    tasa: float = Field(0, ge=0, le=1)
+    monto: float = Field(0, ge=0)
+    cargos: Optional[List[str]] = None
+
+class TaxBracket(BaseModel):
+    """
+    Tramo de impuesto progresivo: `tasa` marginal sobre lo que exceda `desde`
+    """
+    desde: float = Field(..., ge=0)
+    tasa: float = Field(..., ge=0, le=1)
+
+class PayrollRuleSet(BaseModel):
+    bonificaciones: List[PayrollConcept] = []  # Base: sueldo
+    deducciones: List[PayrollConcept] = []  # Base: devengado (a cargo del empleado)
+    aportes: List[PayrollConcept] = []  # Base: devengado (a cargo del empleador)
+    impuesto: List[TaxBracket] = []  # Base: devengado menos deducciones
+
+class PayrollRunCreate(BaseModel):
+    periodo: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$")
+    reglas: Optional[PayrollRuleSet] = None
+
+class PayrollRunResponse(BaseModel):
+    id: int
+    periodo: str
+    status: str
+    reglas: Dict[str, Any]
+    total_empleados: int
+    total_devengado: float
+    total_deducciones: float
+    total_impuesto: float
+    total_neto: float
+    total_aportes: float
+    duration_ms: Optional[float] = None
+    error_message: Optional[str] = None
+    watermark: Optional[datetime] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    recomputed_at: Optional[datetime] = None
+    
+    @validator("reglas", pre=True)
+    def parse_reglas(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+    
+    class Config:
+        from_attributes = True
+
+class PayrollLineResponse(BaseModel):
+    employee_id: int
+    sueldo: float
+    bonificaciones: float
+    devengado: float
+    deducciones: float
+    impuesto: float
+    neto: float
+    aportes: float
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,410 @@
+"""
+Servidor de producción multi-proceso (pre-fork)
+
+    python -m app.server
+
+El proceso maestro abre el socket, aplica las migraciones una sola vez y
+crea un pool de workers uvicorn que comparten el socket. Cada worker (y la
+migración) es un intérprete nuevo (`python -m app.server --worker ...`), no
+un fork del maestro: tras un SIGHUP los workers cargan el código y la
+configuración actuales en vez de las copias ya importadas por el maestro.
+Además:
+- Reinicia los workers que terminan (p.ej. al alcanzar WORKER_MAX_REQUESTS)
+- Recicla los workers que superan WORKER_MAX_MEMORY_MB de memoria residente
+- SIGHUP: reinicio escalonado (rolling restart) sin cortar el servicio
+- SIGTERM / SIGINT: apagado ordenado de todos los workers
+"""
+import argparse
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+from app.config import get_settings
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Variable de entorno con el PID del maestro, usada por /system/restart
+MASTER_PID_ENV = "NOMINA_MASTER_PID"
+
+# Intervalo del loop de supervisión (segundos)
+SUPERVISE_INTERVAL = 1.0
+
+# Espera máxima antes de volver a crear un worker tras fallas de arranque seguidas (segundos)
+MAX_RESPAWN_BACKOFF = 60.0
+
+
+def default_workers() -> int:
+    """
+    Número de workers por defecto: uno por CPU disponible
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(cpus, 1)
+
+
+def get_rss_bytes(pid: int) -> Optional[int]:
+    """
+    Memoria residente de un proceso (Linux /proc); None si no está disponible
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def request_graceful_restart() -> bool:
+    """
+    Pedir al maestro un reinicio escalonado de los workers
+    Retorna False si la API no se ejecuta bajo este launcher.
+    """
+    master_pid = os.environ.get(MASTER_PID_ENV)
+    if not master_pid:
+        return False
+    os.kill(int(master_pid), signal.SIGHUP)
+    return True
+
+
+class Worker:
+    """
+    Proceso worker (visto desde el maestro)
+    """
+
+    def __init__(self, pid: int, ready_fd: int):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.stopping = False
+
+
+class Master:
+    """
+    Proceso maestro: crea, supervisa y recicla los workers
+    """
+
+    def __init__(self, app: str = "app.main:app"):
+        self.app = app
+        self.num_workers = settings.WEB_WORKERS or default_workers()
+        self.workers: Dict[int, Worker] = {}
+        self.sock: Optional[socket.socket] = None
+        self._stopping = False
+        self._reload_requested = False
+        self._boot_failures = 0  # Workers seguidos que terminaron antes de estar listos
+        self._respawn_at = 0.0
+
+    # ---------- ciclo de vida ----------
+
+    def run(self) -> None:
+        os.environ[MASTER_PID_ENV] = str(os.getpid())
+        self.prepare_database()
+        self.sock = self._bind()
+
+        signal.signal(signal.SIGHUP, self._on_sighup)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        logger.info(
+            "🚀 Maestro %s escuchando en %s:%s con %s workers",
+            os.getpid(), settings.SERVER_HOST, settings.SERVER_PORT, self.num_workers
+        )
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                # Las migraciones del código nuevo van antes que sus workers
+                if self.prepare_database():
+                    self.rolling_restart()
+                else:
+                    logger.error("❌ Reinicio escalonado cancelado: fallaron las migraciones")
+            self.reap_workers()
+            self.check_ready()
+            self.check_memory()
+            self.maintain_pool()
+            time.sleep(SUPERVISE_INTERVAL)
+
+        self.shutdown()
+
+    def prepare_database(self) -> bool:
+        """
+        Aplicar migraciones una sola vez antes de crear los workers, para que no
+        compitan creando tablas
+        Se ejecutan en un proceso aparte: el maestro no importa app.database ni
+        app.migrations, y tras un SIGHUP se aplican las migraciones del código nuevo.
+        """
+        result = subprocess.run([sys.executable, "-m", "app.server", "--migrate"])
+        if result.returncode != 0:
+            logger.warning("⚠️ No se pudo verificar el esquema (código %s)", result.returncode)
+            return False
+        return True
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((settings.SERVER_HOST, settings.SERVER_PORT))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _on_sighup(self, signum, frame) -> None:
+        self._reload_requested = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    # ---------- workers ----------
+
+    def _worker_command(self, ready_fd: int) -> List[str]:
+        return [sys.executable, "-m", "app.server", "--worker", self.app, str(self.sock.fileno()), str(ready_fd)]
+
+    def spawn_worker(self) -> Worker:
+        """
+        Lanzar un worker en un intérprete nuevo que hereda el socket y el pipe de aviso
+        """
+        ready_r, ready_w = os.pipe()
+        os.set_inheritable(ready_w, True)
+        try:
+            pid = os.posix_spawn(sys.executable, self._worker_command(ready_w), os.environ)
+        except OSError:
+            os.close(ready_r)
+            raise
+        finally:
+            os.close(ready_w)
+
+        worker = Worker(pid, ready_r)
+        self.workers[pid] = worker
+        logger.info("👷 Worker %s iniciado", pid)
+        return worker
+
+    def reap_workers(self) -> None:
+        """
+        Recoger los workers terminados
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.ready_fd)
+            if not worker.ready:
+                self._boot_failed()
+            if not worker.stopping and not self._stopping:
+                logger.info("♻️ Worker %s terminó (código %s), será reemplazado", pid, os.waitstatus_to_exitcode(status))
+
+    def _boot_failed(self) -> None:
+        """
+        Un worker terminó sin llegar a estar listo: espaciar los reintentos
+        (1, 2, 4... hasta MAX_RESPAWN_BACKOFF segundos) para no entrar en un
+        ciclo de arranques fallidos
+        """
+        self._boot_failures += 1
+        delay = min(2.0 ** (self._boot_failures - 1), MAX_RESPAWN_BACKOFF)
+        self._respawn_at = time.monotonic() + delay
+        logger.warning("⚠️ Worker terminó antes de estar listo (fallas seguidas: %s), próximo intento en %.0fs",
+                       self._boot_failures, delay)
+
+    @staticmethod
+    def _read_ready(worker: Worker) -> bool:
+        """
+        Leer el aviso de arranque; el pipe también queda legible (EOF) cuando
+        el worker termina sin avisar, p.ej. si la app falla al importarse
+        """
+        try:
+            return os.read(worker.ready_fd, 1) == b"1"
+        except OSError:
+            return False
+
+    def _mark_ready(self, worker: Worker) -> None:
+        worker.ready = True
+        self._boot_failures = 0
+
+    def check_ready(self) -> None:
+        """
+        Marcar como listos los workers que ya notificaron su arranque
+        """
+        pending = {w.ready_fd: w for w in self.workers.values() if not w.ready}
+        if not pending:
+            return
+        readable, _, _ = select.select(list(pending), [], [], 0)
+        for fd in readable:
+            if self._read_ready(pending[fd]):
+                self._mark_ready(pending[fd])
+
+    def maintain_pool(self) -> None:
+        """
+        Mantener el número configurado de workers activos
+        Tras fallas de arranque seguidas se espera el backoff antes de crear otro.
+        """
+        if time.monotonic() < self._respawn_at:
+            return
+        active = [w for w in self.workers.values() if not w.stopping]
+        for _ in range(self.num_workers - len(active)):
+            self.spawn_worker()
+
+    def check_memory(self) -> None:
+        """
+        Reciclar workers que superan el límite de memoria
+        """
+        if settings.WORKER_MAX_MEMORY_MB <= 0 or time.monotonic() < self._respawn_at:
+            return
+        limit = settings.WORKER_MAX_MEMORY_MB * 1024 * 1024
+        for worker in list(self.workers.values()):
+            if worker.stopping or not worker.ready:
+                continue
+            rss = get_rss_bytes(worker.pid)
+            if rss is not None and rss > limit:
+                logger.warning(
+                    "⚠️ Worker %s usa %.1f MB (límite %s MB), reciclando",
+                    worker.pid, rss / 1024 / 1024, settings.WORKER_MAX_MEMORY_MB
+                )
+                self.replace_worker(worker)
+
+    def replace_worker(self, old: Worker) -> bool:
+        """
+        Levantar un worker nuevo y, cuando esté listo, detener el anterior
+        Si el nuevo no arranca se detiene y el anterior sigue atendiendo;
+        retorna False en ese caso.
+        """
+        new = self.spawn_worker()
+        if not self.wait_ready(new):
+            if new.pid in self.workers:
+                self.stop_worker(new)
+            return False
+        self.stop_worker(old)
+        return True
+
+    def wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + settings.WORKER_BOOT_TIMEOUT
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([worker.ready_fd], [], [], 0.2)
+            if readable and self._read_ready(worker):
+                self._mark_ready(worker)
+                return True
+            self.reap_workers()
+            if worker.pid not in self.workers:
+                return False
+        logger.warning("⚠️ Worker %s no arrancó en %ss", worker.pid, settings.WORKER_BOOT_TIMEOUT)
+        return False
+
+    def stop_worker(self, worker: Worker) -> None:
+        """
+        Detener un worker de forma ordenada (SIGTERM); uvicorn termina los requests en curso
+        """
+        worker.stopping = True
+        try:
+            os.kill(worker.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def rolling_restart(self) -> bool:
+        """
+        Reemplazar los workers uno por uno para no dejar de atender requests
+        Se aborta en el primer worker nuevo que no arranca (p.ej. código que
+        falla al importar): los workers anteriores que quedan siguen activos.
+        """
+        workers = [w for w in self.workers.values() if not w.stopping]
+        logger.info("🔄 Reinicio escalonado de %s workers", len(workers))
+        for replaced, worker in enumerate(workers):
+            if self._stopping:
+                return False
+            if not self.replace_worker(worker):
+                logger.error(
+                    "❌ Reinicio escalonado abortado: el worker nuevo no arrancó "
+                    "(%s de %s reemplazados, los demás siguen con la versión anterior)",
+                    replaced, len(workers)
+                )
+                return False
+        logger.info("✅ Reinicio escalonado completado")
+        return True
+
+    def shutdown(self) -> None:
+        logger.info("👋 Deteniendo %s workers...", len(self.workers))
+        for worker in list(self.workers.values()):
+            self.stop_worker(worker)
+
+        deadline = time.monotonic() + settings.WORKER_GRACEFUL_TIMEOUT + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+
+        for worker in list(self.workers.values()):
+            logger.warning("⚠️ Worker %s no terminó a tiempo, forzando cierre", worker.pid)
+            try:
+                os.kill(worker.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.reap_workers()
+        if self.sock is not None:
+            self.sock.close()
+
+
+def run_worker(app: str, sock_fd: int, ready_fd: int) -> None:
+    """
+    Proceso worker: servir la app con uvicorn sobre el socket compartido
+    """
+    import uvicorn
+
+    class NotifyingServer(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            # Avisar al maestro que el worker ya acepta conexiones
+            os.write(ready_fd, b"1")
+            os.close(ready_fd)
+
+    max_requests = None
+    if settings.WORKER_MAX_REQUESTS > 0:
+        max_requests = settings.WORKER_MAX_REQUESTS + random.randint(0, max(settings.WORKER_MAX_REQUESTS_JITTER, 0))
+
+    config = uvicorn.Config(
+        app,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.WORKER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+    NotifyingServer(config).run(sockets=[socket.socket(fileno=sock_fd)])
+
+
+def migrate() -> int:
+    from app.database import init_db
+    try:
+        init_db()
+    except Exception:
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="Servidor de producción multi-proceso")
+    parser.add_argument("--migrate", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", nargs=3, metavar=("APP", "SOCKET_FD", "READY_FD"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.migrate:
+        return migrate()
+    if args.worker:
+        app, sock_fd, ready_fd = args.worker
+        run_worker(app, int(sock_fd), int(ready_fd))
+        return 0
+    Master().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.services.readers import FileSource, sheet_dimensions
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Costo mínimo de una operación (abrir el archivo, pandas, respuesta)
+MIN_COST_BYTES = 1024 * 1024
+
+# Peso del último valor en el promedio móvil de la duración de las operaciones
+HOLD_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejectedError(Exception):
+    """
+    La operación no cabe en el presupuesto de memoria (cola llena o espera agotada)
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_cost(file_content: FileSource, sheet_names: Optional[List[str]] = None,
+                  offset: int = 0, limit: Optional[int] = None) -> int:
+    """
+    Memoria estimada (bytes) para procesar las hojas de un archivo
+    Filas (según los metadatos del archivo, o extrapoladas en CSV) × columnas
+    × EXCEL_BYTES_PER_CELL. `sheet_names` None = todas las hojas; `offset` y
+    `limit` acotan las filas como en el preview.
+    """
+    cells = 0
+    for rows, columns in sheet_dimensions(file_content, sheet_names).values():
+        rows = max(rows - offset, 0)
+        if limit is not None:
+            rows = min(rows, limit)
+        cells += rows * columns
+    return max(cells * settings.EXCEL_BYTES_PER_CELL, MIN_COST_BYTES)
+
+
+class Reservation:
+    """
+    Memoria reservada por una operación admitida (ver MemoryAdmission.acquire)
+    """
+    __slots__ = ("cost", "admitted_at")
+
+    def __init__(self, cost: int):
+        self.cost = cost
+        self.admitted_at = time.monotonic()
+
+
+class MemoryAdmission:
+    """
+    Control de admisión por presupuesto de memoria (uno por worker)
+    Cada operación reserva su costo estimado mientras se ejecuta; si no cabe
+    espera en una cola FIFO hasta `timeout` segundos. Con la cola llena o la
+    espera agotada se rechaza con AdmissionRejectedError (HTTP 429). Una
+    operación más grande que el presupuesto se admite cuando no hay otra en curso.
+    Se usa desde el event loop: el trabajo pesado debe ir a un hilo
+    (asyncio.to_thread) mientras la reserva está tomada.
+    """
+
+    def __init__(self, budget_bytes: int, max_queue: int, timeout: float):
+        self.budget = max(budget_bytes, MIN_COST_BYTES)
+        self.max_queue = max(max_queue, 0)
+        self.timeout = timeout
+        self.in_use = 0
+        self.active = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self._wait_total = 0.0
+        self.max_wait = 0.0
+        self._hold_avg: Optional[float] = None
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_use + cost <= self.budget
+
+    def _take(self, cost: int) -> None:
+        self.in_use += cost
+        self.active += 1
+
+    def _release(self, cost: int) -> None:
+        self.in_use -= cost
+        self.active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # En orden de llegada: una operación grande no queda postergada por otras chicas
+        while self._waiters and self._fits(self._waiters[0][0]):
+            cost, waiter = self._waiters.popleft()
+            self._take(cost)
+            waiter.set_result(None)
+
+    def retry_after(self) -> int:
+        """
+        Segundos sugeridos para reintentar (duración promedio de las operaciones)
+        """
+        hold = self._hold_avg if self._hold_avg is not None else self.timeout
+        return max(int(math.ceil(hold)), 1)
+
+    def _reject(self, operation: str, reason: str) -> AdmissionRejectedError:
+        self.rejected += 1
+        retry_after = self.retry_after()
+        logger.warning(
+            "⏳ %s rechazado (%s): %.0f/%.0f MB en uso, %s en cola",
+            operation, reason, self.in_use / 1024 / 1024, self.budget / 1024 / 1024, len(self._waiters),
+            extra={"operation": operation, "queue_depth": len(self._waiters), "retry_after": retry_after}
+        )
+        return AdmissionRejectedError(
+            f"Capacidad de procesamiento de archivos agotada ({reason}), reintente en {retry_after} s",
+            retry_after
+        )
+
+    async def acquire(self, cost: int, operation: str) -> Reservation:
+        """
+        Esperar a que `cost` bytes quepan en el presupuesto y reservarlos
+        Cada reserva debe liberarse con release(); para un bloque, usar reserve().
+        """
+        cost = min(max(cost, MIN_COST_BYTES), self.budget)
+        start = time.monotonic()
+        if not self._waiters and self._fits(cost):
+            self._take(cost)
+        else:
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject(operation, "cola llena")
+            waiter = asyncio.get_running_loop().create_future()
+            entry = (cost, waiter)
+            self._waiters.append(entry)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            try:
+                await asyncio.wait_for(waiter, self.timeout)
+            except BaseException as e:
+                if waiter.done() and not waiter.cancelled():
+                    # Admitido justo cuando expiró la espera (o se canceló el request)
+                    self._release(cost)
+                else:
+                    self._waiters.remove(entry)
+                    self._wake()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._reject(operation, "tiempo de espera agotado") from None
+                raise
+            self.queued += 1
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self._wait_total += waited
+        self.max_wait = max(self.max_wait, waited)
+        return Reservation(cost)
+
+    def release(self, reservation: Reservation) -> None:
+        hold = time.monotonic() - reservation.admitted_at
+        self._hold_avg = hold if self._hold_avg is None else (
+            HOLD_EWMA_ALPHA * hold + (1 - HOLD_EWMA_ALPHA) * self._hold_avg
+        )
+        self._release(reservation.cost)
+
+    @asynccontextmanager
+    async def reserve(self, cost: int, operation: str) -> AsyncIterator[None]:
+        """
+        Reservar `cost` bytes del presupuesto mientras dura el bloque
+        """
+        reservation = await self.acquire(cost, operation)
+        try:
+            yield
+        finally:
+            self.release(reservation)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_mb": round(self.budget / 1024 / 1024, 1),
+            "in_use_mb": round(self.in_use / 1024 / 1024, 1),
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_duration_ms": round(self._hold_avg * 1000, 1) if self._hold_avg is not None else None,
+            "retry_after": self.retry_after(),
+        }
+
+
+excel_admission = MemoryAdmission(
+    settings.EXCEL_MEMORY_BUDGET_MB * 1024 * 1024, settings.EXCEL_ADMISSION_MAX_QUEUE, settings.EXCEL_ADMISSION_TIMEOUT
+)
@@ -0,0 +1,254 @@
+import threading
+import time
+from typing import Dict, List, Any, Optional, Sequence, TYPE_CHECKING
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import Employee, SexoEnum
+from app.utils.logger_config import get_logger
+
+# numpy se importa dentro de los métodos (ver excel_service): el snapshot solo
+# se construye cuando alguien consulta /statistics/advanced
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+SEXO_CATEGORIES: List[str] = [s.value for s in SexoEnum]
+SEXO_CODES: Dict[str, int] = {name: code for code, name in enumerate(SEXO_CATEGORIES)}
+REFERENCE_SEXO = SexoEnum.MASCULINO.value
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+INITIAL_CAPACITY = 1024
+
+
+def _sexo_value(sexo: Any) -> str:
+    return sexo.value if isinstance(sexo, SexoEnum) else str(sexo)
+
+
+class PayrollSnapshot:
+    """
+    Snapshot columnar en memoria de la tabla employees
+    Columnas numpy: id, edad, sueldo, sexo (código int8) y cargo (código int32).
+    Se carga una vez desde la BD y luego se actualiza con cada escritura de crud.py;
+    las cargas masivas o los cambios hechos por otros workers se cubren recargando
+    cuando el snapshot se invalida o supera ANALYTICS_MAX_AGE segundos.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._size = 0
+        self._index: Dict[int, int] = {}
+        self._cargo_names: List[str] = []
+        self._cargo_codes: Dict[str, int] = {}
+        self._ids = self._edad = self._sueldo = self._sexo = self._cargo = None
+
+    # ---------- carga ----------
+
+    def _allocate(self, capacity: int) -> None:
+        import numpy as np
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._edad = np.zeros(capacity, dtype=np.int16)
+        self._sueldo = np.zeros(capacity, dtype=np.float64)
+        self._sexo = np.zeros(capacity, dtype=np.int8)
+        self._cargo = np.zeros(capacity, dtype=np.int32)
+
+    def _grow(self) -> None:
+        import numpy as np
+        capacity = max(len(self._ids) * 2, INITIAL_CAPACITY)
+        for name in ("_ids", "_edad", "_sueldo", "_sexo", "_cargo"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _cargo_code(self, cargo: str) -> int:
+        code = self._cargo_codes.get(cargo)
+        if code is None:
+            code = len(self._cargo_names)
+            self._cargo_names.append(cargo)
+            self._cargo_codes[cargo] = code
+        return code
+
+    def load(self, db: Session) -> None:
+        """
+        Cargar todas las filas desde la BD (solo las 5 columnas necesarias)
+        """
+        import numpy as np
+        start = time.perf_counter()
+        rows = db.query(Employee.id, Employee.edad, Employee.sueldo, Employee.sexo, Employee.cargo).all()
+
+        with self._lock:
+            self._size = len(rows)
+            self._allocate(max(self._size * 2, INITIAL_CAPACITY))
+            self._cargo_names, self._cargo_codes = [], {}
+            if rows:
+                ids, edades, sueldos, sexos, cargos = zip(*rows)
+                self._ids[:self._size] = np.fromiter(ids, dtype=np.int64, count=self._size)
+                self._edad[:self._size] = np.fromiter(edades, dtype=np.int16, count=self._size)
+                self._sueldo[:self._size] = np.fromiter(sueldos, dtype=np.float64, count=self._size)
+                self._sexo[:self._size] = np.fromiter(
+                    (SEXO_CODES[_sexo_value(s)] for s in sexos), dtype=np.int8, count=self._size
+                )
+                self._cargo[:self._size] = np.fromiter(
+                    (self._cargo_code(c) for c in cargos), dtype=np.int32, count=self._size
+                )
+            self._index = {int(emp_id): row for row, emp_id in enumerate(self._ids[:self._size])}
+            self._loaded_at = time.monotonic()
+            self._stale = False
+
+        logger.info(
+            "📊 Snapshot de analítica cargado: %s empleados en %.1f ms",
+            self._size, (time.perf_counter() - start) * 1000
+        )
+
+    def ensure_fresh(self, db: Session) -> None:
+        """
+        Recargar si el snapshot está invalidado o es demasiado antiguo
+        """
+        with self._lock:
+            expired = self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.max_age
+            if not (self._stale or expired):
+                return
+        self.load(db)
+
+    # ---------- actualizaciones incrementales ----------
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def upsert(self, employee: Employee) -> None:
+        """
+        Reflejar una inserción o actualización de un empleado
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            row = self._index.get(employee.id)
+            if row is None:
+                if self._size == len(self._ids):
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._index[employee.id] = row
+            self._ids[row] = employee.id
+            self._edad[row] = employee.edad
+            self._sueldo[row] = employee.sueldo
+            self._sexo[row] = SEXO_CODES[_sexo_value(employee.sexo)]
+            self._cargo[row] = self._cargo_code(employee.cargo)
+
+    def delete(self, employee_id: int) -> None:
+        """
+        Reflejar la eliminación de un empleado (se mueve la última fila al hueco)
+        """
+        with self._lock:
+            row = self._index.pop(employee_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                for column in (self._ids, self._edad, self._sueldo, self._sexo, self._cargo):
+                    column[row] = column[last]
+                self._index[int(self._ids[row])] = row
+            self._size = last
+
+    def invalidate(self) -> None:
+        """
+        Forzar recarga en la próxima consulta (p.ej. tras una importación masiva)
+        """
+        with self._lock:
+            self._stale = True
+
+    # ---------- consultas vectorizadas ----------
+
+    def advanced_statistics(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, bins: int = 10) -> Dict[str, Any]:
+        """
+        Percentiles, histogramas, pivote cargo×sexo y brecha salarial
+        """
+        import numpy as np
+        with self._lock:
+            n = self._size
+            sueldo = self._sueldo[:n].copy()
+            edad = self._edad[:n].copy()
+            sexo = self._sexo[:n].copy()
+            cargo = self._cargo[:n].copy()
+            cargo_names = list(self._cargo_names)
+
+        result: Dict[str, Any] = {"total_employees": int(n)}
+        if n == 0:
+            result.update({"salary_percentiles": {}, "age_percentiles": {}, "salary_histogram": None,
+                           "age_histogram": None, "pivot": [], "pay_gap": None})
+            return result
+
+        result["salary_percentiles"] = self._percentiles(sueldo, percentiles)
+        result["age_percentiles"] = self._percentiles(edad, percentiles)
+        result["salary_histogram"] = self._histogram(sueldo, bins)
+        result["age_histogram"] = self._histogram(edad, bins)
+
+        # Pivote cargo × sexo con bincount sobre una clave combinada
+        n_sexo, n_cargo = len(SEXO_CATEGORIES), len(cargo_names)
+        key = cargo.astype(np.int64) * n_sexo + sexo
+        counts = np.bincount(key, minlength=n_cargo * n_sexo).reshape(n_cargo, n_sexo)
+        sums = np.bincount(key, weights=sueldo, minlength=n_cargo * n_sexo).reshape(n_cargo, n_sexo)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+
+        ref = SEXO_CODES[REFERENCE_SEXO]
+        pivot = []
+        for code in np.flatnonzero(counts.sum(axis=1)):
+            pivot.append({
+                "cargo": cargo_names[code],
+                "total_employees": int(counts[code].sum()),
+                "by_sexo": {
+                    SEXO_CATEGORIES[s]: {
+                        "total_employees": int(counts[code, s]),
+                        "average_salary": round(float(means[code, s]), 2),
+                    }
+                    for s in range(n_sexo) if counts[code, s] > 0
+                },
+                "pay_gap_ratio": self._ratios(means[code], ref),
+            })
+        result["pivot"] = pivot
+
+        # Brecha global: salario promedio de cada sexo respecto al de referencia
+        sexo_counts = counts.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sexo_means = np.where(sexo_counts > 0, sums.sum(axis=0) / sexo_counts, np.nan)
+        result["pay_gap"] = {
+            "reference": REFERENCE_SEXO,
+            "average_salary": {
+                SEXO_CATEGORIES[s]: round(float(sexo_means[s]), 2)
+                for s in range(n_sexo) if sexo_counts[s] > 0
+            },
+            "ratio": self._ratios(sexo_means, ref),
+        }
+        return result
+
+    @staticmethod
+    def _percentiles(values: "np.ndarray", percentiles: Sequence[float]) -> Dict[str, float]:
+        import numpy as np
+        computed = np.percentile(values, percentiles)
+        return {f"p{p:g}": round(float(v), 2) for p, v in zip(percentiles, computed)}
+
+    @staticmethod
+    def _histogram(values: "np.ndarray", bins: int) -> Dict[str, List[float]]:
+        import numpy as np
+        counts, edges = np.histogram(values, bins=bins)
+        return {"counts": counts.tolist(), "edges": [round(float(e), 2) for e in edges]}
+
+    @staticmethod
+    def _ratios(means: "np.ndarray", ref: int) -> Dict[str, float]:
+        import numpy as np
+        if np.isnan(means[ref]) or means[ref] == 0:
+            return {}
+        return {
+            SEXO_CATEGORIES[s]: round(float(means[s] / means[ref]), 4)
+            for s in range(len(means)) if s != ref and not np.isnan(means[s])
+        }
+
+
+payroll_snapshot = PayrollSnapshot(settings.ANALYTICS_MAX_AGE)
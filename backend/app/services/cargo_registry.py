@@ -0,0 +1,152 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from app.database import engine
+from app.models import Cargo
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# insert() con "ignorar duplicados" de cada dialecto (ON DUPLICATE KEY / ON CONFLICT DO NOTHING)
+_UPSERT_DIALECTS = {
+    "mysql": lambda table: mysql.insert(table).on_duplicate_key_update(id=table.c.id),
+    "mariadb": lambda table: mysql.insert(table).on_duplicate_key_update(id=table.c.id),
+    "postgresql": lambda table: postgresql.insert(table).on_conflict_do_nothing(),
+    "sqlite": lambda table: sqlite.insert(table).on_conflict_do_nothing(),
+}
+
+
+def _insert_ignoring_duplicates(conn: Connection, names: List[str]) -> int:
+    """
+    Insertar los cargos de `names` que no existan; retorna cuántos se crearon
+    Un duplicado no descarta a los demás nombres del lote. En dialectos sin
+    upsert cada nombre va en su propio savepoint.
+    """
+    table = Cargo.__table__
+    upsert = _UPSERT_DIALECTS.get(conn.dialect.name)
+    if upsert is not None:
+        result = conn.execute(upsert(table), [{"nombre": name} for name in names])
+        # MySQL cuenta 0 por fila ignorada (id = id no cambia nada)
+        return max(result.rowcount, 0)
+    created = 0
+    for name in names:
+        try:
+            with conn.begin_nested():
+                conn.execute(table.insert(), {"nombre": name})
+            created += 1
+        except IntegrityError:
+            pass
+    return created
+
+
+class CargoRegistry:
+    """
+    Mapa nombre ↔ id del catálogo `cargos`, cacheado en memoria
+    Los ids no cambian una vez creados, así que el cache de cada worker nunca
+    queda desactualizado: un nombre desconocido solo provoca una consulta.
+    Los cargos nuevos se insertan en su propia transacción (ya confirmada),
+    de modo que un rollback del request no deja ids huérfanos en el cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+
+    def _remember(self, rows: Iterable) -> None:
+        with self._lock:
+            for cargo_id, nombre in rows:
+                self._ids[nombre] = cargo_id
+                self._names[cargo_id] = nombre
+
+    def load(self) -> int:
+        """
+        Cargar el catálogo completo (warm-up)
+        """
+        with engine.connect() as conn:
+            rows = conn.execute(select(Cargo.id, Cargo.nombre)).all()
+        self._remember(rows)
+        return len(rows)
+
+    def ids_for(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Ids de varios cargos, creando los que no existen (una consulta por lote)
+        """
+        wanted = set(names)
+        with self._lock:
+            missing = [name for name in wanted if name not in self._ids]
+        if missing:
+            self._resolve(missing)
+        with self._lock:
+            return {name: self._ids[name] for name in wanted}
+
+    def get_id(self, name: str) -> int:
+        return self.ids_for([name])[name]
+
+    def existing_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Ids de los cargos que ya existen (sin crear los desconocidos)
+        """
+        wanted = set(names)
+        with self._lock:
+            missing = any(name not in self._ids for name in wanted)
+        if missing:
+            self.load()
+        with self._lock:
+            return {name: self._ids[name] for name in wanted if name in self._ids}
+
+    def name(self, cargo_id: int) -> Optional[str]:
+        with self._lock:
+            known = self._names.get(cargo_id)
+        if known is None:
+            self.load()
+            known = self._names.get(cargo_id)
+        return known
+
+    def _resolve(self, names: List[str]) -> None:
+        """
+        Crear los cargos que faltan y cachear los ids de `names`
+        La inserción ignora los nombres que ya existen (los creó otro worker
+        al mismo tiempo, o son iguales según la collation), y la lectura se
+        hace en una transacción nueva: con REPEATABLE READ (MySQL) la misma
+        transacción no vería las filas que otro worker acaba de confirmar.
+        """
+        with engine.connect() as conn:
+            existing = conn.execute(select(Cargo.id, Cargo.nombre).where(Cargo.nombre.in_(names))).all()
+        found = {nombre for _, nombre in existing}
+        new = [name for name in names if name not in found]
+        if new:
+            with engine.begin() as conn:
+                created = _insert_ignoring_duplicates(conn, new)
+            logger.info("🏷️ %s cargos nuevos en el catálogo", created, extra={"cargos": created})
+            with engine.connect() as conn:
+                existing = conn.execute(select(Cargo.id, Cargo.nombre).where(Cargo.nombre.in_(names))).all()
+        self._remember(existing)
+
+        with self._lock:
+            unresolved = [name for name in names if name not in self._ids]
+        if not unresolved:
+            return
+        # La BD devolvió el nombre con otra forma (collation que ignora mayúsculas o
+        # acentos, p.ej. utf8mb4_unicode_ci): se busca cada uno con la comparación de la BD
+        with engine.connect() as conn:
+            matches = {
+                name: conn.execute(select(Cargo.id).where(Cargo.nombre == name).limit(1)).scalar()
+                for name in unresolved
+            }
+        missing = [name for name, cargo_id in matches.items() if cargo_id is None]
+        if missing:
+            raise ValueError(f"No se pudieron registrar los cargos en el catálogo: {', '.join(sorted(missing))}")
+        with self._lock:
+            self._ids.update(matches)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+
+cargo_registry = CargoRegistry()
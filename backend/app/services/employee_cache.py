@@ -0,0 +1,206 @@
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+from app.config import get_settings
+from app.models import Employee
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class CachedEmployee:
+    """
+    Copia compacta (con __slots__) de un empleado, desacoplada de la sesión ORM
+    Compatible con EmployeeResponse.from_orm.
+    """
+    __slots__ = ("id", "nombre", "edad", "sexo", "cargo", "cargo_id", "sueldo", "created_at", "updated_at")
+
+    def __init__(self, id, nombre, edad, sexo, cargo, cargo_id, sueldo, created_at, updated_at):
+        self.id = id
+        self.nombre = nombre
+        self.edad = edad
+        self.sexo = sexo
+        self.cargo = cargo
+        self.cargo_id = cargo_id
+        self.sueldo = sueldo
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_model(cls, employee: Employee) -> "CachedEmployee":
+        return cls(
+            employee.id, employee.nombre, employee.edad, employee.sexo,
+            employee.cargo, employee.cargo_id, employee.sueldo, employee.created_at, employee.updated_at
+        )
+
+
+class CacheBackend(ABC):
+    """
+    Interfaz de almacenamiento del cache
+    Un backend compartido entre workers (p.ej. Redis) debe implementar estos
+    métodos y registrarse con register_backend(); si le falta alguno, falla al
+    instanciarse (TypeError) y no en la primera lectura.
+    """
+
+    @abstractmethod
+    def get(self, key: int) -> Optional[CachedEmployee]:
+        ...
+
+    @abstractmethod
+    def set(self, key: int, value: CachedEmployee) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: int) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class LocalLRUBackend(CacheBackend):
+    """
+    LRU acotado en memoria del proceso (también sirve de stand-in del backend compartido)
+    Con varios workers cada proceso tiene su propio LRU: el TTL acota cuánto
+    tiempo puede servirse una entrada modificada desde otro worker.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expira_en, valor)
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: int) -> Optional[CachedEmployee]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: int, value: CachedEmployee) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: int) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "local",
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class NullBackend(CacheBackend):
+    """
+    Cache deshabilitado (EMPLOYEE_CACHE_BACKEND=none)
+    """
+
+    def get(self, key: int) -> Optional[CachedEmployee]:
+        return None
+
+    def set(self, key: int, value: CachedEmployee) -> None:
+        pass
+
+    def delete(self, key: int) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "none"}
+
+
+_BACKENDS: Dict[str, Callable[[], CacheBackend]] = {
+    "local": lambda: LocalLRUBackend(settings.EMPLOYEE_CACHE_SIZE, settings.EMPLOYEE_CACHE_TTL),
+    "none": NullBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], CacheBackend]) -> None:
+    """
+    Registrar un backend adicional seleccionable con EMPLOYEE_CACHE_BACKEND
+    """
+    _BACKENDS[name] = factory
+
+
+def create_backend(name: str) -> CacheBackend:
+    factory = _BACKENDS.get(name)
+    if factory is None:
+        logger.warning("⚠️ Backend de cache desconocido '%s', usando 'local'", name)
+        factory = _BACKENDS["local"]
+    return factory()
+
+
+class EmployeeCache:
+    """
+    Cache read-through de empleados por ID
+    crud.py lo mantiene coherente: las escrituras actualizan o invalidan la entrada.
+    """
+
+    def __init__(self, backend_name: str):
+        self.backend_name = backend_name
+        self._backend: Optional[CacheBackend] = None
+
+    @property
+    def backend(self) -> CacheBackend:
+        # Se crea en el primer uso para permitir register_backend() durante el arranque
+        if self._backend is None:
+            self._backend = create_backend(self.backend_name)
+        return self._backend
+
+    def get(self, employee_id: int) -> Optional[CachedEmployee]:
+        return self.backend.get(employee_id)
+
+    def put(self, employee: Employee) -> CachedEmployee:
+        cached = CachedEmployee.from_model(employee)
+        self.backend.set(employee.id, cached)
+        return cached
+
+    def invalidate(self, employee_id: int) -> None:
+        self.backend.delete(employee_id)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+employee_cache = EmployeeCache(settings.EMPLOYEE_CACHE_BACKEND)
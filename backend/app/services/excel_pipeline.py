@@ -0,0 +1,273 @@
+"""
+Validación e importación de archivos con reporte de progreso
+
+Las funciones run_* son síncronas (se ejecutan en un hilo) y reportan
+eventos con un callback; stream_* las ejecutan en segundo plano publicando
+los eventos en un EventStream (Server-Sent Events) y liberan al terminar la
+memoria reservada en el control de admisión, aunque el cliente se desconecte.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from app import crud
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.admission import Reservation, excel_admission
+from app.services.excel_service import ExcelService, ProgressCallback
+from app.services.import_telemetry import SheetImport
+from app.services.readers import FileSource, sheet_dimensions
+from app.utils.logger_config import get_logger
+from app.utils.sse import EventStream
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Errores de una hoja incluidos en su evento sheet_done (el total va en error_count)
+EVENT_MAX_ERRORS = 100
+
+# Políticas de IMPORT_TRANSACTION_POLICY (ver run_import)
+IMPORT_POLICIES = ("all_or_nothing", "best_effort")
+
+# Tareas en curso (referencia fuerte hasta que terminan)
+_tasks: Set[asyncio.Task] = set()
+
+
+class RowProgress:
+    """
+    Filas procesadas y tiempo restante estimado de una operación sobre varias hojas
+    """
+
+    def __init__(self, total_rows: int):
+        self.total_rows = total_rows
+        self.completed = 0  # Filas de las hojas terminadas
+        self._start = time.perf_counter()
+
+    def snapshot(self, sheet_rows: int) -> Dict[str, Any]:
+        done = self.completed + sheet_rows
+        total = max(self.total_rows, done)
+        elapsed = time.perf_counter() - self._start
+        return {
+            "rows_done": done,
+            "total_rows": total,
+            "percent": round(done / total * 100, 1) if total else 100.0,
+            "eta_seconds": round(elapsed / done * (total - done), 1) if done else None,
+        }
+
+    def finish_sheet(self, rows: int) -> None:
+        self.completed += rows
+
+    def skip_sheet(self, rows: int) -> None:
+        """Descontar del total las filas de una hoja que no se procesará"""
+        self.total_rows = max(self.total_rows - rows, self.completed)
+
+
+def _noop(event: str, data: Dict[str, Any]) -> None:
+    pass
+
+
+def run_validation(file_content: FileSource, emit: ProgressCallback = _noop) -> Dict[str, Any]:
+    """
+    Validación completa con eventos started / sheet_started / progress / sheet_done
+    Los eventos progress incluyen los errores acumulados de todo el archivo y el ETA.
+    """
+    dimensions = sheet_dimensions(file_content)
+    progress = RowProgress(sum(rows for rows, _ in dimensions.values()))
+    errors_before = 0
+    emit("started", {"operation": "validate", "sheets": list(dimensions), "total_rows": progress.total_rows})
+
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        nonlocal errors_before
+        if event == "progress":
+            data = {**data, **progress.snapshot(data["rows_validated"]), "errors_total": errors_before + data["errors"]}
+        elif event == "sheet_done":
+            progress.finish_sheet(data["rows"])
+            errors_before += len(data["errors"])
+            data = {**data, "errors": data["errors"][:EVENT_MAX_ERRORS], "error_count": len(data["errors"])}
+        emit(event, data)
+
+    return ExcelService.validate_file(file_content, "full", on_event)
+
+
+def run_import(db: Session, file_content: FileSource, sheet_names: List[str], filename: str,
+               emit: ProgressCallback = _noop, policy: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Importar hoja por hoja en una sola transacción y registrar cada hoja en data_imported
+    Cada hoja se inserta dentro de un savepoint; los registros de importación
+    (y los errores de las hojas fallidas) se agregan juntos y todo se confirma
+    con un único commit al final. `policy` (por defecto IMPORT_TRANSACTION_POLICY):
+    - all_or_nothing: la primera hoja que falla aborta la importación (excepción)
+    - best_effort: la hoja que falla se descarta sola (rollback a su savepoint),
+      queda registrada con status "error" y se continúa con las demás
+    Eventos: started, sheet_started (hoja leída y transformada), progress (cada
+    lote insertado), sheet_done (hoja insertada, con su telemetría) y
+    sheet_failed (best_effort). Sin filas ni fallas no se confirma nada.
+    """
+    policy = policy or settings.IMPORT_TRANSACTION_POLICY
+    if policy not in IMPORT_POLICIES:
+        raise ValueError(f"Política de importación inválida: {policy} (opciones: {', '.join(IMPORT_POLICIES)})")
+    best_effort = policy == "best_effort"
+    batch_size = settings.IMPORT_INSERT_BATCH
+    dimensions = sheet_dimensions(file_content, sheet_names)
+    progress = RowProgress(sum(rows for rows, _ in dimensions.values()))
+    emit("started", {
+        "operation": "import", "policy": policy, "sheets": list(dimensions), "total_rows": progress.total_rows
+    })
+
+    imported_sheets: List[SheetImport] = []
+    failed_sheets: List[SheetImport] = []
+
+    def sheet_failed(sheet: SheetImport) -> None:
+        progress.skip_sheet(dimensions.get(sheet.sheet_name, (0, 0))[0])
+        failed_sheets.append(sheet)
+        emit("sheet_failed", {"sheet": sheet.sheet_name, "error": sheet.error})
+
+    for sheet in ExcelService.iter_import_sheets(file_content, sheet_names, skip_invalid=best_effort):
+        if sheet.error is not None:
+            sheet_failed(sheet)
+            continue
+        emit("sheet_started", {"sheet": sheet.sheet_name, "rows": sheet.rows, **{
+            f"{stage}_ms": round(sheet.timings[stage], 1) for stage in ("read", "validate", "transform")
+        }})
+
+        def on_batch(rows: int, sheet_name: str = sheet.sheet_name) -> None:
+            emit("progress", {"sheet": sheet_name, "rows_inserted": rows, **progress.snapshot(rows)})
+
+        savepoint = db.begin_nested()
+        try:
+            with sheet.stage("insert"):
+                sheet.rows, sheet.insert_batches = crud.add_employees_bulk(db, sheet.records, batch_size, on_batch)
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            if not best_effort:
+                raise
+            logger.warning("⚠️ Hoja '%s' descartada: %s", sheet.sheet_name, e)
+            sheet.error, sheet.rows = str(e), 0
+            sheet_failed(sheet)
+            continue
+        sheet.insert_batch_size = batch_size
+        progress.finish_sheet(sheet.rows)
+        imported_sheets.append(sheet)
+        # El pico de memoria de la hoja se conoce al pedir la siguiente (va en el resumen final)
+        telemetry = {key: value for key, value in sheet.telemetry().items() if key != "peak_memory_mb"}
+        emit("sheet_done", {"sheet": sheet.sheet_name, "rows": sheet.rows, **telemetry})
+
+    imported_count = sum(sheet.rows for sheet in imported_sheets)
+    summary: Dict[str, Any] = {
+        "imported_rows": imported_count,
+        "sheets_processed": len(imported_sheets),
+        "filename": filename,
+        "policy": policy,
+    }
+    if not imported_count and not failed_sheets:
+        db.rollback()
+        return summary
+
+    # Registrar la importación (una fila por hoja) en la misma transacción
+    records = [
+        {"sheet_name": sheet.sheet_name, "rows_imported": sheet.rows, "file_name": filename,
+         "status": "success", **sheet.telemetry()}
+        for sheet in imported_sheets
+    ] + [
+        {"sheet_name": sheet.sheet_name, "rows_imported": 0, "file_name": filename,
+         "status": "error", "error_count": 1}
+        for sheet in failed_sheets
+    ]
+    imports = crud.add_import_records(db, records)
+    crud.add_error_records(db, [
+        {"import_id": record.id, "sheet_name": sheet.sheet_name, "error_type": "IMPORT_ERROR",
+         "error_message": sheet.error, "file_name": filename}
+        for sheet, record in zip(failed_sheets, imports[len(imported_sheets):])
+    ])
+    if imported_count:
+        crud.commit_employees_bulk(db, imported_count)
+    else:
+        db.commit()
+
+    sheets_summary = []
+    for sheet, record in zip(imported_sheets, imports):
+        telemetry = sheet.telemetry()
+        sheets_summary.append({"import_id": record.id, "sheet_name": sheet.sheet_name, "rows": sheet.rows, **telemetry})
+        logger.info(
+            "📊 Hoja '%s': %s filas en %.1f ms (%s filas/s, pico %s MB)",
+            sheet.sheet_name, sheet.rows, telemetry["total_ms"], telemetry["rows_per_second"],
+            telemetry["peak_memory_mb"], extra=telemetry
+        )
+    summary["sheets"] = sheets_summary
+    summary["failed_sheets"] = [
+        {"import_id": record.id, "sheet_name": sheet.sheet_name, "error": sheet.error}
+        for sheet, record in zip(failed_sheets, imports[len(imported_sheets):])
+    ]
+    return summary
+
+
+def record_import_failure(db: Session, filename: str, error: Exception) -> None:
+    """
+    Registrar la importación fallida y su error (después de descartar lo insertado)
+    """
+    try:
+        db.rollback()
+        record, = crud.add_import_records(db, [
+            {"sheet_name": "ALL", "rows_imported": 0, "file_name": filename, "status": "error", "error_count": 1}
+        ])
+        crud.add_error_records(db, [
+            {"import_id": record.id, "sheet_name": "ALL", "error_type": "IMPORT_ERROR",
+             "error_message": str(error), "file_name": filename}
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error registrando la importación fallida: %s", e)
+
+
+def _start(coro: Coroutine[Any, Any, None]) -> None:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _run_streamed(stream: EventStream, reservation: Reservation,
+                        work: Callable[[], Dict[str, Any]], on_error: Optional[Callable[[Exception], None]] = None) -> None:
+    try:
+        result = await asyncio.to_thread(work)
+        stream.emit("done", result)
+    except Exception as e:
+        logger.error("Error en operación con progreso: %s", e)
+        if on_error is not None:
+            await asyncio.to_thread(on_error, e)
+        stream.emit("error", {"message": str(e)})
+    finally:
+        excel_admission.release(reservation)
+        stream.close()
+
+
+def stream_validation(reservation: Reservation, file_content: FileSource) -> EventStream:
+    """
+    Iniciar la validación completa en segundo plano; retorna su stream de eventos
+    """
+    stream = EventStream()
+    _start(_run_streamed(stream, reservation, lambda: run_validation(file_content, stream.emit)))
+    return stream
+
+
+def stream_import(reservation: Reservation, file_content: FileSource, sheet_names: List[str], filename: str) -> EventStream:
+    """
+    Iniciar la importación en segundo plano (con su propia sesión de BD); retorna su stream de eventos
+    La importación continúa aunque el cliente cierre la conexión.
+    """
+    stream = EventStream()
+    db = SessionLocal()
+
+    async def run() -> None:
+        try:
+            await _run_streamed(
+                stream, reservation,
+                lambda: run_import(db, file_content, sheet_names, filename, stream.emit),
+                lambda e: record_import_failure(db, filename, e),
+            )
+        finally:
+            db.close()
+
+    _start(run())
+    return stream
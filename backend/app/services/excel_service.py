@@ -1,13 +1,34 @@
-import pandas as pd
-from typing import Dict, List, Any, Tuple
-from io import BytesIO
+import sys
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple, TYPE_CHECKING
+from app.services.import_telemetry import PeakMemorySampler, SheetImport
+from app.services.readers import FileSource, count_rows_cached, get_reader_for
 from app.utils.helpers import normalize_column_name, has_special_characters, validate_required_columns
 from app.utils.logger_config import get_logger
 
+# pandas (y el engine de Excel) se importan dentro de cada método para no
+# cargarlos al arrancar la API; el warm-up en segundo plano los precarga.
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = get_logger(__name__)
 
 REQUIRED_COLUMNS = {"nombre", "edad", "sexo", "cargo", "sueldo"}
 VALID_SEXO_VALUES = {"masculino", "femenino", "otro"}
+SEXO_CANONICAL = {"masculino": "Masculino", "femenino": "Femenino", "otro": "Otro"}
+
+# Texto de una celda vacía al importar (el mismo que daba str(NaN) fila por fila)
+MISSING_TEXT = "nan"
+
+PREVIEW_DEFAULT_LIMIT = 100
+
+# full: valida todas las filas; headers: solo la fila de encabezado de cada hoja
+VALIDATION_MODES = ("full", "headers")
+
+# Cada cuántas filas validadas se reporta progreso
+VALIDATION_PROGRESS_ROWS = 5000
+
+# Callback de progreso: (evento, datos)
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
 
 class ExcelService:
     """
@@ -15,23 +36,28 @@ class ExcelService:
     """
     
     @staticmethod
-    def get_sheet_names(file_content: bytes) -> List[str]:
+    def get_sheet_names(file_content: FileSource) -> List[str]:
         """
         Obtener nombres de todas las hojas del Excel
         """
         try:
-            excel_file = pd.ExcelFile(BytesIO(file_content))
-            return excel_file.sheet_names
+            reader = get_reader_for(file_content)
+            with reader.open(file_content) as handle:
+                return reader.sheet_names(handle)
         except Exception as e:
-            logger.error(f"Error leyendo nombres de hojas: {e}")
+            logger.error("Error leyendo nombres de hojas: %s", e)
             raise ValueError(f"Error al leer archivo Excel: {str(e)}")
     
     @staticmethod
-    def validate_sheet(df: pd.DataFrame, sheet_name: str) -> Tuple[bool, List[str]]:
+    def validate_sheet(df: "pd.DataFrame", sheet_name: str,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> Tuple[bool, List[str]]:
         """
         Validar estructura de una hoja
+        `on_progress(filas_validadas, errores)` se llama cada
+        VALIDATION_PROGRESS_ROWS filas y al terminar.
         Retorna: (es_valida, lista_de_errores)
         """
+        import pandas as pd
         errors = []
         
         # Verificar que no esté vacía
@@ -43,13 +69,14 @@ class ExcelService:
         df.columns = [normalize_column_name(col) for col in df.columns]
         
         # Validar columnas requeridas
-        is_valid, missing = validate_required_columns(df.columns.tolist(), REQUIRED_COLUMNS)
+        is_valid, errors = ExcelService.validate_header(df.columns.tolist())
         if not is_valid:
-            errors.append(f"Faltan columnas requeridas: {', '.join(missing)}")
             return False, errors
         
         # Validar datos
-        for idx, row in df.iterrows():
+        for position, (idx, row) in enumerate(df.iterrows(), start=1):
+            if on_progress is not None and position % VALIDATION_PROGRESS_ROWS == 0:
+                on_progress(position, len(errors))
             row_errors = []
             
             # Validar nombre
@@ -91,133 +118,366 @@ class ExcelService:
             if row_errors:
                 errors.extend(row_errors)
         
+        if on_progress is not None and len(df) % VALIDATION_PROGRESS_ROWS:
+            on_progress(len(df), len(errors))
         return len(errors) == 0, errors
     
     @staticmethod
-    def process_excel_file(file_content: bytes) -> Dict[str, Any]:
+    def validate_file(file_content: FileSource, mode: str = "full",
+                      on_event: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
-        Procesar archivo Excel completo y validar todas las hojas
+        Validar el archivo en el modo indicado (ver VALIDATION_MODES)
+        `on_event` recibe el progreso por hoja de la validación completa.
+        """
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Modo de validación inválido: {mode} (use {', '.join(VALIDATION_MODES)})")
+        if mode == "headers":
+            result = ExcelService.process_excel_headers(file_content)
+        else:
+            result = ExcelService.process_excel_file(file_content, on_event)
+        result["mode"] = mode
+        return result
+    
+    @staticmethod
+    def validate_header(columns: List[str]) -> Tuple[bool, List[str]]:
+        """
+        Validar que la fila de encabezado (ya normalizada) tenga las columnas requeridas
+        """
+        is_valid, missing = validate_required_columns(columns, REQUIRED_COLUMNS)
+        if not is_valid:
+            return False, [f"Faltan columnas requeridas: {', '.join(missing)}"]
+        return True, []
+    
+    @staticmethod
+    def process_excel_headers(file_content: FileSource) -> Dict[str, Any]:
+        """
+        Validación rápida: solo lee la primera fila de cada hoja
+        Detecta hojas vacías y columnas faltantes sin parsear los datos; el
+        conteo de filas sale de la dimensión declarada (None si no existe).
         """
         try:
-            excel_file = pd.ExcelFile(BytesIO(file_content))
-            valid_sheets = []
-            invalid_sheets = []
-            
-            for sheet_name in excel_file.sheet_names:
-                try:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    is_valid, errors = ExcelService.validate_sheet(df, sheet_name)
-                    
-                    sheet_info = {
-                        "name": sheet_name,
-                        "rows": len(df),
-                        "valid": is_valid,
-                        "errors": errors
-                    }
-                    
-                    if is_valid:
-                        valid_sheets.append(sheet_info)
-                        logger.info(f"✅ Hoja válida: {sheet_name} ({len(df)} filas)")
-                    else:
-                        invalid_sheets.append(sheet_info)
-                        logger.warning(f"⚠️ Hoja inválida: {sheet_name} - {len(errors)} errores")
-                        
-                except Exception as e:
-                    logger.error(f"Error procesando hoja {sheet_name}: {e}")
-                    invalid_sheets.append({
-                        "name": sheet_name,
-                        "rows": 0,
-                        "valid": False,
-                        "errors": [f"Error al procesar la hoja: {str(e)}"]
-                    })
+            reader = get_reader_for(file_content)
+            with reader.open(file_content) as handle:
+                headers = []
+                for sheet_name in reader.sheet_names(handle):
+                    header = reader.read_header(handle, sheet_name)
+                    headers.append((sheet_name, header, reader.declared_rows(handle, sheet_name) if header else 0))
+        except Exception as e:
+            logger.error("Error leyendo encabezados del Excel: %s", e)
+            raise ValueError(f"Error al procesar archivo: {str(e)}")
+        
+        valid_sheets = []
+        invalid_sheets = []
+        for sheet_name, header, rows in headers:
+            if not header or rows == 0:
+                is_valid, errors, columns = False, ["La hoja está vacía"], []
+            else:
+                columns = [normalize_column_name(str(col)) for col in header if col is not None]
+                is_valid, errors = ExcelService.validate_header(columns)
             
-            return {
-                "valid_sheets": valid_sheets,
-                "invalid_sheets": invalid_sheets,
-                "total_sheets": len(excel_file.sheet_names)
+            sheet_info = {
+                "name": sheet_name,
+                "rows": rows,
+                "columns": columns,
+                "valid": is_valid,
+                "errors": errors
             }
-            
+            (valid_sheets if is_valid else invalid_sheets).append(sheet_info)
+        
+        return {
+            "valid_sheets": valid_sheets,
+            "invalid_sheets": invalid_sheets,
+            "total_sheets": len(headers)
+        }
+    
+    @staticmethod
+    def process_excel_file(file_content: FileSource, on_event: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Procesar archivo Excel completo y validar todas las hojas
+        Con `on_event` se reportan los eventos sheet_started, progress (cada
+        VALIDATION_PROGRESS_ROWS filas) y sheet_done (apenas termina cada hoja).
+        """
+        def emit(event: str, data: Dict[str, Any]) -> None:
+            if on_event is not None:
+                on_event(event, data)
+
+        try:
+            reader = get_reader_for(file_content)
+            with reader.open(file_content) as handle:
+                valid_sheets = []
+                invalid_sheets = []
+                sheet_names = reader.sheet_names(handle)
+                
+                for sheet_name in sheet_names:
+                    try:
+                        df = reader.read_sheet(handle, sheet_name)
+                        emit("sheet_started", {"sheet": sheet_name, "rows": len(df)})
+                        is_valid, errors = ExcelService.validate_sheet(
+                            df, sheet_name,
+                            lambda rows, error_count: emit("progress", {
+                                "sheet": sheet_name, "rows_validated": rows, "errors": error_count
+                            })
+                        )
+                        
+                        sheet_info = {
+                            "name": sheet_name,
+                            "rows": len(df),
+                            "valid": is_valid,
+                            "errors": errors
+                        }
+                        
+                        if is_valid:
+                            valid_sheets.append(sheet_info)
+                            logger.info("✅ Hoja válida: %s (%s filas)", sheet_name, len(df), extra={"sheet": sheet_name, "rows": len(df)})
+                        else:
+                            invalid_sheets.append(sheet_info)
+                            logger.warning("⚠️ Hoja inválida: %s - %s errores", sheet_name, len(errors), extra={"sheet": sheet_name, "errors": len(errors)})
+                            
+                    except Exception as e:
+                        logger.error("Error procesando hoja %s: %s", sheet_name, e, extra={"sheet": sheet_name})
+                        sheet_info = {
+                            "name": sheet_name,
+                            "rows": 0,
+                            "valid": False,
+                            "errors": [f"Error al procesar la hoja: {str(e)}"]
+                        }
+                        invalid_sheets.append(sheet_info)
+                    
+                    emit("sheet_done", sheet_info)
+                
+                return {
+                    "valid_sheets": valid_sheets,
+                    "invalid_sheets": invalid_sheets,
+                    "total_sheets": len(sheet_names)
+                }
+                
         except Exception as e:
-            logger.error(f"Error procesando archivo Excel: {e}")
+            logger.error("Error procesando archivo Excel: %s", e)
             raise ValueError(f"Error al procesar archivo: {str(e)}")
     
     @staticmethod
-    def get_preview_data(file_content: bytes, sheet_names: List[str]) -> List[Dict[str, Any]]:
+    def get_preview_data(file_content: FileSource, sheet_names: List[str],
+                         offset: int = 0, limit: int = PREVIEW_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
         """
         Obtener preview de datos de hojas seleccionadas
+        Solo se leen las filas de la ventana [offset, offset + limit) de cada hoja;
+        el total de filas sale de los metadatos del archivo cuando los tiene y,
+        para archivos en disco, se cuenta una sola vez por subida.
         """
         previews = []
         
         try:
-            excel_file = pd.ExcelFile(BytesIO(file_content))
-            
-            for sheet_name in sheet_names:
-                if sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    df.columns = [normalize_column_name(col) for col in df.columns]
-                    
-                    # Convertir a diccionario y normalizar
-                    data = df.to_dict('records')
-                    for record in data:
-                        # Normalizar sexo
-                        if 'sexo' in record:
-                            sexo = str(record['sexo']).strip().lower()
-                            if sexo == 'masculino':
-                                record['sexo'] = 'Masculino'
-                            elif sexo == 'femenino':
-                                record['sexo'] = 'Femenino'
-                            elif sexo == 'otro':
-                                record['sexo'] = 'Otro'
-                    
+            reader = get_reader_for(file_content)
+            with reader.open(file_content) as handle:
+                available = reader.sheet_names(handle)
+                for sheet_name in sheet_names:
+                    if sheet_name not in available:
+                        continue
+                    df = reader.read_sheet(handle, sheet_name, offset, limit)
+                    df.columns = [normalize_column_name(str(col)) for col in df.columns]
+                    df = df.astype(object).where(df.notna(), None)
                     previews.append({
                         "sheet_name": sheet_name,
-                        "data": data[:100],  # Limitar a 100 registros para preview
-                        "total_rows": len(df)
+                        "data": df.to_dict('records'),
+                        "total_rows": count_rows_cached(reader, handle, file_content, sheet_name)
                     })
                     
         except Exception as e:
-            logger.error(f"Error obteniendo preview: {e}")
+            logger.error("Error obteniendo preview: %s", e)
             raise
         
+        for preview in previews:
+            for record in preview["data"]:
+                ExcelService._normalize_sexo(record)
+            preview["offset"] = offset
+            preview["limit"] = limit
+            preview["has_more"] = offset + len(preview["data"]) < preview["total_rows"]
+        
         return previews
     
     @staticmethod
-    def prepare_data_for_import(file_content: bytes, sheet_names: List[str]) -> List[Dict[str, Any]]:
+    def _normalize_sexo(record: Dict[str, Any]) -> None:
+        """
+        Normalizar el valor de sexo de un registro (in-place)
+        """
+        if 'sexo' in record:
+            sexo = str(record['sexo']).strip().lower()
+            if sexo == 'masculino':
+                record['sexo'] = 'Masculino'
+            elif sexo == 'femenino':
+                record['sexo'] = 'Femenino'
+            elif sexo == 'otro':
+                record['sexo'] = 'Otro'
+    
+    @staticmethod
+    def _as_text(series: "pd.Series") -> "pd.Series":
+        """
+        Columna como texto con las celdas vacías como MISSING_TEXT
+        Con pandas 3 astype(str) conserva NaN/None como faltantes (con pandas 2
+        ya los convertía en "nan"); sin completarlos quedarían con código -1
+        en el categórico.
+        """
+        return series.astype(str).fillna(MISSING_TEXT)
+    
+    @staticmethod
+    def _categorical(series: "pd.Series", normalize) -> "pd.Categorical":
+        """
+        Convertir a categórico aplicando `normalize` una vez por valor distinto
+        (no por fila); valores que normalizan igual comparten el mismo código
+        """
+        import numpy as np
+        import pandas as pd
+        raw = ExcelService._as_text(series).astype("category")
+        normalized = [normalize(value) for value in raw.cat.categories]
+        categories = list(dict.fromkeys(normalized))
+        position = {value: code for code, value in enumerate(categories)}
+        mapping = np.array([position[value] for value in normalized], dtype=np.int32)
+        return pd.Categorical.from_codes(mapping[raw.cat.codes.to_numpy()], categories=categories)
+    
+    @staticmethod
+    def _shared_values(categorical: "pd.Categorical") -> List[str]:
+        """
+        Valores de un categórico como lista, un único objeto str por categoría
+        Con pandas 3 las categorías de texto son str (pyarrow) y tolist() crea
+        un objeto nuevo por fila; indexar un array object por los códigos no.
+        """
+        import numpy as np
+        categories = np.array(categorical.categories.tolist(), dtype=object)
+        return categories[categorical.codes].tolist()
+    
+    @staticmethod
+    def _to_import_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+        """
+        Filas de una hoja como diccionarios listos para insertar
+        cargo y sexo pasan por categóricos: todas las filas con el mismo valor
+        comparten un único objeto str en lugar de una copia por fila.
+        """
+        cargo = ExcelService._categorical(df['cargo'], str.strip)
+        sexo = ExcelService._categorical(
+            df['sexo'], lambda value: SEXO_CANONICAL.get(value.strip().lower(), 'Otro')
+        )
+        columns = zip(
+            ExcelService._as_text(df['nombre']).str.strip().tolist(),
+            df['edad'].astype(int).tolist(),
+            ExcelService._shared_values(sexo),
+            ExcelService._shared_values(cargo),
+            df['sueldo'].astype(float).tolist(),
+        )
+        return [
+            {"nombre": nombre, "edad": edad, "sexo": sexo_value, "cargo": cargo_value, "sueldo": sueldo}
+            for nombre, edad, sexo_value, cargo_value, sueldo in columns
+        ]
+    
+    @staticmethod
+    def iter_import_sheets(file_content: FileSource, sheet_names: List[str],
+                           skip_invalid: bool = False) -> Iterator[SheetImport]:
+        """
+        Preparar las hojas seleccionadas una por una para importar a BD
+        Cada SheetImport trae sus registros y los tiempos de lectura, validación
+        (encabezado) y transformación; el llamador inserta los registros (etapa
+        "insert") antes de pedir la siguiente hoja, y al continuar se guarda el
+        pico de memoria de la hoja y se liberan sus registros.
+        Un encabezado sin las columnas requeridas lanza ValueError; con
+        `skip_invalid` una hoja que no se puede preparar se entrega sin
+        registros y con `error`, y se continúa con las demás.
+        """
+        reader = get_reader_for(file_content)
+        with reader.open(file_content) as handle, PeakMemorySampler() as sampler:
+            available = reader.sheet_names(handle)
+            
+            for sheet_name in sheet_names:
+                if sheet_name not in available:
+                    logger.warning("⚠️ Hoja '%s' no encontrada, se omite", sheet_name)
+                    continue
+                sampler.take_peak_mb()
+                sheet = SheetImport(sheet_name)
+                try:
+                    with sheet.stage("read"):
+                        df = reader.read_sheet(handle, sheet_name)
+                    with sheet.stage("validate"):
+                        df.columns = [normalize_column_name(col) for col in df.columns]
+                        is_valid, errors = ExcelService.validate_header(list(df.columns))
+                        if not is_valid:
+                            raise ValueError(f"Hoja '{sheet_name}': {'; '.join(errors)}")
+                    with sheet.stage("transform"):
+                        sheet.records = ExcelService._to_import_records(df)
+                        sheet.rows = len(sheet.records)
+                except Exception as e:
+                    if not skip_invalid:
+                        raise
+                    logger.warning("⚠️ Hoja '%s' no se puede importar: %s", sheet_name, e)
+                    sheet.error = str(e)
+                    sheet.records, sheet.rows = [], 0
+                df = None
+                
+                yield sheet
+                
+                sheet.peak_memory_mb = sampler.take_peak_mb()
+                sheet.records = []
+    
+    @staticmethod
+    def prepare_data_for_import(file_content: FileSource, sheet_names: List[str]) -> List[Dict[str, Any]]:
         """
         Preparar datos de hojas seleccionadas para importar a BD
         """
         all_data = []
         
         try:
-            excel_file = pd.ExcelFile(BytesIO(file_content))
+            for sheet in ExcelService.iter_import_sheets(file_content, sheet_names):
+                all_data.extend(sheet.records)
             
-            for sheet_name in sheet_names:
-                if sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    df.columns = [normalize_column_name(col) for col in df.columns]
-                    
-                    for _, row in df.iterrows():
-                        # Normalizar sexo
-                        sexo = str(row['sexo']).strip().lower()
-                        if sexo == 'masculino':
-                            sexo_value = 'Masculino'
-                        elif sexo == 'femenino':
-                            sexo_value = 'Femenino'
-                        else:
-                            sexo_value = 'Otro'
-                        
-                        employee_data = {
-                            "nombre": str(row['nombre']).strip(),
-                            "edad": int(row['edad']),
-                            "sexo": sexo_value,
-                            "cargo": str(row['cargo']).strip(),
-                            "sueldo": float(row['sueldo'])
-                        }
-                        all_data.append(employee_data)
-                        
-            logger.info(f"✅ Preparados {len(all_data)} registros para importar")
+            logger.info("✅ Preparados %s registros para importar", len(all_data), extra={"rows": len(all_data)})
             return all_data
-            
+                
         except Exception as e:
-            logger.error(f"Error preparando datos: {e}")
-            raise
\ No newline at end of file
+            logger.error("Error preparando datos: %s", e)
+            raise
+
+
+def benchmark(rows: int, cargos: int = 40) -> Dict[str, Dict[str, float]]:
+    """
+    Memoria (MB) de cargo y sexo al preparar `rows` filas leídas de un CSV sintético
+    - columna: DataFrame.memory_usage(deep=True) como la entrega el lector,
+      como object y como categórico
+    - registros: objetos str distintos que referencian los registros a insertar,
+      normalizando fila por fila (antes) o con _categorical (ahora)
+    """
+    import io
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    source = pd.DataFrame({
+        "cargo": [f" Cargo {code} " for code in rng.integers(0, cargos, rows)],
+        "sexo": rng.choice(["masculino", "Femenino ", "OTRO"], rows),
+    })
+    df = pd.read_csv(io.StringIO(source.to_csv(index=False)))
+
+    def mb(value: float) -> float:
+        return round(value / (1024 * 1024), 3)
+
+    def distinct_str_bytes(values: List[str]) -> float:
+        return mb(sum(sys.getsizeof(value) for value in {id(value): value for value in values}.values()))
+
+    results = {}
+    for column, normalize in (
+        ("cargo", str.strip),
+        ("sexo", lambda value: SEXO_CANONICAL.get(value.strip().lower(), "Otro")),
+    ):
+        series = df[column]
+        per_row = [normalize(value) for value in ExcelService._as_text(series).tolist()]
+        shared = ExcelService._shared_values(ExcelService._categorical(series, normalize))
+        results[column] = {
+            "column_read": mb(series.memory_usage(deep=True, index=False)),
+            "column_object": mb(series.astype(object).memory_usage(deep=True, index=False)),
+            "column_category": mb(series.astype("category").memory_usage(deep=True, index=False)),
+            "records_per_row": distinct_str_bytes(per_row),
+            "records_categorical": distinct_str_bytes(shared),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for name, figures in benchmark(count).items():
+        print(f"{name:<6} " + "  ".join(f"{key}: {value:>7.3f} MB" for key, value in figures.items()))
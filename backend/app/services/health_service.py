@@ -0,0 +1,172 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+import anyio.to_thread
+from sqlalchemy import text
+from app.config import get_settings
+from sqlalchemy.engine import Engine
+from app.database import engine, read_engine, replica_enabled
+from app.services.warmup_service import warmup
+from app.utils import background
+from app.utils.background import PeriodicTask
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class HealthMonitor:
+    """
+    Estado de salud cacheado
+    Un chequeo en segundo plano refresca el estado de la BD (primario y, si
+    está configurada, réplica de lectura) cada HEALTH_CHECK_INTERVAL
+    segundos; los probes solo leen este estado.
+    """
+
+    def __init__(self, interval: float):
+        self.db_status = "unknown"
+        self.db_error: Optional[str] = None
+        self.db_latency_ms: Optional[float] = None
+        self.read_db_status = "unknown"
+        self.read_db_error: Optional[str] = None
+        self.read_db_latency_ms: Optional[float] = None
+        self.last_check: Optional[datetime] = None
+        self._last_check_monotonic: Optional[float] = None
+        self._task = PeriodicTask("health-monitor", interval, self.check_database)
+
+    @staticmethod
+    def _probe(pool_engine: Engine, previous_status: str, label: str) -> Tuple[str, Optional[str], float]:
+        """
+        SELECT 1 sobre un engine: (estado, error, latencia en ms)
+        """
+        start = time.perf_counter()
+        try:
+            with pool_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            status, error = "connected", None
+        except Exception as e:
+            status, error = "disconnected", str(e)
+            if previous_status != "disconnected":
+                logger.error("Health check failed (%s): %s", label, e)
+        return status, error, round((time.perf_counter() - start) * 1000, 2)
+
+    def check_database(self) -> None:
+        """
+        Ejecutar SELECT 1 en el primario y la réplica y actualizar el estado cacheado
+        """
+        self.db_status, self.db_error, self.db_latency_ms = self._probe(engine, self.db_status, "primary")
+        if replica_enabled():
+            self.read_db_status, self.read_db_error, self.read_db_latency_ms = self._probe(
+                read_engine, self.read_db_status, "read replica"
+            )
+        else:
+            # Sin réplica las lecturas usan el primario
+            self.read_db_status, self.read_db_error, self.read_db_latency_ms = (
+                self.db_status, self.db_error, self.db_latency_ms
+            )
+        self.last_check = datetime.now()
+        self._last_check_monotonic = time.monotonic()
+
+    def start(self) -> None:
+        self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+    @property
+    def db_stale(self) -> bool:
+        """
+        El último chequeo es demasiado antiguo (o nunca se ejecutó)
+        """
+        if self._last_check_monotonic is None:
+            return True
+        return time.monotonic() - self._last_check_monotonic > settings.HEALTH_STALE_AFTER
+
+    @staticmethod
+    def pool_status(pool_engine: Engine = engine) -> Dict[str, Any]:
+        """
+        Ocupación del pool de conexiones (sin tocar la BD)
+        """
+        pool = pool_engine.pool
+        if not hasattr(pool, "checkedout"):
+            return {"class": type(pool).__name__}
+
+        size = pool.size()
+        checked_out = pool.checkedout()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        return {
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+        }
+
+    @staticmethod
+    def executor_status() -> Dict[str, Any]:
+        """
+        Executor de asyncio.to_thread (Excel, nómina, tareas periódicas) y, en
+        `sync_endpoints`, el threadpool de anyio donde corren las dependencias y
+        endpoints síncronos. Debe llamarse desde el event loop.
+        """
+        executor = background.default_executor
+        status: Dict[str, Any] = executor.statistics() if executor is not None else {
+            "threads_in_use": None, "threads_total": None, "queue_depth": None
+        }
+        stats = anyio.to_thread.current_default_thread_limiter().statistics()
+        status["sync_endpoints"] = {
+            "threads_in_use": stats.borrowed_tokens,
+            "threads_total": stats.total_tokens,
+            "queue_depth": stats.tasks_waiting,
+        }
+        return status
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Snapshot de readiness: estado de BD cacheado, pool y executor
+        """
+        pool = self.pool_status()
+        executor = self.executor_status()
+
+        reasons = []
+        if self.db_status != "connected":
+            reasons.append(f"database {self.db_status}")
+        elif self.db_stale:
+            reasons.append("database status stale")
+        if replica_enabled() and self.read_db_status != "connected":
+            reasons.append(f"read replica {self.read_db_status}")
+        if not warmup.schema_ready:
+            reasons.append("schema check pending")
+        elif not warmup.done:
+            reasons.append("warming up")
+        if pool.get("saturation", 0) >= settings.READINESS_MAX_POOL_SATURATION:
+            reasons.append("connection pool saturated")
+        read_pool = self.pool_status(read_engine) if replica_enabled() else None
+        if read_pool is not None and read_pool.get("saturation", 0) >= settings.READINESS_MAX_POOL_SATURATION:
+            reasons.append("read replica pool saturated")
+        if settings.READINESS_MAX_EXECUTOR_QUEUE and (executor["queue_depth"] or 0) >= settings.READINESS_MAX_EXECUTOR_QUEUE:
+            reasons.append("executor queue backlog")
+
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "database": {
+                "status": self.db_status,
+                "error": self.db_error,
+                "latency_ms": self.db_latency_ms,
+                "last_check": self.last_check.isoformat() if self.last_check else None,
+            },
+            "read_database": {
+                "status": self.read_db_status,
+                "error": self.read_db_error,
+                "latency_ms": self.read_db_latency_ms,
+                "replica": replica_enabled(),
+            },
+            "pool": pool,
+            "read_pool": read_pool,
+            "executor": executor,
+            "warmup": warmup.status(),
+        }
+
+
+health_monitor = HealthMonitor(settings.HEALTH_CHECK_INTERVAL)
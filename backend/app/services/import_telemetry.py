@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from app.server import get_rss_bytes
+
+# Etapas de cada hoja, en orden; se guardan en data_imported.<etapa>_ms
+IMPORT_STAGES = ("read", "validate", "transform", "insert")
+
+# Intervalo de muestreo de la memoria residente (segundos)
+MEMORY_SAMPLE_INTERVAL = 0.05
+
+
+class PeakMemorySampler:
+    """
+    Pico de memoria residente (RSS) del proceso, muestreado en un hilo
+    Se usa RSS y no tracemalloc: tracemalloc vuelve varias veces más lenta la
+    preparación de una hoja grande. Es memoria de todo el proceso (incluye
+    otros requests concurrentes del worker) y un pico más corto que el
+    intervalo de muestreo puede no verse.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        rss = get_rss_bytes(self._pid)
+        if rss is not None:
+            with self._lock:
+                if self._peak is None or rss > self._peak:
+                    self._peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="import-memory-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def take_peak_mb(self) -> Optional[float]:
+        """
+        Pico desde la llamada anterior (o desde start) en MB; reinicia la medición
+        """
+        self._sample()
+        with self._lock:
+            peak, self._peak = self._peak, None
+        self._sample()
+        return round(peak / 1024 / 1024, 1) if peak is not None else None
+
+    def __enter__(self) -> "PeakMemorySampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class SheetImport:
+    """
+    Registros de una hoja a importar y su telemetría
+    `telemetry()` retorna las columnas de data_imported correspondientes.
+    """
+
+    def __init__(self, sheet_name: str):
+        self.sheet_name = sheet_name
+        self.records: List[Dict[str, Any]] = []
+        self.rows = 0
+        self.timings: Dict[str, float] = {stage: 0.0 for stage in IMPORT_STAGES}
+        self.insert_batch_size: Optional[int] = None
+        self.insert_batches = 0
+        self.peak_memory_mb: Optional[float] = None
+        self.error: Optional[str] = None  # Motivo si la hoja no se importó
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Medir una etapa (el tiempo se acumula si la etapa se repite)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += (time.perf_counter() - start) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.timings.values())
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        total = self.total_ms
+        return round(self.rows / total * 1000, 1) if total > 0 else None
+
+    def telemetry(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {f"{stage}_ms": round(ms, 1) for stage, ms in self.timings.items()}
+        result.update({
+            "total_ms": round(self.total_ms, 1),
+            "rows_per_second": self.rows_per_second,
+            "peak_memory_mb": self.peak_memory_mb,
+            "insert_batch_size": self.insert_batch_size,
+            "insert_batches": self.insert_batches,
+        })
+        return result
@@ -0,0 +1,112 @@
+"""
+Reglas de nómina y cálculo vectorizado de devengado a neto
+
+Este módulo solo depende de numpy (importado dentro de las funciones): es lo
+único que importan los procesos del pool de cálculo de payroll_engine.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Columnas calculadas, en el orden de las filas de la matriz que retorna compute_chunk
+RESULT_COLUMNS = ("bonificaciones", "devengado", "deducciones", "impuesto", "neto", "aportes")
+
+# Reglas por defecto (PAYROLL_RULES_FILE las reemplaza): aportes a salud y pensión
+DEFAULT_RULES: Dict[str, Any] = {
+    "bonificaciones": [],
+    "deducciones": [
+        {"nombre": "Salud", "tasa": 0.04},
+        {"nombre": "Pensión", "tasa": 0.04},
+    ],
+    "aportes": [
+        {"nombre": "Salud", "tasa": 0.085},
+        {"nombre": "Pensión", "tasa": 0.12},
+    ],
+    "impuesto": [],
+}
+
+# (tasa, monto, ids de cargo o None = todos)
+CompiledConcept = Tuple[float, float, Optional[Tuple[int, ...]]]
+# (desde, hasta, tasa)
+CompiledBracket = Tuple[float, float, float]
+# (bonificaciones, deducciones, aportes, impuesto); tuplas simples para enviarlas al pool
+CompiledRules = Tuple[
+    Tuple[CompiledConcept, ...], Tuple[CompiledConcept, ...], Tuple[CompiledConcept, ...], Tuple[CompiledBracket, ...]
+]
+
+
+def compile_rules(rules: Dict[str, Any], resolve_cargos: Callable[[List[str]], Dict[str, int]]) -> CompiledRules:
+    """
+    Convertir un conjunto de reglas (PayrollRuleSet como dict) a la forma que usa el cálculo
+    Los nombres de cargo se traducen a ids con `resolve_cargos`; un cargo
+    inexistente simplemente no coincide con ningún empleado.
+    """
+    def concepts(items: List[Dict[str, Any]]) -> Tuple[CompiledConcept, ...]:
+        compiled = []
+        for item in items:
+            cargos = item.get("cargos")
+            ids = None
+            if cargos is not None:
+                resolved = resolve_cargos(cargos)
+                ids = tuple(sorted(resolved[name] for name in cargos if name in resolved))
+            compiled.append((float(item.get("tasa", 0)), float(item.get("monto", 0)), ids))
+        return tuple(compiled)
+
+    brackets = sorted((float(b["desde"]), float(b["tasa"])) for b in rules.get("impuesto", []))
+    bounds = [desde for desde, _ in brackets[1:]] + [float("inf")]
+    return (
+        concepts(rules.get("bonificaciones", [])),
+        concepts(rules.get("deducciones", [])),
+        concepts(rules.get("aportes", [])),
+        tuple((desde, hasta, tasa) for (desde, tasa), hasta in zip(brackets, bounds)),
+    )
+
+
+def _apply_concepts(concepts: Sequence[CompiledConcept], base: "np.ndarray", cargo_id: "np.ndarray",
+                    out: "np.ndarray") -> None:
+    import numpy as np
+    out.fill(0)
+    amount = np.empty_like(base)
+    for tasa, monto, cargos in concepts:
+        np.multiply(base, tasa, out=amount)
+        amount += monto
+        if cargos is not None:
+            amount[~np.isin(cargo_id, cargos)] = 0
+        out += amount
+    np.round(out, 2, out=out)
+
+
+def compute_chunk(sueldo: "np.ndarray", cargo_id: "np.ndarray", rules: CompiledRules) -> "np.ndarray":
+    """
+    Devengado a neto de un lote de empleados
+    Retorna una matriz float64 de forma (len(RESULT_COLUMNS), n). Cada concepto
+    se redondea a centavos antes de combinarse, así neto = devengado -
+    deducciones - impuesto se cumple exactamente en los valores guardados.
+    """
+    import numpy as np
+    bonificaciones_rules, deducciones_rules, aportes_rules, brackets = rules
+    result = np.empty((len(RESULT_COLUMNS), len(sueldo)), dtype=np.float64)
+    bonificaciones, devengado, deducciones, impuesto, neto, aportes = result
+
+    _apply_concepts(bonificaciones_rules, sueldo, cargo_id, bonificaciones)
+    np.add(sueldo, bonificaciones, out=devengado)
+    _apply_concepts(deducciones_rules, devengado, cargo_id, deducciones)
+    _apply_concepts(aportes_rules, devengado, cargo_id, aportes)
+
+    # Impuesto progresivo: tasa marginal de cada tramo sobre la parte de la base que cae en él
+    impuesto.fill(0)
+    if brackets:
+        gravable = np.maximum(devengado - deducciones, 0)
+        portion = np.empty_like(gravable)
+        for desde, hasta, tasa in brackets:
+            np.subtract(gravable, desde, out=portion)
+            np.clip(portion, 0, hasta - desde, out=portion)
+            portion *= tasa
+            impuesto += portion
+        np.round(impuesto, 2, out=impuesto)
+
+    np.subtract(devengado, deducciones, out=neto)
+    neto -= impuesto
+    np.round(neto, 2, out=neto)
+    return result
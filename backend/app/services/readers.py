@@ -0,0 +1,591 @@
+"""
+Lectores de archivos tabulares (backends de lectura)
+
+ExcelService no sabe de formatos: pide a un lector las hojas, la fila de
+encabezado, una ventana de filas o la hoja completa como DataFrame, y aplica
+siempre la misma normalización / validación / importación.
+
+El lector se elige por extensión; para .xlsx el engine se configura con
+XLSX_READER (openpyxl, o calamine si está instalado python-calamine).
+
+    python -m app.services.readers archivo.xlsx [archivo.csv ...]
+
+compara el tiempo de lectura de cada backend disponible sobre los mismos archivos.
+"""
+import importlib.util
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
+from app.config import get_settings
+from app.utils.logger_config import get_logger
+
+# pandas y los engines se importan dentro de los métodos (ver excel_service)
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Origen de un archivo: bytes en memoria o ruta en disco (UploadStore)
+FileSource = Union[bytes, str]
+
+# CSV y Parquet tienen una sola "hoja"
+SINGLE_SHEET_NAME = "Hoja1"
+
+# Etiqueta <row> (no </row> ni <rowBreaks>) con su número de fila r="N", opcional
+ROW_TAG_RE = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+ROW_NUMBER_RE = re.compile(rb"\br=[\"'](\d+)[\"']")
+# <dimension> va antes de <sheetData>: no hace falta leer la hoja para encontrarla
+DIMENSION_TAG_RE = re.compile(rb"<(?:\w+:)?dimension\b[^>]*?\bref=[\"']([^\"']+)[\"']")
+SHEET_DATA_TAG_RE = re.compile(rb"<(?:\w+:)?sheetData[\s>/]")
+SHEET_HEAD_MAX_BYTES = 1 << 20
+
+# Filas contadas por archivo en disco y hoja (las páginas del preview no recuentan)
+ROW_COUNT_CACHE_SIZE = 256
+
+# Filas por lote al leer una ventana de un Parquet
+PARQUET_BATCH_ROWS = 64 * 1024
+
+# Bytes del inicio de un CSV usados para estimar su número de filas
+CSV_SAMPLE_BYTES = 64 * 1024
+
+# Firmas para detectar el formato de archivos recibidos como bytes
+_MAGIC_EXTENSIONS = (
+    (b"PK\x03\x04", ".xlsx"),
+    (b"\xd0\xcf\x11\xe0", ".xls"),
+    (b"PAR1", ".parquet"),
+)
+
+
+class _MappedFile(mmap.mmap):
+    """
+    mmap con la interfaz de archivo que esperan zipfile/openpyxl y pandas
+    """
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+
+@contextmanager
+def open_source(file_content: FileSource):
+    """
+    Objeto legible por pandas/openpyxl a partir de bytes o de una ruta
+    Los archivos en disco se leen mapeados en memoria (mmap): las páginas
+    las comparte el cache del sistema operativo en vez de copiarse al proceso.
+    """
+    if not isinstance(file_content, str):
+        yield BytesIO(file_content)
+        return
+    with open(file_content, "rb") as source_file, \
+            _MappedFile(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+_row_counts: "OrderedDict[tuple, int]" = OrderedDict()
+_row_counts_lock = threading.Lock()
+
+
+def count_rows_cached(reader: "TableReader", handle, file_content: FileSource, sheet_name: str) -> int:
+    """
+    reader.count_rows con cache para archivos en disco
+    La clave incluye tamaño y mtime: cada upload_id tiene su propio archivo,
+    así que el conteo se hace una sola vez por subida y hoja.
+    """
+    if not isinstance(file_content, str):
+        return reader.count_rows(handle, sheet_name)
+    try:
+        stat = os.stat(file_content)
+    except OSError:
+        return reader.count_rows(handle, sheet_name)
+
+    key = (file_content, stat.st_size, stat.st_mtime_ns, reader.name, sheet_name)
+    with _row_counts_lock:
+        rows = _row_counts.get(key)
+        if rows is not None:
+            _row_counts.move_to_end(key)
+            return rows
+    rows = reader.count_rows(handle, sheet_name)
+    with _row_counts_lock:
+        _row_counts[key] = rows
+        while len(_row_counts) > ROW_COUNT_CACHE_SIZE:
+            _row_counts.popitem(last=False)
+    return rows
+
+
+def detect_extension(file_content: FileSource) -> str:
+    """
+    Extensión del archivo: la de la ruta o, para bytes, según su firma
+    """
+    if isinstance(file_content, str):
+        return os.path.splitext(file_content)[1].lower()
+    for magic, extension in _MAGIC_EXTENSIONS:
+        if file_content[:len(magic)] == magic:
+            return extension
+    return ".csv"
+
+
+class TableReader(ABC):
+    """
+    Interfaz de un backend de lectura
+    `open()` retorna un handle que se reutiliza para todas las hojas del archivo.
+    open / sheet_names / read_sheet son obligatorios: un lector que no los
+    implementa falla al instanciarse (TypeError).
+    """
+    name = ""
+    # Módulos opcionales que necesita el backend
+    requires: Tuple[str, ...] = ()
+
+    @classmethod
+    def available(cls) -> bool:
+        return all(importlib.util.find_spec(module) is not None for module in cls.requires)
+
+    @abstractmethod
+    @contextmanager
+    def open(self, file_content: FileSource):
+        ...
+
+    @abstractmethod
+    def sheet_names(self, handle) -> List[str]:
+        ...
+
+    @abstractmethod
+    def read_sheet(self, handle, sheet_name: str, offset: int = 0, limit: Optional[int] = None) -> "pd.DataFrame":
+        """
+        Filas de datos [offset, offset + limit) de una hoja (limit None = hasta el final)
+        """
+
+    def read_header(self, handle, sheet_name: str) -> Optional[tuple]:
+        columns = tuple(self.read_sheet(handle, sheet_name, limit=0).columns)
+        return columns or None
+
+    def declared_rows(self, handle, sheet_name: str) -> Optional[int]:
+        """
+        Filas de datos según los metadatos del archivo (None si no se conocen sin leerlo)
+        """
+        return None
+
+    def count_rows(self, handle, sheet_name: str) -> int:
+        rows = self.declared_rows(handle, sheet_name)
+        if rows is None:
+            rows = len(self.read_sheet(handle, sheet_name))
+        return rows
+
+    def estimated_rows(self, handle, sheet_name: str) -> int:
+        """
+        Filas de datos aproximadas, sin cargar la hoja (control de admisión)
+        """
+        return self.count_rows(handle, sheet_name)
+
+
+class PandasExcelReader(TableReader):
+    """
+    Excel leído con pd.ExcelFile y el engine indicado
+    """
+    name = "pandas"
+    engine: Optional[str] = None
+
+    @contextmanager
+    def open(self, file_content: FileSource):
+        import pandas as pd
+        with open_source(file_content) as source:
+            excel_file = pd.ExcelFile(source, engine=self.engine)
+            try:
+                yield excel_file
+            finally:
+                excel_file.close()
+
+    def sheet_names(self, handle) -> List[str]:
+        return handle.sheet_names
+
+    def read_sheet(self, handle, sheet_name: str, offset: int = 0, limit: Optional[int] = None) -> "pd.DataFrame":
+        import pandas as pd
+        skiprows = range(1, offset + 1) if offset else None
+        return pd.read_excel(handle, sheet_name=sheet_name, skiprows=skiprows, nrows=limit)
+
+
+class XlrdReader(PandasExcelReader):
+    """
+    .xls (formato binario antiguo) con xlrd
+    """
+    name = "xlrd"
+    engine = "xlrd"
+    requires = ("xlrd",)
+
+    def declared_rows(self, handle, sheet_name: str) -> Optional[int]:
+        return max(handle.book.sheet_by_name(sheet_name).nrows - 1, 0)
+
+
+class CalamineReader(PandasExcelReader):
+    """
+    .xlsx / .xls con calamine (Rust): varias veces más rápido que openpyxl
+    """
+    name = "calamine"
+    engine = "calamine"
+    requires = ("python_calamine",)
+
+    def declared_rows(self, handle, sheet_name: str) -> Optional[int]:
+        return max(handle.book.get_sheet_by_name(sheet_name).height - 1, 0)
+
+
+def _sheet_dimension(archive, sheet_path: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (min_col, min_row, max_col, max_row) según <dimension>, leyendo solo el XML
+    anterior a <sheetData> (la etiqueta no puede ir después)
+    """
+    head = b""
+    with archive.open(sheet_path) as source:
+        while len(head) < SHEET_HEAD_MAX_BYTES:
+            chunk = source.read(64 * 1024)
+            if not chunk:
+                break
+            head += chunk
+            data_tag = SHEET_DATA_TAG_RE.search(head)
+            if data_tag:
+                head = head[:data_tag.start()]
+                break
+    match = DIMENSION_TAG_RE.search(head)
+    if match is None:
+        return None
+    from openpyxl.utils.cell import range_boundaries
+    try:
+        dimensions = range_boundaries(match.group(1).decode())
+    except ValueError:
+        return None
+    return None if None in dimensions else dimensions
+
+
+@lru_cache(maxsize=None)
+def _lazy_excel_reader():
+    """
+    ExcelReader de openpyxl que no mide las hojas al abrir el libro
+    ReadOnlyWorksheet busca <dimension> en su constructor con iterparse y se
+    detiene al cerrar <sheetData>: sin dimensión declarada, abrir el archivo
+    recorría cada hoja completa. Aquí el tamaño queda sin calcular (ni pandas
+    ni las ventanas de filas lo usan) y declared_rows lo lee bajo demanda.
+    """
+    from openpyxl.reader.excel import ExcelReader
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+    class LazyWorksheet(ReadOnlyWorksheet):
+        def _get_size(self) -> None:
+            pass
+
+    class LazyExcelReader(ExcelReader):
+        def read_worksheets(self) -> None:
+            # Solo modo read-only; las chartsheets no tienen filas (pandas tampoco las lista)
+            for sheet, rel in self.parser.find_sheets():
+                if rel.target not in self.valid_files or "chartsheet" in rel.Type:
+                    continue
+                worksheet = LazyWorksheet(self.wb, sheet.name, rel.target, self.shared_strings)
+                worksheet.sheet_state = sheet.state
+                self.wb._sheets.append(worksheet)
+
+    return LazyExcelReader
+
+
+class OpenpyxlReader(PandasExcelReader):
+    """
+    .xlsx con openpyxl
+    Las ventanas de filas y el encabezado se leen en streaming sobre un
+    workbook read-only; las hojas completas con pd.read_excel.
+    Una fila de datos es cada fila de la hoja entre el encabezado y la última
+    fila, incluidas las vacías: así lo leen pd.read_excel, las ventanas de
+    read_sheet y count_rows, y las páginas del preview cuadran con el total.
+    """
+    name = "openpyxl"
+    engine = "openpyxl"
+    requires = ("openpyxl",)
+
+    @contextmanager
+    def open(self, file_content: FileSource):
+        import pandas as pd
+        with open_source(file_content) as source:
+            reader = _lazy_excel_reader()(source, read_only=True, data_only=True, keep_links=False)
+            reader.read()
+            excel_file = pd.ExcelFile(reader.wb, engine=self.engine)
+            try:
+                yield excel_file
+            finally:
+                excel_file.close()
+
+    def read_header(self, handle, sheet_name: str) -> Optional[tuple]:
+        worksheet = handle.book[sheet_name]
+        header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if header is None or all(value is None for value in header):
+            return None
+        return header
+
+    def read_sheet(self, handle, sheet_name: str, offset: int = 0, limit: Optional[int] = None) -> "pd.DataFrame":
+        import pandas as pd
+        if limit is None:
+            return super().read_sheet(handle, sheet_name, offset, limit)
+
+        header = self.read_header(handle, sheet_name) or ()
+        columns = [col if col is not None else f"Unnamed: {idx}" for idx, col in enumerate(header)]
+        width = len(columns)
+        rows = []
+        if limit > 0:
+            # Las filas vacías (o ausentes del XML) se conservan: ver docstring de la clase
+            worksheet = handle.book[sheet_name]
+            for row in worksheet.iter_rows(min_row=offset + 2, max_row=offset + limit + 1, values_only=True):
+                row = tuple(row[:width])
+                rows.append(row + (None,) * (width - len(row)))
+        return pd.DataFrame(rows, columns=columns)
+
+    def declared_rows(self, handle, sheet_name: str) -> Optional[int]:
+        """
+        Según <dimension>; algunos generadores declaran solo "A1" aunque la
+        hoja tenga datos, así que una dimensión de una fila no se usa
+        """
+        worksheet = handle.book[sheet_name]
+        dimensions = _sheet_dimension(handle.book._archive, worksheet._worksheet_path)
+        if dimensions is None or dimensions[3] <= 1:
+            return None
+        return dimensions[3] - 1
+
+    def count_rows(self, handle, sheet_name: str) -> int:
+        """
+        Sin dimensión declarada se busca la última etiqueta <row> del XML
+        descomprimido (su atributo r, o su posición si no lo tiene), sin parsear celdas
+        """
+        rows = self.declared_rows(handle, sheet_name)
+        if rows is not None:
+            return rows
+
+        last_row = 0
+        tail = b""
+        with handle.book._archive.open(handle.book[sheet_name]._worksheet_path) as sheet_xml:
+            while True:
+                chunk = sheet_xml.read(1 << 20)
+                block = tail + chunk
+                # Desde el último "<" pasa al siguiente bloque: una etiqueta partida
+                # se analiza completa una sola vez (al final del archivo, todo)
+                cut = block.rfind(b"<") if chunk else len(block)
+                if cut < 0:
+                    cut = len(block)
+                for attributes in ROW_TAG_RE.findall(block, 0, cut):
+                    number = ROW_NUMBER_RE.search(attributes)
+                    last_row = int(number.group(1)) if number else last_row + 1
+                tail = block[cut:]
+                if not chunk:
+                    break
+        return max(last_row - 1, 0)
+
+
+class CsvReader(TableReader):
+    """
+    CSV con el parser C de pandas, o con pyarrow (multi-hilo) para lecturas
+    completas si está instalado
+    """
+    name = "csv"
+
+    @contextmanager
+    def open(self, file_content: FileSource):
+        with open_source(file_content) as source:
+            yield source
+
+    def sheet_names(self, handle) -> List[str]:
+        return [SINGLE_SHEET_NAME]
+
+    def _read(self, handle, **kwargs) -> "pd.DataFrame":
+        import pandas as pd
+        handle.seek(0)
+        return pd.read_csv(handle, sep=settings.CSV_DELIMITER, encoding=settings.CSV_ENCODING, **kwargs)
+
+    def read_sheet(self, handle, sheet_name: str, offset: int = 0, limit: Optional[int] = None) -> "pd.DataFrame":
+        if offset == 0 and limit is None and importlib.util.find_spec("pyarrow") is not None:
+            return self._read(handle, engine="pyarrow")
+        skiprows = range(1, offset + 1) if offset else None
+        return self._read(handle, skiprows=skiprows, nrows=limit)
+
+    def count_rows(self, handle, sheet_name: str) -> int:
+        return len(self._read(handle, usecols=[0]))
+
+    def estimated_rows(self, handle, sheet_name: str) -> int:
+        """
+        Extrapolación del largo promedio de las líneas del inicio del archivo
+        """
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        handle.seek(0)
+        sample = handle.read(CSV_SAMPLE_BYTES)
+        lines = sample.count(b"\n")
+        if len(sample) < size and lines:
+            lines = int(size * lines / len(sample))
+        elif sample and not sample.endswith(b"\n"):
+            lines += 1
+        return max(lines - 1, 0)
+
+
+class ParquetReader(TableReader):
+    """
+    Parquet (columnar, con tipos): el número de filas sale de los metadatos
+    """
+    name = "parquet"
+    requires = ("pyarrow",)
+
+    @contextmanager
+    def open(self, file_content: FileSource):
+        import pyarrow.parquet as pq
+        with open_source(file_content) as source:
+            yield pq.ParquetFile(source)
+
+    def sheet_names(self, handle) -> List[str]:
+        return [SINGLE_SHEET_NAME]
+
+    def read_sheet(self, handle, sheet_name: str, offset: int = 0, limit: Optional[int] = None) -> "pd.DataFrame":
+        """
+        Una ventana lee solo los row groups que la contienen (según los
+        metadatos), por lotes, y se detiene al completarla
+        """
+        import pyarrow as pa
+        if offset == 0 and limit is None:
+            return handle.read().to_pandas()
+
+        end = None if limit is None else offset + limit
+        row_groups = []
+        skip = 0
+        start = 0
+        for index in range(handle.num_row_groups if limit != 0 else 0):
+            rows = handle.metadata.row_group(index).num_rows
+            if start + rows > offset and (end is None or start < end):
+                if not row_groups:
+                    skip = offset - start
+                row_groups.append(index)
+            start += rows
+
+        batches = []
+        remaining = limit
+        if row_groups:
+            for batch in handle.iter_batches(batch_size=PARQUET_BATCH_ROWS, row_groups=row_groups):
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                batch = batch.slice(skip, remaining)
+                skip = 0
+                batches.append(batch)
+                if remaining is not None:
+                    remaining -= batch.num_rows
+                    if remaining <= 0:
+                        break
+        if not batches:
+            return handle.schema_arrow.empty_table().to_pandas()
+        return pa.Table.from_batches(batches).to_pandas()
+
+    def read_header(self, handle, sheet_name: str) -> Optional[tuple]:
+        return tuple(handle.schema_arrow.names) or None
+
+    def declared_rows(self, handle, sheet_name: str) -> Optional[int]:
+        return handle.metadata.num_rows
+
+
+_READERS: Dict[str, Type[TableReader]] = {
+    OpenpyxlReader.name: OpenpyxlReader,
+    CalamineReader.name: CalamineReader,
+    XlrdReader.name: XlrdReader,
+    CsvReader.name: CsvReader,
+    ParquetReader.name: ParquetReader,
+}
+
+# Lector por defecto para cada extensión (XLSX_READER cambia el de .xlsx)
+_DEFAULT_READERS: Dict[str, str] = {
+    ".xlsx": "openpyxl",
+    ".xls": "xlrd",
+    ".csv": "csv",
+    ".parquet": "parquet",
+}
+
+
+def register_reader(name: str, reader: Type[TableReader], extensions: Tuple[str, ...] = ()) -> None:
+    """
+    Registrar un lector adicional (y opcionalmente usarlo para ciertas extensiones)
+    """
+    _READERS[name] = reader
+    for extension in extensions:
+        _DEFAULT_READERS[extension] = name
+
+
+def get_reader(extension: str) -> TableReader:
+    """
+    Lector para una extensión según la configuración
+    Si el backend configurado no está instalado se usa el de por defecto.
+    """
+    default = _DEFAULT_READERS.get(extension)
+    if default is None:
+        raise ValueError(f"Formato de archivo no soportado: {extension or 'desconocido'}")
+
+    name = settings.XLSX_READER if extension == ".xlsx" else default
+    reader = _READERS.get(name)
+    if reader is None or not reader.available():
+        if name != default:
+            logger.warning("⚠️ Lector '%s' no disponible para %s, usando '%s'", name, extension, default)
+        reader = _READERS[default]
+    return reader()
+
+
+def get_reader_for(file_content: FileSource) -> TableReader:
+    return get_reader(detect_extension(file_content))
+
+
+def sheet_dimensions(file_content: FileSource, sheet_names: Optional[List[str]] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    (filas aproximadas, columnas) de cada hoja sin cargarla; `sheet_names`
+    None = todas (las que no existen se omiten)
+    """
+    reader = get_reader_for(file_content)
+    dimensions = {}
+    with reader.open(file_content) as handle:
+        available = reader.sheet_names(handle)
+        for sheet_name in (available if sheet_names is None else sheet_names):
+            if sheet_name in available:
+                columns = len(reader.read_header(handle, sheet_name) or ())
+                dimensions[sheet_name] = (reader.estimated_rows(handle, sheet_name) if columns else 0, columns)
+    return dimensions
+
+
+def benchmark(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Tiempo de lectura completa de cada archivo con cada backend disponible que lo soporta
+    """
+    results = []
+    for path in paths:
+        extension = detect_extension(path)
+        candidates = [name for name, reader in _READERS.items() if reader.available()]
+        if extension == ".xlsx":
+            candidates = [name for name in candidates if name in ("openpyxl", "calamine")]
+        else:
+            candidates = [_DEFAULT_READERS[extension]] if extension in _DEFAULT_READERS else []
+        for name in candidates:
+            reader = _READERS[name]()
+            start = time.perf_counter()
+            with reader.open(path) as handle:
+                rows = sum(len(reader.read_sheet(handle, sheet)) for sheet in reader.sheet_names(handle))
+            elapsed = time.perf_counter() - start
+            results.append({
+                "file": os.path.basename(path),
+                "reader": name,
+                "rows": rows,
+                "seconds": round(elapsed, 3),
+                "rows_per_second": int(rows / elapsed) if elapsed else None,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark(sys.argv[1:]):
+        print(
+            f"{result['file']:<30} {result['reader']:<10} {result['rows']:>10} filas "
+            f"{result['seconds']:>8.3f} s {result['rows_per_second'] or 0:>12} filas/s"
+        )
@@ -0,0 +1,117 @@
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import Table, exists, func, select
+from sqlalchemy.sql import Select
+from app.config import get_settings
+from app.database import engine
+from app.models import DataError, DataImported
+from app.utils.background import PeriodicTask
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Espera antes de la primera ejecución (no competir con el warm-up)
+RETENTION_INITIAL_DELAY = 60.0
+
+
+class RetentionService:
+    """
+    Retención del historial de importaciones
+    Cada RETENTION_INTERVAL segundos borra los errores (y opcionalmente las
+    importaciones) más antiguos que la retención configurada, en lotes de
+    RETENTION_BATCH_SIZE filas con una transacción corta cada uno y como
+    máximo RETENTION_MAX_BATCHES lotes por ejecución. El número de errores de
+    cada importación se conserva en data_imported.error_count.
+    """
+
+    def __init__(self, interval: float, error_days: int, import_days: int, batch_size: int, max_batches: int):
+        self.error_days = error_days
+        self.import_days = import_days
+        self.batch_size = max(batch_size, 1)
+        self.max_batches = max(max_batches, 1)
+        self.last_run: Optional[Dict[str, float]] = None
+        self._task = PeriodicTask("retention", interval, self.run_once, initial_delay=RETENTION_INITIAL_DELAY)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.error_days or self.import_days)
+
+    def _delete_in_batches(self, table: Table, ids_query: Select, budget: int) -> Tuple[int, int]:
+        """
+        Borrar las filas cuyos ids retorna `ids_query`, hasta `budget` lotes
+        Retorna (filas borradas, lotes usados). Los ids se leen primero: MySQL
+        no admite LIMIT en un DELETE ... IN (subconsulta).
+        """
+        deleted = batches = 0
+        while batches < budget:
+            batches += 1
+            with engine.begin() as conn:
+                ids = conn.execute(ids_query.limit(self.batch_size)).scalars().all()
+                if ids:
+                    conn.execute(table.delete().where(table.c.id.in_(ids)))
+            deleted += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        return deleted, batches
+
+    def run_once(self) -> Dict[str, float]:
+        """
+        Ejecutar una pasada de retención
+        """
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            db_now = conn.execute(select(func.now())).scalar()
+        result = {"errors_deleted": 0, "imports_deleted": 0}
+        budget = self.max_batches
+
+        if self.error_days:
+            cutoff = db_now - timedelta(days=self.error_days)
+            result["errors_deleted"], used = self._delete_in_batches(
+                DataError.__table__,
+                select(DataError.id).where(DataError.error_date < cutoff).order_by(DataError.error_date),
+                budget,
+            )
+            budget -= used
+
+        if self.import_days and budget > 0:
+            cutoff = db_now - timedelta(days=self.import_days)
+            old_imports = select(DataImported.id).where(DataImported.import_date < cutoff)
+            # Primero los errores que aún referencian importaciones antiguas (FK)
+            errors, used = self._delete_in_batches(
+                DataError.__table__,
+                select(DataError.id).where(DataError.import_id.in_(old_imports)),
+                budget,
+            )
+            result["errors_deleted"] += errors
+            budget -= used
+            if budget > 0:
+                result["imports_deleted"], _ = self._delete_in_batches(
+                    DataImported.__table__,
+                    old_imports.where(~exists().where(DataError.import_id == DataImported.id))
+                    .order_by(DataImported.import_date),
+                    budget,
+                )
+
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.last_run = result
+        if result["errors_deleted"] or result["imports_deleted"]:
+            logger.info(
+                "🧹 Retención: %s errores y %s importaciones eliminados en %.1f ms",
+                result["errors_deleted"], result["imports_deleted"], result["duration_ms"], extra=result
+            )
+        return result
+
+    def start(self) -> None:
+        if self.enabled:
+            self._task.start()
+
+    async def stop(self) -> None:
+        await self._task.stop()
+
+
+retention = RetentionService(
+    settings.RETENTION_INTERVAL, settings.IMPORT_ERROR_RETENTION_DAYS, settings.IMPORT_HISTORY_RETENTION_DAYS,
+    settings.RETENTION_BATCH_SIZE, settings.RETENTION_MAX_BATCHES,
+)
@@ -0,0 +1,334 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Any, Optional, Tuple
+from app.config import get_settings
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Frecuencia máxima de la limpieza de archivos expirados (segundos)
+CLEANUP_INTERVAL = 60
+
+# Tamaño de bloque al copiar o re-hashear archivos
+COPY_BLOCK_SIZE = 1024 * 1024
+
+STATUS_UPLOADING = "uploading"
+STATUS_COMPLETE = "complete"
+
+
+class UploadNotFoundError(ValueError):
+    """
+    El upload_id no existe o ya expiró
+    """
+
+
+class UploadConflictError(ValueError):
+    """
+    La operación no es compatible con el estado actual de la subida
+    (offset distinto al esperado, subida incompleta, checksum distinto...)
+    """
+
+    def __init__(self, message: str, received: Optional[int] = None):
+        super().__init__(message)
+        self.received = received
+
+
+class UploadStore:
+    """
+    Archivos subidos guardados en disco con un ID
+    Permite reutilizar el mismo archivo entre requests (preview paginado,
+    validación, importación) sin volver a subirlo. Los metadatos se guardan
+    junto al archivo, así cualquier worker puede resolver el ID.
+    Los archivos grandes pueden subirse por partes (create_upload, write_part,
+    complete_upload) y reanudarse tras un corte consultando `received`.
+    """
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+        self._last_cleanup = 0.0
+        self._lock = threading.Lock()
+        # upload_id -> (bytes hasheados, sha256 en curso) de las subidas por partes
+        # que pasaron por este proceso; si la parte anterior la recibió otro worker
+        # el hash se recalcula desde disco
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+
+    def _ensure_dir(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def _data_path(self, upload_id: str, extension: str) -> str:
+        # Se conserva la extensión original: los lectores (openpyxl, pandas) la usan para detectar el formato
+        return os.path.join(self.directory, f"{upload_id}{extension}")
+
+    @staticmethod
+    def _extension(filename: str) -> str:
+        extension = os.path.splitext(filename or "")[1].lower()
+        return extension if re.match(r"^\.[a-z0-9]{1,10}$", extension) else ".bin"
+
+    @staticmethod
+    def _check_id(upload_id: str) -> None:
+        if not _UPLOAD_ID_RE.match(upload_id or ""):
+            raise UploadNotFoundError(f"upload_id inválido: {upload_id}")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _lock_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.lock")
+
+    def _write_meta(self, upload_id: str, meta: Dict[str, Any]) -> None:
+        tmp_path = self._meta_path(upload_id) + ".tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, self._meta_path(upload_id))
+
+    def save_file(self, source: BinaryIO, filename: str) -> str:
+        """
+        Guardar un archivo copiándolo por bloques desde un objeto archivo
+        (p.ej. UploadFile.file) sin cargarlo completo en memoria
+        """
+        self._ensure_dir()
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        extension = self._extension(filename)
+        source.seek(0)
+        with open(self._data_path(upload_id, extension), "wb") as data_file:
+            shutil.copyfileobj(source, data_file, COPY_BLOCK_SIZE)
+            size = data_file.tell()
+        self._write_meta(upload_id, {
+            "filename": filename,
+            "extension": extension,
+            "size": size,
+            "created_at": time.time(),
+        })
+        return upload_id
+
+    # ---------- subida por partes ----------
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """
+        Lock exclusivo entre procesos sobre una subida (flock de un archivo .lock;
+        no se usa el de metadatos porque se reemplaza en cada escritura)
+        """
+        try:
+            lock_file = open(self._lock_path(upload_id), "r")
+        except FileNotFoundError:
+            raise UploadNotFoundError(f"No existe el archivo subido {upload_id} (puede haber expirado)")
+        with lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def create_upload(self, filename: str, size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Iniciar una subida por partes y retornar sus metadatos
+        """
+        self._ensure_dir()
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        open(self._part_path(upload_id), "wb").close()
+        open(self._lock_path(upload_id), "wb").close()
+        now = time.time()
+        meta = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "extension": self._extension(filename),
+            "size": size,
+            "received": 0,
+            "status": STATUS_UPLOADING,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._write_meta(upload_id, meta)
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return meta
+
+    def _hasher_at(self, upload_id: str, received: int):
+        """
+        SHA-256 de los primeros `received` bytes de la parte (recalculado desde disco
+        si este proceso no tiene el estado al día)
+        """
+        state = self._hashers.get(upload_id)
+        if state is not None and state[0] == received:
+            return state[1]
+        hasher = hashlib.sha256()
+        remaining = received
+        with open(self._part_path(upload_id), "rb") as part_file:
+            while remaining > 0:
+                block = part_file.read(min(COPY_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        logger.info("🔁 SHA-256 de la subida %s recalculado desde disco (%s bytes)", upload_id, received)
+        return hasher
+
+    def write_part(self, upload_id: str, offset: int, source: BinaryIO) -> Dict[str, Any]:
+        """
+        Agregar una parte en la posición `offset`
+        Las partes deben llegar en orden: offset debe ser igual a los bytes ya
+        recibidos. Reenviar una parte ya recibida (reintento tras un corte) no
+        tiene efecto.
+        """
+        self._check_id(upload_id)
+        with self._locked(upload_id):
+            meta = self.get_meta(upload_id)
+            received = meta["received"]
+            if meta.get("status") != STATUS_UPLOADING:
+                raise UploadConflictError(f"La subida {upload_id} ya fue completada", received)
+
+            source.seek(0, os.SEEK_END)
+            length = source.tell()
+            source.seek(0)
+            if offset != received:
+                if offset < received and offset + length <= received:
+                    return meta
+                raise UploadConflictError(
+                    f"Offset {offset} inválido, se esperaba {received}", received
+                )
+            if meta["size"] is not None and received + length > meta["size"]:
+                raise UploadConflictError(
+                    f"La parte excede el tamaño declarado ({meta['size']} bytes)", received
+                )
+            if received + length > settings.CHUNKED_UPLOAD_MAX_SIZE:
+                raise UploadConflictError(
+                    f"El archivo excede el tamaño máximo ({settings.CHUNKED_UPLOAD_MAX_SIZE} bytes)", received
+                )
+
+            hasher = self._hasher_at(upload_id, received)
+            with open(self._part_path(upload_id), "r+b") as part_file:
+                # Se descarta cualquier resto de una parte interrumpida
+                part_file.seek(received)
+                part_file.truncate()
+                while True:
+                    block = source.read(COPY_BLOCK_SIZE)
+                    if not block:
+                        break
+                    part_file.write(block)
+                    hasher.update(block)
+
+            meta["received"] = received + length
+            meta["updated_at"] = time.time()
+            self._write_meta(upload_id, meta)
+            self._hashers[upload_id] = (meta["received"], hasher)
+            return meta
+
+    def complete_upload(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cerrar una subida por partes: verifica tamaño y checksum y deja el
+        archivo disponible para preview / validación / importación
+        """
+        self._check_id(upload_id)
+        with self._locked(upload_id):
+            meta = self.get_meta(upload_id)
+            if meta.get("status") == STATUS_COMPLETE:
+                return meta
+            received = meta["received"]
+            if meta["size"] is not None and received != meta["size"]:
+                raise UploadConflictError(
+                    f"Subida incompleta: {received} de {meta['size']} bytes", received
+                )
+
+            digest = self._hasher_at(upload_id, received).hexdigest()
+            if sha256 and sha256.lower() != digest:
+                raise UploadConflictError(f"El SHA-256 no coincide (calculado {digest})", received)
+
+            os.replace(self._part_path(upload_id), self._data_path(upload_id, meta["extension"]))
+            meta.update({"size": received, "sha256": digest, "status": STATUS_COMPLETE, "updated_at": time.time()})
+            self._write_meta(upload_id, meta)
+            self._hashers.pop(upload_id, None)
+            return meta
+
+    def get_meta(self, upload_id: str) -> Dict[str, Any]:
+        self._check_id(upload_id)
+        try:
+            with open(self._meta_path(upload_id)) as meta_file:
+                meta = json.load(meta_file)
+        except FileNotFoundError:
+            raise UploadNotFoundError(f"No existe el archivo subido {upload_id} (puede haber expirado)")
+        if self._expired(meta, time.time()):
+            self.delete(upload_id)
+            raise UploadNotFoundError(f"El archivo subido {upload_id} expiró")
+        return meta
+
+    def _expired(self, meta: Dict[str, Any], now: float) -> bool:
+        # Las subidas por partes expiran según su última actividad
+        return bool(self.ttl) and now - meta.get("updated_at", meta["created_at"]) > self.ttl
+
+    def path(self, upload_id: str) -> str:
+        """
+        Ruta en disco del archivo (valida que exista, esté completo y no haya expirado)
+        """
+        meta = self.get_meta(upload_id)
+        if meta.get("status", STATUS_COMPLETE) != STATUS_COMPLETE:
+            raise UploadConflictError(
+                f"La subida {upload_id} no está completa ({meta['received']} bytes recibidos)", meta["received"]
+            )
+        return self._data_path(upload_id, meta["extension"])
+
+    def delete(self, upload_id: str) -> None:
+        self._check_id(upload_id)
+        self._hashers.pop(upload_id, None)
+        try:
+            with open(self._meta_path(upload_id)) as meta_file:
+                extension = json.load(meta_file)["extension"]
+            os.remove(self._data_path(upload_id, extension))
+        except (OSError, ValueError, KeyError):
+            pass
+        for path in (self._part_path(upload_id), self._lock_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def cleanup_expired(self) -> int:
+        """
+        Eliminar archivos expirados (como máximo una vez por CLEANUP_INTERVAL)
+        """
+        now = time.time()
+        with self._lock:
+            if not self.ttl or now - self._last_cleanup < CLEANUP_INTERVAL:
+                return 0
+            self._last_cleanup = now
+
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-5]
+            try:
+                with open(os.path.join(self.directory, name)) as meta_file:
+                    expired = self._expired(json.load(meta_file), now)
+            except (OSError, ValueError, KeyError):
+                continue
+            if expired:
+                self.delete(upload_id)
+                removed += 1
+        if removed:
+            logger.info("🧹 %s archivos subidos expirados eliminados", removed)
+        return removed
+
+
+upload_store = UploadStore(settings.UPLOAD_DIR or os.path.join(tempfile.gettempdir(), "nomina_uploads"), settings.UPLOAD_TTL)
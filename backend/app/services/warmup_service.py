@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Dict, Any, Optional
+from app.database import init_db, prefill_pool
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Reintentos del chequeo de esquema en modo "fast" (la BD puede tardar en aceptar conexiones)
+SCHEMA_RETRY_INITIAL = 1.0
+SCHEMA_RETRY_MAX = 30.0
+
+
+class WarmupService:
+    """
+    Tareas de arranque que se ejecutan después de que la API reporta "live":
+    verificación del esquema (modo fast), pre-llenado del pool y carga de pandas/openpyxl
+    """
+
+    def __init__(self):
+        self.schema_ready = False
+        self.done = False
+        self.duration_ms: Optional[float] = None
+        self.errors: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_schema_ready(self) -> None:
+        self.schema_ready = True
+
+    def start(self) -> None:
+        """
+        Lanzar el warm-up en segundo plano
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.run), name="warmup")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            # El hilo no se puede interrumpir; solo se deja de esperar
+            self._task.cancel()
+        self._task = None
+
+    def run(self) -> None:
+        start = time.perf_counter()
+
+        if not self.schema_ready:
+            self._ensure_schema()
+
+        self._step("pool", self._warm_pool)
+        self._step("orm", self._warm_orm)
+        self._step("excel", self._warm_excel)
+
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.done = True
+        logger.info("🔥 Warm-up completado en %s ms", self.duration_ms)
+
+    def _ensure_schema(self) -> None:
+        delay = SCHEMA_RETRY_INITIAL
+        while True:
+            try:
+                init_db()
+                self.schema_ready = True
+                self.errors.pop("schema", None)
+                return
+            except Exception as e:
+                self.errors["schema"] = str(e)
+                logger.warning("⚠️ Esquema no disponible, reintentando en %ss: %s", delay, e)
+                time.sleep(delay)
+                delay = min(delay * 2, SCHEMA_RETRY_MAX)
+
+    def _step(self, name: str, func) -> None:
+        try:
+            func()
+        except Exception as e:
+            self.errors[name] = str(e)
+            logger.warning("⚠️ Warm-up '%s' falló: %s", name, e)
+
+    @staticmethod
+    def _warm_pool() -> None:
+        size = prefill_pool()
+        logger.info("🔌 Pool de conexiones pre-llenado (%s conexiones)", size)
+
+    @staticmethod
+    def _warm_orm() -> None:
+        from sqlalchemy.orm import configure_mappers
+        import app.models  # noqa: F401
+        from app.services.cargo_registry import cargo_registry
+        configure_mappers()
+        cargo_registry.load()
+
+    @staticmethod
+    def _warm_excel() -> None:
+        import importlib
+        import pandas  # noqa: F401
+        import openpyxl  # noqa: F401
+        from app.services.readers import get_reader
+        # Engine configurado para .xlsx (XLSX_READER); avisa si no está instalado
+        for module in get_reader(".xlsx").requires:
+            importlib.import_module(module)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "schema_ready": self.schema_ready,
+            "done": self.done,
+            "duration_ms": self.duration_ms,
+            "errors": self.errors,
+        }
+
+
+warmup = WarmupService()
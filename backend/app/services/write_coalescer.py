@@ -0,0 +1,133 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from app import crud
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Employee
+from app.schemas import EmployeeCreate
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_Pending = Tuple[EmployeeCreate, asyncio.Future]
+
+
+def _write_batch(employees: List[EmployeeCreate]) -> List[Union[Employee, Exception]]:
+    """
+    Escribir un lote en una transacción; si falla, cada empleado por separado
+    (un registro inválido solo hace fallar a su propio request)
+    """
+    db = SessionLocal()
+    try:
+        try:
+            return list(crud.create_employees_batch(db, employees))
+        except Exception as e:
+            db.rollback()
+            if len(employees) == 1:
+                return [e]
+            logger.warning("⚠️ Lote de %s empleados falló (%s), se reintenta uno por uno", len(employees), e)
+        results: List[Union[Employee, Exception]] = []
+        for employee in employees:
+            try:
+                results.extend(crud.create_employees_batch(db, [employee]))
+            except Exception as e:
+                db.rollback()
+                results.append(e)
+        return results
+    finally:
+        db.close()
+
+
+class WriteCoalescer:
+    """
+    Agrupa las altas individuales de empleados concurrentes (group commit)
+    Cada alta espera hasta `max_delay` segundos o hasta juntar `max_batch`
+    empleados; el lote se inserta en una sola transacción (en un hilo) y cada
+    request recibe su empleado con el id asignado. Hay un solo lote en
+    escritura a la vez: lo que llega mientras tanto forma el siguiente, así
+    que con más carga los lotes crecen solos. Uno por worker, en el event loop.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max(max_delay, 0.0)
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self._wait_total = 0.0
+
+    async def create(self, employee: EmployeeCreate) -> Employee:
+        """
+        Encolar el alta y esperar el empleado creado
+        Si el request se cancela el alta igual se escribe con su lote.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((employee, future))
+        if self._flushing is None:
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None or not self._pending:
+            return
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._flushing = asyncio.create_task(self._write(batch))
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        start = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(_write_batch, [employee for employee, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        try:
+            self._wait_total += (time.perf_counter() - start) * len(batch)
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._flushing = None
+            # Lo acumulado durante la escritura ya esperó: se escribe enseguida
+            self._flush()
+
+    async def drain(self) -> None:
+        """
+        Escribir lo pendiente y esperar los lotes en curso (al cerrar la aplicación)
+        """
+        while self._pending or self._flushing is not None:
+            self._flush()
+            if self._flushing is not None:
+                await asyncio.shield(self._flushing)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.EMPLOYEE_WRITE_COALESCING,
+            "max_batch": self.max_batch,
+            "max_delay_ms": round(self.max_delay * 1000, 1),
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": round(self.rows / self.batches, 1) if self.batches else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_write_ms": round(self._wait_total / self.rows * 1000, 1) if self.rows else 0.0,
+        }
+
+
+employee_writes = WriteCoalescer(settings.WRITE_COALESCE_MAX_BATCH, settings.WRITE_COALESCE_MAX_DELAY_MS / 1000)
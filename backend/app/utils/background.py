@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.config import get_settings
+from app.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class MonitoredThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor que cuenta las tareas en espera y en ejecución
+    (ThreadPoolExecutor no expone su cola)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, thread_name_prefix: str = ""):
+        super().__init__(max_workers, thread_name_prefix)
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._stats_lock:
+            self.queued += 1
+        try:
+            future = super().submit(self._tracked, fn, *args, **kwargs)
+        except BaseException:
+            with self._stats_lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _tracked(self, fn, *args, **kwargs):
+        with self._stats_lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self.running -= 1
+
+    def _on_done(self, future: Future) -> None:
+        # Cancelada antes de empezar (asyncio.to_thread cancelado, shutdown): no pasó por _tracked
+        if future.cancelled():
+            with self._stats_lock:
+                self.queued -= 1
+
+    def statistics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"threads_in_use": self.running, "threads_total": self._max_workers, "queue_depth": self.queued}
+
+
+# Executor por defecto del event loop (asyncio.to_thread / run_in_executor(None, ...))
+default_executor: Optional[MonitoredThreadPoolExecutor] = None
+
+
+def install_default_executor() -> MonitoredThreadPoolExecutor:
+    """
+    Reemplazar el executor por defecto del loop actual por uno medible
+    Se crea por proceso (en el startup), nunca antes del fork de los workers.
+    """
+    global default_executor
+    default_executor = MonitoredThreadPoolExecutor(settings.EXECUTOR_MAX_WORKERS or None, thread_name_prefix="asyncio")
+    asyncio.get_running_loop().set_default_executor(default_executor)
+    return default_executor
+
+
+class PeriodicTask:
+    """
+    Ejecuta una función síncrona cada `interval` segundos en un hilo del executor,
+    sin bloquear el event loop
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None], initial_delay: float = 0):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """
+        Iniciar la tarea en el event loop actual
+        """
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """
+        Cancelar la tarea y esperar a que termine
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        if self.initial_delay:
+            await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await asyncio.to_thread(self.func)
+            except Exception as e:
+                logger.error("Error en tarea periódica %s: %s", self.name, e)
+            await asyncio.sleep(self.interval)
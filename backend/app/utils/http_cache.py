@@ -0,0 +1,124 @@
+"""
+Validación condicional (ETag / If-None-Match) de las lecturas de empleados
+
+    python -m app.utils.http_cache [filas ...]
+
+compara el costo de una respuesta 304 con el de una 200 para páginas de ese tamaño.
+"""
+import hashlib
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Sequence
+from fastapi import Request, Response
+
+
+def make_etag(*parts: object) -> str:
+    """
+    ETag débil a partir de las partes que identifican la versión del recurso
+    """
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Evaluar If-None-Match
+    No se usa Last-Modified / If-Modified-Since: updated_at tiene resolución de un
+    segundo y una actualización en el mismo segundo devolvería un 304 obsoleto.
+    El ETag incluye los valores serializados, así que es el único validador.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return _etag_matches(if_none_match, etag)
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Respuesta 304 sin cuerpo
+    """
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def apply_cache_headers(response: Response, etag: str) -> None:
+    response.headers.update(cache_headers(etag))
+
+
+def resource_version(item: object, fields: Sequence[str]) -> str:
+    """
+    Versión de un recurso: id, updated_at y los valores de los campos que se serializan
+    updated_at tiene resolución de un segundo (TIMESTAMP de MySQL, SQLite): dos
+    cambios en el mismo segundo solo se distinguen por los valores.
+    """
+    names = dict.fromkeys(("id", "updated_at", *fields))
+    return "|".join(repr(getattr(item, name)) for name in names)
+
+
+def collection_version(items: Iterable[object], fields: Sequence[str]) -> List[str]:
+    """
+    Versiones de la página para construir el ETag de un listado
+    """
+    return [resource_version(item, fields) for item in items]
+
+
+def benchmark(rows: int, repeat: int = 200) -> Dict[str, float]:
+    """
+    Milisegundos por request de una página de `rows` empleados sintéticos (sin BD):
+    304 (versión + ETag + comparación) vs. 200 (lo mismo + serialización)
+    """
+    from types import SimpleNamespace
+    from app import schemas
+
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    employees = [
+        SimpleNamespace(id=index, nombre=f"Empleado {index}", edad=30, sexo="Femenino", cargo="Dev",
+                        cargo_id=1, sueldo=1000.0 + index, created_at=now, updated_at=now)
+        for index in range(rows)
+    ]
+    fields = schemas.EMPLOYEE_FIELDS
+    etag = make_etag("employees", 0, rows, rows, *collection_version(employees, fields))
+    request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                       "headers": [(b"if-none-match", etag.encode())]})
+
+    def cached() -> None:
+        current = make_etag("employees", 0, rows, rows, *collection_version(employees, fields))
+        assert is_not_modified(request, current)
+        not_modified(current)
+
+    def full() -> None:
+        make_etag("employees", 0, rows, rows, *collection_version(employees, fields))
+        [schemas.EmployeeResponse.model_validate(employee).model_dump(mode="json") for employee in employees]
+
+    results = {}
+    for name, call in (("304", cached), ("200", full)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            call()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+if __name__ == "__main__":
+    for rows in [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]:
+        timings = benchmark(rows)
+        print(f"{rows:>6} empleados  304: {timings['304']:8.3f} ms  200: {timings['200']:8.3f} ms  "
+              f"({timings['200'] / timings['304']:.1f}x)")
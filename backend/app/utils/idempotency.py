@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+# Los archivos del form parseado son de Starlette (fastapi.UploadFile es una subclase)
+from starlette.datastructures import UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from app.config import get_settings
+from app.database import engine
+from app.models import IdempotencyKey
+from app.utils.background import PeriodicTask
+from app.utils.logger_config import get_logger
+from app.utils.response import APIResponse, ResponseType
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Presente (con valor "true") en las respuestas repetidas desde el store
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Estados de una clave en idempotency_keys
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# Cada cuánto un duplicado consulta si el request original terminó (segundos)
+POLL_INTERVAL = 0.25
+
+# Claves vencidas borradas por lote y lotes por limpieza
+PURGE_BATCH_SIZE = 1000
+PURGE_MAX_BATCHES = 50
+
+# (status HTTP, cuerpo, headers sin content-length)
+StoredResponse = Tuple[int, bytes, List[Tuple[str, str]]]
+
+_keys = IdempotencyKey.__table__
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IdempotencyStore:
+    """
+    Respuestas por Idempotency-Key en la tabla idempotency_keys, compartida
+    por todos los workers (un reintento puede llegar a cualquiera)
+    - claim(): inserta la clave "en curso"; la clave primaria garantiza que un
+      solo request la obtiene. El dueño renueva locked_until mientras se
+      ejecuta (renew); si su worker muere, la clave se puede tomar cuando vence.
+    - complete(): guarda la respuesta hasta IDEMPOTENCY_TTL, o borra la clave
+      si la respuesta no se conserva (429/5xx) para que el cliente reintente.
+    Los métodos son síncronos (consultas a la BD): se llaman con asyncio.to_thread.
+    """
+
+    def __init__(self, ttl: float, lock_timeout: float):
+        self.ttl = ttl
+        self.lock_timeout = max(lock_timeout, 1.0)
+        self._purge_task = PeriodicTask(
+            "idempotency-purge", settings.IDEMPOTENCY_PURGE_INTERVAL, self.purge_expired,
+            initial_delay=settings.IDEMPOTENCY_PURGE_INTERVAL
+        )
+
+    def get(self, key: str) -> Optional[Row]:
+        with engine.connect() as conn:
+            return conn.execute(select(_keys).where(_keys.c.idempotency_key == key)).first()
+
+    def claim(self, key: str, fingerprint: str, method: str, path: str) -> Tuple[bool, Optional[Row]]:
+        """
+        Tomar la clave para ejecutar el request
+        Retorna (True, None) si este request es el dueño; (False, fila) si la
+        clave ya existe y sigue vigente; (False, None) si cambió mientras se
+        consultaba (reintentar).
+        """
+        now = _utcnow()
+        values = {
+            "fingerprint": fingerprint, "method": method, "path": path[:255], "status": IN_PROGRESS,
+            "status_code": None, "response_headers": None, "response_body": None,
+            "locked_until": now + timedelta(seconds=self.lock_timeout),
+            "expires_at": now + timedelta(seconds=self.ttl),
+        }
+        try:
+            with engine.begin() as conn:
+                conn.execute(_keys.insert().values(idempotency_key=key, **values))
+            return True, None
+        except IntegrityError:
+            pass
+
+        with engine.begin() as conn:
+            row = conn.execute(select(_keys).where(_keys.c.idempotency_key == key)).first()
+            if row is None:
+                return False, None
+            if row.expires_at > now and (row.status == COMPLETED or row.locked_until > now):
+                return False, row
+            # Vencida, o en curso sin renovar (el worker dueño terminó): tomarla si nadie lo hizo antes
+            result = conn.execute(
+                update(_keys)
+                .where(_keys.c.idempotency_key == key, _keys.c.status == row.status,
+                       _keys.c.locked_until == row.locked_until)
+                .values(**values)
+            )
+        if result.rowcount == 1 and row.status == IN_PROGRESS and row.expires_at > now:
+            logger.warning("⚠️ Clave de idempotencia abandonada, se vuelve a ejecutar", extra={"idempotency_key": key})
+        return result.rowcount == 1, None
+
+    def renew(self, key: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                update(_keys)
+                .where(_keys.c.idempotency_key == key, _keys.c.status == IN_PROGRESS)
+                .values(locked_until=_utcnow() + timedelta(seconds=self.lock_timeout))
+            )
+
+    def complete(self, key: str, response: Optional[StoredResponse], keep: bool = True) -> None:
+        """
+        Terminar el request original
+        `response` None (streaming) deja la clave completada sin respuesta: los
+        reintentos reciben 409 en vez de repetir la operación.
+        """
+        if not keep:
+            self.release(key)
+            return
+        values: Dict[str, Any] = {"status": COMPLETED, "expires_at": _utcnow() + timedelta(seconds=self.ttl)}
+        if response is not None:
+            status_code, body, headers = response
+            values.update(status_code=status_code, response_body=body, response_headers=json.dumps(headers))
+        with engine.begin() as conn:
+            conn.execute(update(_keys).where(_keys.c.idempotency_key == key).values(**values))
+
+    def release(self, key: str) -> None:
+        """
+        Borrar la clave (el request falló o su respuesta no se conserva)
+        """
+        with engine.begin() as conn:
+            conn.execute(delete(_keys).where(_keys.c.idempotency_key == key, _keys.c.status == IN_PROGRESS))
+
+    def purge_expired(self) -> int:
+        """
+        Borrar las claves vencidas en lotes cortos
+        """
+        deleted = 0
+        for _ in range(PURGE_MAX_BATCHES):
+            with engine.begin() as conn:
+                keys = conn.execute(
+                    select(_keys.c.idempotency_key).where(_keys.c.expires_at < _utcnow()).limit(PURGE_BATCH_SIZE)
+                ).scalars().all()
+                if keys:
+                    conn.execute(delete(_keys).where(_keys.c.idempotency_key.in_(keys)))
+            deleted += len(keys)
+            if len(keys) < PURGE_BATCH_SIZE:
+                break
+        if deleted:
+            logger.info("🧹 %s claves de idempotencia vencidas eliminadas", deleted)
+        return deleted
+
+    def start(self) -> None:
+        self._purge_task.start()
+
+    async def stop(self) -> None:
+        await self._purge_task.stop()
+
+    def clear(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(delete(_keys))
+
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_TTL, settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+
+# Bloque de lectura al calcular el sha256 de los archivos de un multipart
+FILE_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _file_digest(upload: UploadFile) -> str:
+    """
+    sha256 del contenido de un archivo del form (ya en el SpooledTemporaryFile),
+    dejándolo al inicio para el endpoint
+    """
+    digest = hashlib.sha256()
+    upload.file.seek(0)
+    for chunk in iter(lambda: upload.file.read(FILE_HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    upload.file.seek(0)
+    return digest.hexdigest()
+
+
+async def _form_hash(request: Request) -> str:
+    """
+    Huella de un multipart por contenido: cada campo con su valor y cada archivo
+    con su nombre y el sha256 de sus bytes (el boundary cambia entre reintentos)
+    El form queda cacheado en el request: el endpoint no lo vuelve a parsear.
+    """
+    try:
+        form = await request.form()
+    except Exception:
+        return ""  # El endpoint responde el error del multipart
+    parts = []
+    for name, value in form.multi_items():
+        if isinstance(value, UploadFile):
+            parts.append(f"{name}={value.filename}:{await asyncio.to_thread(_file_digest, value)}")
+        else:
+            parts.append(f"{name}={value}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+async def _fingerprint(request: Request) -> str:
+    """
+    Huella del request: método, ruta, query, tamaño y el contenido del cuerpo
+    - multipart: los campos y el sha256 de cada archivo (ver _form_hash)
+    - otros: el sha256 del cuerpo si tiene hasta IDEMPOTENCY_HASH_MAX_BYTES
+    Dos archivos distintos del mismo tamaño con la misma clave dan otra huella (422).
+    """
+    length = request.headers.get("content-length", "")
+    body_hash = ""
+    if request.headers.get("content-type", "").startswith("multipart/"):
+        body_hash = await _form_hash(request)
+    elif length.isdigit() and int(length) <= settings.IDEMPOTENCY_HASH_MAX_BYTES:
+        # El cuerpo queda cacheado en el request: el endpoint lo vuelve a leer sin costo
+        body_hash = hashlib.sha256(await request.body()).hexdigest()
+    parts = (request.method, request.url.path, request.url.query, length, body_hash)
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _is_transient(status_code: int, body: bytes) -> bool:
+    """
+    429 / 5xx no se guardan: el cliente debe poder reintentar con la misma clave
+    Muchos endpoints responden HTTP 200 con el código real en el sobre de APIResponse.
+    """
+    if status_code == 429 or status_code >= 500:
+        return True
+    if body[:1] == b"{":
+        try:
+            envelope_status = json.loads(body).get("status")
+        except ValueError:
+            return False
+        return isinstance(envelope_status, int) and (envelope_status == 429 or envelope_status >= 500)
+    return False
+
+
+def _stored(response: Response) -> Optional[StoredResponse]:
+    body = getattr(response, "body", None)
+    if not isinstance(body, bytes):
+        return None  # Respuestas en streaming: no se pueden repetir
+    headers = [(name, value) for name, value in response.headers.items() if name != "content-length"]
+    return response.status_code, body, headers
+
+
+def _replay(row: Row) -> Response:
+    if row.status_code is None:
+        return _error(409, "Conflicto", "El request original no produjo una respuesta repetible")
+    response = Response(content=row.response_body, status_code=row.status_code,
+                        headers=dict(json.loads(row.response_headers or "[]")))
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _error(status_code: int, title: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content=APIResponse.format_response(status_code=status_code, type_=ResponseType.ERROR, title=title, message=message)
+    )
+
+
+async def _keep_alive(key: str) -> None:
+    """
+    Renovar el lock de la clave mientras el request original se ejecuta
+    """
+    while True:
+        await asyncio.sleep(idempotency_store.lock_timeout / 3)
+        try:
+            await asyncio.to_thread(idempotency_store.renew, key)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo renovar la clave de idempotencia: %s", e, extra={"idempotency_key": key})
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Ruta con soporte del header Idempotency-Key en POST/PUT/PATCH/DELETE
+    - Clave nueva: se ejecuta el endpoint y se guarda la respuesta (salvo 429/5xx)
+    - Clave con respuesta guardada: se repite sin ejecutar el endpoint
+    - Clave en curso (en este u otro worker): el duplicado espera el resultado
+      del request original consultando la tabla
+    - Clave reutilizada con otro método, ruta, query o cuerpo: 422
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if not self.methods & MUTATING_METHODS:
+            return handler
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return await handler(request)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return _error(422, "Error de Validación", f"{IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres")
+
+            fingerprint = await _fingerprint(request)
+            waiting = False
+            while True:
+                owned, row = await asyncio.to_thread(
+                    idempotency_store.claim, key, fingerprint, request.method, request.url.path
+                )
+                if owned:
+                    break
+                if row is None:
+                    continue
+                if row.fingerprint != fingerprint:
+                    return _error(
+                        422, "Clave de Idempotencia Reutilizada",
+                        f"La clave ya se usó con otro request ({row.method} {row.path})"
+                    )
+                if row.status == COMPLETED:
+                    return _replay(row)
+                if not waiting:
+                    waiting = True
+                    logger.info("🔁 Request duplicado en curso, esperando al original", extra={"idempotency_key": key})
+                # Esperar a que el original termine (o que su lock venza si el worker murió)
+                while row is not None and row.status == IN_PROGRESS and row.locked_until > _utcnow():
+                    await asyncio.sleep(POLL_INTERVAL)
+                    row = await asyncio.to_thread(idempotency_store.get, key)
+                if row is not None and row.status == COMPLETED:
+                    return _replay(row)
+
+            keep_alive = asyncio.create_task(_keep_alive(key))
+            try:
+                response = await handler(request)
+            except BaseException:
+                keep_alive.cancel()
+                await asyncio.shield(asyncio.to_thread(idempotency_store.release, key))
+                raise
+            keep_alive.cancel()
+            stored = _stored(response)
+            keep = stored is None or not _is_transient(stored[0], stored[1])
+            await asyncio.to_thread(idempotency_store.complete, key, stored, keep)
+            return response
+
+        return idempotent_handler
@@ -1,28 +1,239 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from app.config import get_settings
 
 # Formato de log
-LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
+LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(request_id)s | %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# ID del request en curso (lo asigna el middleware de main.py)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Atributos estándar de LogRecord que no se exportan como campos extra en JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "suppressed"}
+
+# Plantillas distintas recordadas por RateLimitFilter (las menos usadas se olvidan)
+RATE_LIMIT_MAX_BUCKETS = 1024
+
+_queue_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Agrega el ID del request actual a cada registro
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita los mensajes repetitivos (por fila / por hoja)
+    Cuenta por plantilla de mensaje (logger + msg sin formatear), de modo que
+    los logs con argumentos perezosos ("%s") de un mismo punto comparten cupo.
+    Los niveles WARNING o superiores nunca se descartan.
+    Los cupos vencidos se descartan y se guardan como máximo max_buckets
+    plantillas, para que los mensajes con texto variable no acumulen memoria.
+    """
+    def __init__(self, rate: int, window: float, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        """
+        Quitar los cupos menos usados que ya vencieron y, si aún sobran, los más antiguos
+        """
+        if now - self._last_prune >= self.window:
+            self._last_prune = now
+            while self._buckets:
+                bucket = next(iter(self._buckets.values()))
+                if now - bucket[0] < self.window:
+                    break
+                self._buckets.popitem(last=False)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            # bucket = [inicio_ventana, emitidos, suprimidos]
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self._buckets[key] = [now, 1, 0]
+                self._buckets.move_to_end(key)
+                self._prune(now)
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            self._buckets.move_to_end(key)
+            if bucket[1] < self.rate:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formato JSON estructurado (una línea por registro)
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            payload["suppressed"] = suppressed
+
+        # Campos extra pasados con logger.info(..., extra={...})
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+
+        # QueueHandler.prepare ya incorporó el traceback en el mensaje
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Formato de texto legible, indicando los mensajes suprimidos por rate limit
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        line = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            line += f" (+{suppressed} mensajes similares suprimidos)"
+        return line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que descarta registros si la cola está llena en lugar de bloquear
+    """
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+def _start_listener() -> None:
+    """
+    Crear la cola compartida y arrancar el hilo que escribe a stdout
+    """
+    global _queue_handler, _listener
+    settings = get_settings()
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_JSON:
+        console_handler.setFormatter(JSONFormatter())
+    else:
+        console_handler.setFormatter(TextFormatter(LOG_FORMAT, DATE_FORMAT))
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_WINDOW))
+    handler.addFilter(RequestIdFilter())
+
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    if _queue_handler is None:
+        _queue_handler = handler
+    else:
+        # Reutilizar el handler ya asociado a los loggers existentes
+        _queue_handler.queue = log_queue
+
+
+def _restart_listener_after_fork() -> None:
+    """
+    Los hilos no sobreviven a fork(): el proceso hijo necesita su propio listener
+    """
+    global _listener
+    if _listener is not None:
+        _listener = None
+        _start_listener()
+
+
+def stop_logging() -> None:
+    """
+    Vaciar la cola y detener el hilo de escritura
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _get_queue_handler() -> logging.Handler:
+    with _lock:
+        if _listener is None:
+            _start_listener()
+        return _queue_handler
+
+
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def set_request_id(request_id: str):
+    """
+    Asignar el ID de request del contexto actual (retorna token para reset)
+    """
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    """
+    Restaurar el ID de request previo
+    """
+    request_id_var.reset(token)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Configurar y retornar logger
+    Los registros se encolan y un hilo en segundo plano hace la escritura.
     """
     logger = logging.getLogger(name)
-    
+
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Handler para consola
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
-        # Formato
-        formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+        logger.setLevel(get_settings().LOG_LEVEL.upper())
+        logger.addHandler(_get_queue_handler())
+
+    return logger
@@ -0,0 +1,116 @@
+"""
+Costo de logging en el hilo que emite el registro
+- Handler directo a un stdout lento vs. NonBlockingQueueHandler + QueueListener
+- RateLimitFilter: registro que pasa (miss) vs. registro suprimido (hit)
+
+    python -m app.utils.logging_benchmark [registros]
+
+imprime los microsegundos por registro de cada configuración. Son tiempos de
+reloj: dependen de la máquina, por eso no forman parte de la suite de tests.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict
+from app.utils.logger_config import NonBlockingQueueHandler, RateLimitFilter, RequestIdFilter, TextFormatter, LOG_FORMAT, DATE_FORMAT
+
+RECORDS = 2000
+# Latencia de cada escritura en el stdout simulado (pipe del contenedor con el colector atrasado)
+WRITE_LATENCY = 0.0002
+
+
+class SlowStream:
+    """
+    Stream que tarda WRITE_LATENCY en cada escritura
+    """
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, text: str) -> None:
+        time.sleep(WRITE_LATENCY)
+        self.lines += 1
+
+    def flush(self) -> None:
+        pass
+
+
+def _logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def _per_record(logger: logging.Logger, records: int) -> float:
+    """
+    Microsegundos por llamada a logger.info en el hilo que emite
+    """
+    start = time.perf_counter()
+    for row in range(records):
+        logger.info("Procesando fila %s de %s", row, records)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def _stream_handler(stream: SlowStream) -> logging.Handler:
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter(LOG_FORMAT, DATE_FORMAT))
+    return handler
+
+
+def measure_direct(records: int = RECORDS) -> float:
+    handler = _stream_handler(SlowStream())
+    handler.addFilter(RequestIdFilter())
+    return _per_record(_logger("direct", handler), records)
+
+
+def measure_queue(rate: int = 0, window: float = 60.0, records: int = RECORDS) -> float:
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=records * 2))
+    handler.addFilter(RateLimitFilter(rate, window))
+    handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(handler.queue, _stream_handler(SlowStream()))
+    listener.start()
+    try:
+        return _per_record(_logger(f"queue-{rate}", handler), records)
+    finally:
+        listener.stop()
+
+
+def measure_rate_limit(records: int = RECORDS) -> Dict[str, float]:
+    """
+    Costo del filtro cuando el registro pasa (miss) y cuando se suprime (hit)
+    """
+    miss_filter = RateLimitFilter(rate=records * 10, window=60.0)
+    hit_filter = RateLimitFilter(rate=1, window=60.0)
+    record = logging.LogRecord("bench", logging.INFO, __file__, 0, "Procesando fila %s", ("fila",), None)
+    hit_filter.filter(record)  # Consume el cupo: los siguientes se suprimen
+
+    timings = {}
+    for name, log_filter in (("miss", miss_filter), ("hit", hit_filter)):
+        start = time.perf_counter()
+        for _ in range(records):
+            log_filter.filter(record)
+        timings[name] = (time.perf_counter() - start) / records * 1e6
+    return timings
+
+
+def benchmark(records: int = RECORDS) -> Dict[str, float]:
+    """
+    Microsegundos por registro de cada configuración
+    """
+    rate_limit = measure_rate_limit(records)
+    return {
+        "Handler directo (stdout lento)": measure_direct(records),
+        "QueueHandler sin rate limit": measure_queue(rate=0, records=records),
+        "QueueHandler con rate limit": measure_queue(rate=20, records=records),
+        "RateLimitFilter miss (emite)": rate_limit["miss"],
+        "RateLimitFilter hit (suprime)": rate_limit["hit"],
+    }
+
+
+if __name__ == "__main__":
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS
+    for name, micros in benchmark(records).items():
+        print(f"{name + ':':<32} {micros:8.2f} µs/registro")
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Comentario enviado si no hay eventos en este intervalo (evita que un proxy corte la conexión)
+HEARTBEAT_INTERVAL = 15.0
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_event(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, default=str, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventStream:
+    """
+    Eventos Server-Sent Events producidos desde cualquier hilo
+    `emit()` y `close()` pueden llamarse desde el hilo que ejecuta el trabajo;
+    `events()` se itera en el event loop (StreamingResponse). Se crea dentro
+    del event loop.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._last_id += 1
+            message = format_event(self._last_id, event, data)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+    async def events(self) -> AsyncIterator[str]:
+        while True:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield message
@@ -0,0 +1,31 @@
+"""
+Configuración común de las pruebas
+La aplicación apunta a una base SQLite temporal (DB_URL) antes de importar
+app.config; las settings se leen una sola vez al importar.
+"""
+import os
+import tempfile
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="nomina-tests-")
+os.environ.setdefault("DB_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+@pytest.fixture
+def db_engine():
+    """
+    Engine de la aplicación con las tablas de los modelos recién creadas
+    """
+    from app import models  # noqa: F401 (registra los modelos en Base)
+    from app.database import Base, engine
+    from app.services.cargo_registry import cargo_registry
+    from app.services.employee_cache import employee_cache
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    cargo_registry.clear()
+    employee_cache.clear()
+    yield engine
+    cargo_registry.clear()
+    employee_cache.clear()
+    engine.dispose()
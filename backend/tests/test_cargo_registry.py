@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import event, select, text
+from app.models import Cargo
+from app.services.cargo_registry import _insert_ignoring_duplicates, cargo_registry
+
+
+def _catalog(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Cargo.nombre, Cargo.id)).all())
+
+
+def test_ids_for_creates_missing_cargos(db_engine):
+    ids = cargo_registry.ids_for(["Dev", "Ops", "Dev"])
+
+    assert ids == _catalog(db_engine)
+    assert set(ids) == {"Dev", "Ops"}
+
+
+def test_duplicate_does_not_discard_the_rest_of_the_batch(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(Cargo.__table__.insert(), {"nombre": "Dev"})
+
+    with db_engine.begin() as conn:
+        created = _insert_ignoring_duplicates(conn, ["Dev", "Ops", "QA"])
+
+    assert created == 2
+    assert set(_catalog(db_engine)) == {"Dev", "Ops", "QA"}
+
+
+def test_cargo_created_concurrently_by_another_worker(db_engine):
+    # Otro worker confirma "Ops" entre la consulta inicial y el INSERT del lote
+    raced = []
+
+    def create_concurrently(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO cargos") and not raced:
+            raced.append(statement)
+            with db_engine.connect() as other:
+                other.execute(text("INSERT INTO cargos (nombre) VALUES ('Ops')"))
+                other.commit()
+
+    event.listen(db_engine, "before_cursor_execute", create_concurrently)
+
+    try:
+        ids = cargo_registry.ids_for(["Dev", "Ops", "QA"])
+    finally:
+        event.remove(db_engine, "before_cursor_execute", create_concurrently)
+
+    assert raced
+    assert ids == _catalog(db_engine)
+    assert set(ids) == {"Dev", "Ops", "QA"}
+
+
+def test_unresolvable_cargo_fails_with_clear_error(db_engine, monkeypatch):
+    monkeypatch.setattr("app.services.cargo_registry._insert_ignoring_duplicates", lambda conn, names: 0)
+
+    with pytest.raises(ValueError, match="Dev"):
+        cargo_registry.ids_for(["Dev"])
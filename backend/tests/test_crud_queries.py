@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import crud
+from app.schemas import EmployeeCreate
+
+
+@pytest.fixture
+def db(db_engine):
+    with Session(db_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def employee_id(db):
+    employee = crud.create_employee(db, EmployeeCreate(
+        nombre="Ana Pérez", edad=30, sexo="Femenino", cargo="Dev", sueldo=1000.0
+    ))
+    return employee.id
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_patch_is_one_update_returning(db, db_engine, employee_id):
+    with count_statements(db_engine) as statements:
+        employee = crud.patch_employee(db, employee_id, {"sueldo": 1500.0})
+
+    assert employee.sueldo == 1500.0
+    # UPDATE ... RETURNING + registro en employee_changes
+    assert statements == ["UPDATE", "INSERT"]
+
+
+def test_patch_without_returning_reads_back_once(db, db_engine, employee_id, monkeypatch):
+    monkeypatch.setattr(db_engine.dialect, "update_returning", False)
+
+    with count_statements(db_engine) as statements:
+        employee = crud.patch_employee(db, employee_id, {"edad": 31})
+
+    assert employee.edad == 31
+    assert statements == ["UPDATE", "SELECT", "INSERT"]
+
+
+def test_patch_cargo_uses_cached_catalog(db, db_engine, employee_id):
+    with count_statements(db_engine) as statements:
+        employee = crud.patch_employee(db, employee_id, {"cargo": "Dev"})
+
+    assert employee.cargo == "Dev"
+    assert statements == ["UPDATE", "INSERT"]
+
+
+def test_patch_missing_employee_is_one_update(db, db_engine, employee_id):
+    with count_statements(db_engine) as statements:
+        assert crud.patch_employee(db, employee_id + 1, {"sueldo": 1500.0}) is None
+
+    assert statements == ["UPDATE"]
+
+
+def test_delete_is_one_delete(db, db_engine, employee_id):
+    with count_statements(db_engine) as statements:
+        assert crud.delete_employee(db, employee_id)
+
+    # DELETE + tombstone en employee_changes
+    assert statements == ["DELETE", "INSERT"]
+
+
+def test_delete_missing_employee_is_one_delete(db, db_engine, employee_id):
+    with count_statements(db_engine) as statements:
+        assert not crud.delete_employee(db, employee_id + 1)
+
+    assert statements == ["DELETE"]
@@ -0,0 +1,33 @@
+import pytest
+from app.services import employee_cache
+from app.services.employee_cache import CacheBackend, NullBackend
+
+
+class IncompleteBackend(CacheBackend):
+    """
+    Backend compartido a medio implementar: le falta stats()
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+def test_incomplete_backend_fails_at_instantiation(monkeypatch):
+    monkeypatch.setitem(employee_cache._BACKENDS, "incompleto", IncompleteBackend)
+
+    with pytest.raises(TypeError, match="stats"):
+        employee_cache.create_backend("incompleto")
+
+
+def test_builtin_backends_implement_the_interface():
+    assert isinstance(employee_cache.create_backend("local"), CacheBackend)
+    assert NullBackend().stats() == {"backend": "none"}
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from app.services.excel_service import MISSING_TEXT, ExcelService
+
+
+def _sheet(**overrides):
+    data = {
+        "nombre": ["Ana", "Luis", "Eva"],
+        "edad": [30, 40, 50],
+        "sexo": ["femenino", "MASCULINO", "otro"],
+        "cargo": [" Dev ", "Ops", "Dev"],
+        "sueldo": [1000.0, 2000.0, 3000.0],
+    }
+    data.update(overrides)
+    return pd.DataFrame(data)
+
+
+def test_import_records_normalize_values():
+    records = ExcelService._to_import_records(_sheet())
+
+    assert [record["sexo"] for record in records] == ["Femenino", "Masculino", "Otro"]
+    assert [record["cargo"] for record in records] == ["Dev", "Ops", "Dev"]
+
+
+def test_blank_cells_are_not_replaced_by_other_rows_values():
+    df = _sheet(
+        nombre=["Ana", np.nan, "Eva"],
+        sexo=["femenino", np.nan, "masculino"],
+        cargo=["Dev", None, "Ops"],
+    )
+
+    records = ExcelService._to_import_records(df)
+
+    assert records[1]["nombre"] == MISSING_TEXT
+    assert records[1]["cargo"] == MISSING_TEXT
+    assert records[1]["sexo"] == "Otro"
+    assert [record["cargo"] for record in records] == ["Dev", MISSING_TEXT, "Ops"]
+    assert [record["sexo"] for record in records] == ["Femenino", "Otro", "Masculino"]
+
+
+def test_blank_cells_in_csv_import():
+    content = (
+        "Nombre,Edad,Sexo,Cargo,Sueldo\n"
+        "Ana,30,Femenino,Dev,1000\n"
+        ",40,,,2000\n"
+        "Luis,50,Masculino,Ops,3000\n"
+    ).encode()
+
+    sheet = next(ExcelService.iter_import_sheets(content, ["Hoja1"]))
+
+    assert sheet.records[1] == {
+        "nombre": MISSING_TEXT, "edad": 40, "sexo": "Otro", "cargo": MISSING_TEXT, "sueldo": 2000.0
+    }
+
+
+def test_import_records_share_one_object_per_value():
+    # Columnas str (pyarrow) como las entrega el lector con pandas 3
+    df = _sheet(
+        sexo=pd.array(["femenino", "femenino ", "otro"], dtype="str"),
+        cargo=pd.array([" Dev ", "Dev", "Dev"], dtype="str"),
+    )
+    records = ExcelService._to_import_records(df)
+
+    assert len({id(record["cargo"]) for record in records}) == 1
+    assert records[0]["sexo"] is records[1]["sexo"]
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import create_engine
+from app.services import health_service
+from app.services.health_service import HealthMonitor
+from app.utils import background
+
+
+@pytest.fixture
+def monitor():
+    return HealthMonitor(interval=60)
+
+
+def _readiness(monitor):
+    """
+    readiness() lee el threadpool de anyio: se llama desde un event loop
+    """
+    async def snapshot():
+        return monitor.readiness()
+    return asyncio.run(snapshot())
+
+
+def test_executor_status_measures_asyncio_to_thread(monkeypatch, monitor):
+    monkeypatch.setattr(health_service.settings, "READINESS_MAX_EXECUTOR_QUEUE", 3)
+    monkeypatch.setattr(background.settings, "EXECUTOR_MAX_WORKERS", 2)
+    release = threading.Event()
+
+    async def scenario():
+        executor = background.install_default_executor()
+        tasks = [asyncio.create_task(asyncio.to_thread(release.wait)) for _ in range(5)]
+        await asyncio.sleep(0.1)
+        busy = monitor.executor_status()
+        reasons = monitor.readiness()["reasons"]
+
+        # Cancelar una tarea en espera la saca de la cola
+        tasks[-1].cancel()
+        await asyncio.sleep(0.05)
+        after_cancel = executor.statistics()
+
+        release.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return busy, reasons, after_cancel, executor.statistics()
+
+    try:
+        busy, reasons, after_cancel, idle = asyncio.run(scenario())
+    finally:
+        background.default_executor = None
+
+    assert busy["threads_in_use"] == 2
+    assert busy["threads_total"] == 2
+    assert busy["queue_depth"] == 3
+    assert "executor queue backlog" in reasons
+    assert after_cancel["queue_depth"] == 2
+    assert idle == {"threads_in_use": 0, "threads_total": 2, "queue_depth": 0}
+
+
+def test_check_database_probes_read_replica(monkeypatch, monitor, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(health_service, "read_engine", broken)
+    monkeypatch.setattr(health_service, "replica_enabled", lambda: True)
+
+    monitor.check_database()
+    state = _readiness(monitor)
+
+    assert monitor.db_status == "connected"
+    assert monitor.read_db_status == "disconnected"
+    assert state["read_database"]["status"] == "disconnected"
+    assert "read replica disconnected" in state["reasons"]
+
+
+def test_without_replica_reads_follow_primary(monitor):
+    monitor.check_database()
+    state = _readiness(monitor)
+
+    assert state["read_database"] == {
+        "status": "connected", "error": None, "latency_ms": monitor.db_latency_ms, "replica": False
+    }
+    assert not any(reason.startswith("read replica") for reason in state["reasons"])
@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+from app import schemas
+from app.main import app
+
+EMPLOYEE = {"nombre": "Ana Pérez", "edad": 30, "sexo": "Femenino", "cargo": "Dev", "sueldo": 1000.0}
+
+
+@pytest.fixture
+def client(db_engine):
+    return TestClient(app)
+
+
+@pytest.fixture
+def employee_id(client):
+    response = client.post("/api/v1/employees", json=EMPLOYEE)
+    return response.json()["data"]["id"]
+
+
+@pytest.fixture
+def serializations(monkeypatch):
+    """
+    Cuenta los empleados serializados por los endpoints
+    """
+    calls = []
+    from_orm = schemas.EmployeeResponse.from_orm
+
+    def counting(obj):
+        calls.append(obj)
+        return from_orm(obj)
+
+    monkeypatch.setattr(schemas.EmployeeResponse, "from_orm", counting)
+    return calls
+
+
+@pytest.mark.parametrize("path", ["/api/v1/employees/{id}", "/api/v1/employees"])
+def test_not_modified_skips_serialization(client, employee_id, serializations, path):
+    url = path.format(id=employee_id)
+    etag = client.get(url).headers["ETag"]
+    serializations.clear()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert serializations == []
+
+
+@pytest.mark.parametrize("path", ["/api/v1/employees/{id}", "/api/v1/employees"])
+def test_update_in_the_same_second_changes_etag(client, employee_id, path):
+    url = path.format(id=employee_id)
+    first = client.get(url)
+
+    # updated_at (resolución de un segundo) suele quedar igual: el ETag debe cambiar igual
+    client.patch(f"/api/v1/employees/{employee_id}", json={"sueldo": 1500.0})
+    second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert "1500.0" in second.text
+
+
+def test_etag_of_projection_changes_with_its_fields(client, employee_id):
+    url = f"/api/v1/employees/{employee_id}"
+    etag = client.get(url, params={"fields": "id,nombre"}).headers["ETag"]
+
+    client.patch(url, json={"nombre": "Ana María Pérez"})
+    response = client.get(url, params={"fields": "id,nombre"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["data"] == {"id": employee_id, "nombre": "Ana María Pérez"}
+
+
+@pytest.mark.parametrize("path", ["/api/v1/employees/{id}", "/api/v1/employees"])
+def test_if_modified_since_never_returns_stale_304(client, employee_id, path):
+    url = path.format(id=employee_id)
+    first = client.get(url)
+    assert "Last-Modified" not in first.headers
+
+    # Mismo segundo que el alta: con Last-Modified este request daba 304 con datos viejos
+    client.patch(f"/api/v1/employees/{employee_id}", json={"sueldo": 1500.0})
+    second = client.get(url, headers={"If-Modified-Since": "Fri, 31 Dec 9999 23:59:59 GMT"})
+
+    assert second.status_code == 200
+    assert "1500.0" in second.text
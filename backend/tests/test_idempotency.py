@@ -0,0 +1,167 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from app.main import app
+from app.models import Employee
+from app.utils.idempotency import (
+    COMPLETED, IDEMPOTENCY_HEADER, IN_PROGRESS, REPLAYED_HEADER, _keys, _utcnow, idempotency_store,
+)
+
+ANA = {"nombre": "Ana Pérez", "edad": 30, "sexo": "Femenino", "cargo": "Dev", "sueldo": 1000.0}
+# Mismo tamaño de cuerpo que ANA
+EVA = {**ANA, "nombre": "Eva Pérez"}
+
+
+@pytest.fixture
+def client(db_engine):
+    return TestClient(app)
+
+
+def _employees(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Employee)).scalar()
+
+
+def _create(client, body, key="clave-1"):
+    return client.post("/api/v1/employees", json=body, headers={IDEMPOTENCY_HEADER: key})
+
+
+def test_retry_replays_the_original_response(client, db_engine):
+    first = _create(client, ANA)
+    retry = _create(client, ANA)
+
+    assert first.json()["status"] == 201
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert _employees(db_engine) == 1
+
+
+def test_key_reused_with_a_different_body_of_the_same_length(client, db_engine):
+    first = _create(client, ANA)
+    reused = _create(client, EVA)
+
+    assert len(first.request.content) == len(reused.request.content)
+    assert reused.status_code == 422
+    assert _employees(db_engine) == 1
+
+
+def test_duplicate_waits_for_the_request_in_progress(client, db_engine):
+    # Otro worker tiene la clave en curso: el duplicado espera su respuesta
+    _create(client, ANA, key="original")
+    with db_engine.connect() as conn:
+        original = conn.execute(select(_keys).where(_keys.c.idempotency_key == "original")).one()
+    with db_engine.begin() as conn:
+        conn.execute(_keys.insert().values(
+            {**original._mapping, "idempotency_key": "en-curso", "status": IN_PROGRESS,
+             "locked_until": _utcnow() + timedelta(seconds=30)}
+        ))
+
+    def finish():
+        time.sleep(0.5)
+        with db_engine.begin() as conn:
+            conn.execute(_keys.update().where(_keys.c.idempotency_key == "en-curso").values(status=COMPLETED))
+
+    worker = threading.Thread(target=finish)
+    worker.start()
+    start = time.monotonic()
+    response = _create(client, ANA, key="en-curso")
+    worker.join()
+
+    assert time.monotonic() - start >= 0.5
+    assert response.headers[REPLAYED_HEADER] == "true"
+    assert _employees(db_engine) == 1
+
+
+def test_abandoned_key_is_taken_over(client, db_engine):
+    # El worker que tenía la clave murió sin renovar el lock
+    _create(client, ANA, key="original")
+    with db_engine.begin() as conn:
+        conn.execute(_keys.update().where(_keys.c.idempotency_key == "original").values(
+            status=IN_PROGRESS, locked_until=_utcnow() - timedelta(seconds=1)
+        ))
+
+    response = _create(client, ANA, key="original")
+
+    assert response.json()["status"] == 201
+    assert REPLAYED_HEADER not in response.headers
+    assert _employees(db_engine) == 2
+
+
+def test_expired_keys_are_purged(client, db_engine):
+    _create(client, ANA)
+    with db_engine.begin() as conn:
+        conn.execute(_keys.update().values(expires_at=_utcnow() - timedelta(seconds=1)))
+
+    assert idempotency_store.purge_expired() == 1
+    assert REPLAYED_HEADER not in _create(client, ANA).headers
+    assert _employees(db_engine) == 2
+
+
+def _start_server(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("el servidor no arrancó")
+
+
+def test_retry_on_another_worker_process(db_engine, tmp_path):
+    # Dos procesos sobre la misma BD: el reintento llega al otro worker
+    env = {**os.environ, "DB_URL": f"sqlite:///{tmp_path / 'workers.db'}"}
+    servers = [_start_server(port, env) for port in (18461, 18462)]
+    try:
+        responses = [
+            httpx.post(f"http://127.0.0.1:{port}/api/v1/employees", json=ANA,
+                       headers={IDEMPOTENCY_HEADER: "multi-worker"}, timeout=10)
+            for port in (18461, 18462, 18461, 18462)
+        ]
+        totals = httpx.get("http://127.0.0.1:18462/api/v1/employees", timeout=10).json()["data"]["total"]
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(10)
+
+    assert [response.json()["status"] for response in responses] == [201] * 4
+    assert [REPLAYED_HEADER in response.headers for response in responses] == [False, True, True, True]
+    assert len({response.json()["data"]["id"] for response in responses}) == 1
+    assert totals == 1
+
+
+def _validate(client, content, key="archivo-1"):
+    return client.post(
+        "/api/v1/excel/validate",
+        files={"file": ("empleados.csv", content, "text/csv")},
+        headers={IDEMPOTENCY_HEADER: key},
+    )
+
+
+def test_multipart_fingerprint_uses_the_file_content(client, db_engine):
+    ana = b"nombre,edad,sexo,cargo,sueldo\nAna,30,Femenino,Dev,1000\n"
+    eva = ana.replace(b"Ana", b"Eva")
+
+    first = _validate(client, ana)
+    retry = _validate(client, ana)
+    reused = _validate(client, eva)
+
+    assert first.json()["status"] == 200
+    # Otro boundary, mismo archivo: se repite la respuesta
+    assert first.request.content != retry.request.content
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    # Mismo tamaño, otro contenido: la clave no se puede reutilizar
+    assert len(reused.request.content) == len(first.request.content)
+    assert reused.status_code == 422
@@ -0,0 +1,69 @@
+import logging
+import queue
+from app.utils import logger_config
+from app.utils.logger_config import NonBlockingQueueHandler, RateLimitFilter
+
+
+class CountingArg:
+    """
+    Argumento de log que cuenta cuántas veces se formatea
+    """
+    formatted = 0
+
+    def __str__(self) -> str:
+        CountingArg.formatted += 1
+        return "fila"
+
+
+def _record(msg, level=logging.INFO, name="test"):
+    return logging.LogRecord(name, level, __file__, 0, msg, (), None)
+
+
+def test_rate_limit_keeps_a_bounded_number_of_templates():
+    log_filter = RateLimitFilter(rate=5, window=60.0, max_buckets=100)
+
+    # Mensajes con texto variable (f-strings): una plantilla distinta por llamada
+    for index in range(10_000):
+        assert log_filter.filter(_record(f"Empleado {index} procesado"))
+
+    assert len(log_filter._buckets) == 100
+
+
+def test_rate_limit_drops_expired_templates(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(logger_config.time, "monotonic", lambda: now[0])
+    log_filter = RateLimitFilter(rate=5, window=10.0)
+    for index in range(50):
+        log_filter.filter(_record(f"Empleado {index} procesado"))
+
+    now[0] += 11
+    log_filter.filter(_record("Importación terminada"))
+
+    assert list(log_filter._buckets) == [("test", "Importación terminada")]
+
+
+def test_rate_limit_still_suppresses_and_reports_repeats():
+    log_filter = RateLimitFilter(rate=2, window=60.0)
+    results = [log_filter.filter(_record("Procesando fila %s")) for _ in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert log_filter._buckets[("test", "Procesando fila %s")][2] == 3
+    # WARNING o superior nunca se descarta ni ocupa cupo
+    assert log_filter.filter(_record("Fila inválida", logging.WARNING))
+    assert ("test", "Fila inválida") not in log_filter._buckets
+
+
+def test_suppressed_records_never_reach_the_queue_or_get_formatted():
+    CountingArg.formatted = 0
+    handler = NonBlockingQueueHandler(queue.Queue())
+    handler.addFilter(RateLimitFilter(rate=5, window=60.0))
+    logger = logging.getLogger("test.suppressed")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for _ in range(2000):
+        logger.info("Procesando fila %s", CountingArg())
+
+    # Solo los 5 del cupo llegan a la cola (y se formatean en QueueHandler.prepare)
+    assert handler.queue.qsize() == 5
+    assert CountingArg.formatted == 5
@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+from app import crud
+from app import migrations
+from app.migrations import SCHEMA_VERSION, get_current_version, run_migrations, schema_version
+from app.models import DataImported
+
+# Tablas como las creaba el init.sql anterior (traducido a SQLite)
+LEGACY_INIT_SQL = [
+    """CREATE TABLE employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, nombre VARCHAR(255) NOT NULL, edad INT NOT NULL,
+        sexo VARCHAR(10) NOT NULL, cargo VARCHAR(255) NOT NULL, sueldo DECIMAL(12, 2) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE data_imported (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, filename VARCHAR(500) NOT NULL, sheet_name VARCHAR(255) NOT NULL,
+        total_records INT NOT NULL DEFAULT 0, successful_records INT NOT NULL DEFAULT 0,
+        failed_records INT NOT NULL DEFAULT 0, import_status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        user_info JSON, metadata JSON, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, completed_at TIMESTAMP NULL)""",
+    """CREATE TABLE data_errors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, import_id INT, sheet_name VARCHAR(255) NOT NULL,
+        row_num INT NOT NULL, column_name VARCHAR(255), error_type VARCHAR(100) NOT NULL,
+        error_message TEXT NOT NULL, row_data JSON, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (import_id) REFERENCES data_imported(id))""",
+    "INSERT INTO employees (nombre, edad, sexo, cargo, sueldo) VALUES ('Juan Pérez', 35, 'Masculino', 'Dev', 4500)",
+    "INSERT INTO data_imported (filename, sheet_name, successful_records, import_status) "
+    "VALUES ('nomina.xlsx', 'Hoja1', 7, 'completed'), ('otra.xlsx', 'Hoja1', 0, 'failed')",
+]
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_fresh_database(sqlite_engine):
+    assert run_migrations(sqlite_engine) == SCHEMA_VERSION
+    assert run_migrations(sqlite_engine) == SCHEMA_VERSION
+
+
+def test_concurrent_workers_migrate_once(tmp_path, monkeypatch):
+    """
+    Dos workers arrancan a la vez contra una BD nueva (uvicorn --workers 2)
+    """
+    first_version, description, initial = migrations.MIGRATIONS[0]
+    applied = []
+
+    def slow_initial(conn):
+        applied.append(threading.get_ident())
+        time.sleep(0.3)  # Ventana en la que el otro worker ya leyó la versión 0
+        initial(conn)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(first_version, description, slow_initial), *migrations.MIGRATIONS[1:]])
+    engines = [create_engine(f"sqlite:///{tmp_path / 'workers.db'}") for _ in range(2)]
+    start = threading.Barrier(2)
+    results, errors = [], []
+
+    def worker(engine):
+        start.wait()
+        try:
+            results.append(run_migrations(engine))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [SCHEMA_VERSION, SCHEMA_VERSION]
+    assert len(applied) == 1
+    with engines[0].connect() as conn:
+        versions = conn.execute(select(schema_version.c.version)).scalars().all()
+    assert versions == list(range(1, SCHEMA_VERSION + 1))
+    for engine in engines:
+        engine.dispose()
+
+
+def test_legacy_init_sql_schema(sqlite_engine):
+    with sqlite_engine.begin() as conn:
+        for statement in LEGACY_INIT_SQL:
+            conn.execute(text(statement))
+
+    assert run_migrations(sqlite_engine) == SCHEMA_VERSION
+
+    with sqlite_engine.connect() as conn:
+        assert get_current_version(conn) == SCHEMA_VERSION
+    assert {"file_name", "import_date", "rows_imported", "status", "error_count"} <= _columns(sqlite_engine, "data_imported")
+    assert {"row_number", "error_date", "file_name", "import_id"} <= _columns(sqlite_engine, "data_errors")
+    assert "ix_data_imported_import_date" in {index["name"] for index in inspect(sqlite_engine).get_indexes("data_imported")}
+
+    with Session(sqlite_engine) as db:
+        legacy = db.execute(
+            select(DataImported.file_name, DataImported.rows_imported, DataImported.status).order_by(DataImported.id)
+        ).all()
+        assert legacy == [("nomina.xlsx", 7, "success"), ("otra.xlsx", 0, "error")]
+
+        record, = crud.add_import_records(db, [
+            {"sheet_name": "Hoja1", "rows_imported": 3, "file_name": "nuevo.xlsx", "status": "success"}
+        ])
+        db.commit()
+        assert [item.id for item in crud.get_import_records(db, file_name="nuevo.xlsx")] == [record.id]
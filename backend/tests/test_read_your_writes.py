@@ -0,0 +1,51 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app import main
+from app.database import LAST_WRITE_HEADER, reads_from_primary
+
+ORIGIN = "http://localhost:4200"
+EMPLOYEE = {"nombre": "Ana Pérez", "edad": 30, "sexo": "Femenino", "cargo": "Dev", "sueldo": 1000.0}
+
+
+def _request(headers=None, cookie=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    if cookie:
+        raw.append((b"cookie", cookie.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+@pytest.fixture
+def client(db_engine, monkeypatch):
+    monkeypatch.setattr(main, "replica_enabled", lambda: True)
+    return TestClient(main.app)
+
+
+def test_cross_origin_write_exposes_last_write_header(client):
+    # Sin cookies: como el cliente Angular en otro origen
+    response = client.post("/api/v1/employees", json=EMPLOYEE, headers={"Origin": ORIGIN})
+
+    last_write = response.headers[LAST_WRITE_HEADER]
+    assert abs(float(last_write) - time.time()) < 5
+    assert LAST_WRITE_HEADER.lower() in response.headers["access-control-expose-headers"].lower()
+    assert response.headers["access-control-allow-credentials"] == "true"
+
+
+def test_preflight_allows_last_write_header(client):
+    response = client.options("/api/v1/employees", headers={
+        "Origin": ORIGIN,
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": LAST_WRITE_HEADER,
+    })
+
+    assert response.status_code == 200
+    assert LAST_WRITE_HEADER.lower() in response.headers["access-control-allow-headers"].lower()
+
+
+def test_echoed_header_routes_reads_to_primary():
+    assert reads_from_primary(_request({LAST_WRITE_HEADER: f"{time.time():.3f}"}))
+    assert reads_from_primary(_request(cookie=f"last_write={time.time():.3f}"))
+    assert not reads_from_primary(_request({LAST_WRITE_HEADER: f"{time.time() - 3600:.3f}"}))
+    assert not reads_from_primary(_request({LAST_WRITE_HEADER: "no-es-un-número"}))
+    assert not reads_from_primary(_request())
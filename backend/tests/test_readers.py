@@ -0,0 +1,214 @@
+import io
+import re
+import zipfile
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from app.services import readers
+from app.services.excel_service import ExcelService
+
+ROWS = 5000
+HEADER = ["Nombre", "Edad", "Sexo", "Cargo", "Sueldo"]
+
+
+def _row(index):
+    return [f"Empleado {index}", 30, "Femenino", "Dev", 1000.0 + index]
+
+
+def _xlsx(path, dimension=True):
+    """
+    Libro de ROWS filas; sin `dimension` se quita la etiqueta <dimension> del XML
+    """
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Hoja1"
+    sheet.append(HEADER)
+    for index in range(ROWS):
+        sheet.append(_row(index))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    return _xlsx_copy(buffer, path, dimension)
+
+
+def _xlsx_copy(source, path, dimension=True):
+    with zipfile.ZipFile(source) as original, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in original.infolist():
+            data = original.read(item.filename)
+            if not dimension and item.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb"<dimension[^>]*/>", b"", data)
+            target.writestr(item, data)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def empty_row_count_cache():
+    readers._row_counts.clear()
+    yield
+    readers._row_counts.clear()
+
+
+@pytest.fixture
+def sheet_bytes_read(monkeypatch):
+    """
+    Bytes descomprimidos leídos del XML de las hojas
+    """
+    counter = {"bytes": 0}
+    read = zipfile.ZipExtFile.read
+
+    def counting(self, *args):
+        data = read(self, *args)
+        if self.name.startswith("xl/worksheets/"):
+            counter["bytes"] += len(data)
+        return data
+
+    monkeypatch.setattr(zipfile.ZipExtFile, "read", counting)
+    return counter
+
+
+@pytest.mark.parametrize("dimension", [True, False])
+def test_xlsx_open_does_not_scan_the_sheet(tmp_path, sheet_bytes_read, dimension):
+    path = _xlsx(tmp_path / "empleados.xlsx", dimension)
+    with zipfile.ZipFile(path) as archive:
+        sheet_size = archive.getinfo("xl/worksheets/sheet1.xml").file_size
+    sheet_bytes_read["bytes"] = 0
+
+    reader = readers.get_reader(".xlsx")
+    with reader.open(path) as handle:
+        assert reader.declared_rows(handle, "Hoja1") == (ROWS if dimension else None)
+        assert sheet_bytes_read["bytes"] < sheet_size / 10
+        assert reader.count_rows(handle, "Hoja1") == ROWS
+
+
+def test_xlsx_open_leaves_openpyxl_untouched(tmp_path):
+    path = _xlsx(tmp_path / "empleados.xlsx")
+
+    reader = readers.get_reader(".xlsx")
+    with reader.open(path) as handle:
+        reader.count_rows(handle, "Hoja1")
+
+    # Otros usuarios de openpyxl en el proceso siguen con su comportamiento
+    assert ReadOnlyWorksheet._get_size.__module__ == "openpyxl.worksheet._read_only"
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook["Hoja1"].max_row == ROWS + 1
+    workbook.close()
+
+
+@pytest.mark.parametrize("dimension", [True, False])
+def test_xlsx_pages_and_count_use_the_same_rows(tmp_path, dimension):
+    """
+    Filas vacías (3) y ausentes del XML (6-7) en medio de los datos
+    """
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Hoja1"
+    sheet.append(HEADER)
+    for row in range(2, 11):
+        if row == 3:
+            for column in range(1, len(HEADER) + 1):
+                sheet.cell(row=row, column=column).style = "Note"
+        elif row not in (6, 7):
+            sheet.append(_row(row))
+        sheet._current_row = row
+    source = tmp_path / "con_huecos.xlsx"
+    workbook.save(source)
+    path = _xlsx_copy(source, tmp_path / "huecos.xlsx", dimension)
+
+    reader = readers.get_reader(".xlsx")
+    with reader.open(path) as handle:
+        total = reader.count_rows(handle, "Hoja1")
+        full = reader.read_sheet(handle, "Hoja1")
+        pages = [reader.read_sheet(handle, "Hoja1", offset, 4) for offset in range(0, 12, 4)]
+
+    assert total == 9
+    assert len(full) == total
+    assert [len(page) for page in pages] == [4, 4, 1]
+    assert list(pd.concat(pages)["Nombre"].fillna("-")) == list(full["Nombre"].fillna("-"))
+
+
+def test_xlsx_single_cell_dimension_is_not_trusted(tmp_path):
+    path = _xlsx(tmp_path / "empleados.xlsx")
+    fixed = tmp_path / "a1.xlsx"
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(fixed, "w") as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', data)
+            target.writestr(item, data)
+
+    reader = readers.get_reader(".xlsx")
+    with reader.open(str(fixed)) as handle:
+        assert reader.count_rows(handle, "Hoja1") == ROWS
+
+
+def test_preview_pages_count_rows_once_per_upload(tmp_path, monkeypatch):
+    path = tmp_path / "empleados.csv"
+    pd.DataFrame([_row(index) for index in range(ROWS)], columns=HEADER).to_csv(path, index=False)
+    counts = []
+    count_rows = readers.CsvReader.count_rows
+
+    def counting(self, handle, sheet_name):
+        counts.append(sheet_name)
+        return count_rows(self, handle, sheet_name)
+
+    monkeypatch.setattr(readers.CsvReader, "count_rows", counting)
+
+    pages = [ExcelService.get_preview_data(str(path), ["Hoja1"], offset, 100)[0] for offset in (0, 100, 4900)]
+
+    assert counts == ["Hoja1"]
+    assert [page["total_rows"] for page in pages] == [ROWS] * 3
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert pages[2]["data"][-1]["nombre"] == f"Empleado {ROWS - 1}"
+
+
+def test_incomplete_reader_fails_at_instantiation(monkeypatch):
+    class SheetlessReader(readers.TableReader):
+        """
+        Lector sin sheet_names ni read_sheet
+        """
+        name = "incompleto"
+
+        def open(self, file_content):
+            return None
+
+    monkeypatch.setitem(readers._READERS, "incompleto", SheetlessReader)
+    monkeypatch.setitem(readers._DEFAULT_READERS, ".tsv", "incompleto")
+
+    with pytest.raises(TypeError, match="read_sheet"):
+        readers.get_reader(".tsv")
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = tmp_path / "empleados.parquet"
+    table = pa.Table.from_pandas(pd.DataFrame([_row(index) for index in range(ROWS)], columns=HEADER))
+    pq.write_table(table, path, row_group_size=1000)
+    return str(path)
+
+
+@pytest.mark.parametrize("offset, limit, row_groups", [
+    (2500, 100, [2]),
+    (950, 100, [0, 1]),
+    (4990, None, [4]),
+    (ROWS, 100, None),
+])
+def test_parquet_window_reads_only_its_row_groups(parquet_path, monkeypatch, offset, limit, row_groups):
+    requested = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def recording(self, *args, **kwargs):
+        requested.append(kwargs.get("row_groups"))
+        return iter_batches(self, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "iter_batches", recording)
+    reader = readers.get_reader(".parquet")
+    with reader.open(parquet_path) as handle:
+        df = reader.read_sheet(handle, "Hoja1", offset, limit)
+
+    expected = list(range(offset, min(ROWS, offset + (limit or ROWS))))
+    assert list(df.columns) == HEADER
+    assert list(df["Nombre"]) == [f"Empleado {index}" for index in expected]
+    assert requested == ([row_groups] if row_groups is not None else [])
@@ -0,0 +1,112 @@
+import os
+import socket
+import time
+import urllib.request
+import pytest
+from app import server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GOOD_APP = '''
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+'''
+
+# Responde un valor de la configuración de la app (leída al arrancar el worker)
+SETTINGS_APP = '''
+from app.config import get_settings
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": get_settings().XLSX_READER.encode()})
+'''
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    (tmp_path / "good_app.py").write_text(GOOD_APP)
+    (tmp_path / "broken_app.py").write_text('raise RuntimeError("falla al importar")\n')
+    (tmp_path / "settings_app.py").write_text(SETTINGS_APP)
+    # Los workers son intérpretes nuevos: reciben la configuración por el entorno
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join([str(tmp_path), BACKEND_DIR]))
+    monkeypatch.setenv("WORKER_GRACEFUL_TIMEOUT", "5")
+    monkeypatch.setattr(server.settings, "SERVER_HOST", "127.0.0.1")
+    monkeypatch.setattr(server.settings, "SERVER_PORT", _free_port())
+    monkeypatch.setattr(server.settings, "WORKER_BOOT_TIMEOUT", 20)
+    monkeypatch.setattr(server.settings, "WORKER_GRACEFUL_TIMEOUT", 5)
+    master = server.Master("good_app:app")
+    master.num_workers = 2
+    master.sock = master._bind()
+    for _ in range(master.num_workers):
+        assert master.wait_ready(master.spawn_worker())
+    yield master
+    master.shutdown()
+
+
+def _active(master):
+    master.reap_workers()
+    return {pid for pid, worker in master.workers.items() if not worker.stopping}
+
+
+def _get(master):
+    url = f"http://127.0.0.1:{server.settings.SERVER_PORT}/"
+    return urllib.request.urlopen(url, timeout=5).read()
+
+
+def test_rolling_restart_replaces_every_worker(master):
+    old = _active(master)
+
+    assert master.rolling_restart()
+
+    time.sleep(0.5)
+    new = _active(master)
+    assert len(new) == 2 and not new & old
+    assert _get(master) == b"ok"
+
+
+def test_rolling_restart_picks_up_new_settings(master, monkeypatch):
+    monkeypatch.setenv("XLSX_READER", "openpyxl")
+    master.app = "settings_app:app"
+    # El maestro ya tiene la configuración cacheada (como tras importar app.config)
+    server.get_settings()
+    assert master.rolling_restart()
+    time.sleep(0.5)
+    assert _get(master) == b"openpyxl"
+
+    monkeypatch.setenv("XLSX_READER", "calamine")
+    assert master.rolling_restart()
+
+    time.sleep(0.5)
+    assert _get(master) == b"calamine"
+
+
+def test_prepare_database_runs_migrations_in_a_subprocess(master, monkeypatch):
+    assert master.prepare_database()
+
+    monkeypatch.setenv("DB_URL", "sqlite:////nonexistent/dir/nomina.db")
+    assert not master.prepare_database()
+
+
+def test_rolling_restart_onto_broken_code_keeps_old_workers(master):
+    old = _active(master)
+    master.app = "broken_app:app"
+
+    assert not master.rolling_restart()
+
+    time.sleep(0.5)
+    assert _active(master) == old
+    assert _get(master) == b"ok"
+    # El pool está completo: no se crean más workers con el código roto
+    master.maintain_pool()
+    assert _active(master) == old
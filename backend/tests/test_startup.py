@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+# Presupuesto de `import app.main` (mejor de IMPORT_RUNS procesos); ~1 s en un CPU de desarrollo
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "2.5"))
+IMPORT_RUNS = 3
+
+# Se cargan en el warm-up, después de reportar "live"
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "python_calamine")
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _import_app():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "STARTUP_MODE": "fast", "PYTHONPATH": backend_dir}
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE], cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_main_within_budget():
+    runs = [_import_app() for _ in range(IMPORT_RUNS)]
+
+    assert all(run["loaded"] == [] for run in runs), runs[0]["loaded"]
+    best = min(run["seconds"] for run in runs)
+    assert best < IMPORT_BUDGET_SECONDS, f"import app.main tardó {best:.2f}s (presupuesto {IMPORT_BUDGET_SECONDS}s)"
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+from app.config import get_settings
+from app.main import app
+from app.services.admission import excel_admission
+from app.services.upload_store import upload_store
+
+CSV = b"Nombre,Edad,Sexo,Cargo,Sueldo\nAna,30,Femenino,Dev,1000\n"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _validate(client, mode="full"):
+    return client.post(
+        "/api/v1/validate", params={"mode": mode}, files={"file": ("empleados.csv", CSV, "text/csv")}
+    )
+
+
+def test_validate_full_mode(client):
+    response = _validate(client)
+
+    assert response.status_code == 200
+    assert response.json()["data"]["total_sheets"] == 1
+    assert excel_admission.active == 0
+
+
+def test_validate_full_mode_goes_through_admission(client, monkeypatch):
+    # Presupuesto completamente reservado y sin cola: la validación completa se rechaza
+    monkeypatch.setattr(excel_admission, "max_queue", 0)
+    monkeypatch.setattr(excel_admission, "in_use", excel_admission.budget)
+    rejected = excel_admission.rejected
+
+    response = _validate(client)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+    assert excel_admission.rejected == rejected + 1
+
+    # La validación de encabezados no reserva memoria
+    assert _validate(client, mode="headers").status_code == 200
+
+
+@pytest.fixture
+def off_loop_calls(monkeypatch):
+    """
+    Métodos del UploadStore llamados, y si se llamaron fuera del event loop
+    """
+    calls = {}
+
+    def spy(name):
+        method = getattr(upload_store, name)
+
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                calls[name] = False
+            except RuntimeError:
+                calls[name] = True
+            return method(*args, **kwargs)
+        monkeypatch.setattr(upload_store, name, wrapper)
+
+    for name in ("create_upload", "write_part", "complete_upload", "save_file", "get_meta", "path", "delete"):
+        spy(name)
+    return calls
+
+
+def test_upload_store_io_runs_off_the_event_loop(client, off_loop_calls):
+    created = client.post("/api/v1/uploads", json={"filename": "empleados.csv", "size": len(CSV)}).json()["data"]
+    upload_id = created["upload_id"]
+    client.put(f"/api/v1/uploads/{upload_id}/parts", params={"offset": 0}, content=CSV)
+    completed = client.post(f"/api/v1/uploads/{upload_id}/complete", json={"sha256": hashlib.sha256(CSV).hexdigest()})
+    client.get(f"/api/v1/uploads/{upload_id}")
+    _validate(client)
+    client.delete(f"/api/v1/uploads/{upload_id}")
+
+    assert completed.json()["data"]["status"] == "complete"
+    assert off_loop_calls == dict.fromkeys(
+        ("create_upload", "write_part", "complete_upload", "get_meta", "save_file", "path", "delete"), True
+    )
+
+
+def test_validate_uses_max_upload_size(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_SIZE", len(CSV) - 1)
+
+    response = _validate(client)
+
+    assert response.json()["status"] == 422
+    assert "excede el tamaño máximo" in response.json()["message"]
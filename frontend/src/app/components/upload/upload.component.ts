@@ -59,11 +59,11 @@ export class UploadComponent {
     this.errorMessage = '';
     
     // Validar tipo de archivo
-    const validExtensions = ['.xlsx', '.xls'];
+    const validExtensions = ['.xlsx', '.xls', '.csv', '.parquet'];
     const fileExtension = file.name.substring(file.name.lastIndexOf('.')).toLowerCase();
     
     if (!validExtensions.includes(fileExtension)) {
-      this.errorMessage = 'Solo se permiten archivos Excel (.xlsx, .xls)';
+      this.errorMessage = 'Solo se permiten archivos .xlsx, .xls, .csv o .parquet';
       return;
     }
 
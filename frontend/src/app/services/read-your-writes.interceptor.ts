@@ -0,0 +1,37 @@
+import { Injectable } from '@angular/core';
+import { HttpEvent, HttpHandler, HttpInterceptor, HttpRequest, HttpResponse } from '@angular/common/http';
+import { Observable } from 'rxjs';
+import { tap } from 'rxjs/operators';
+
+/** Header con el momento de la última escritura (lo envía la API tras cada POST/PUT/PATCH/DELETE) */
+export const LAST_WRITE_HEADER = 'X-Last-Write';
+
+/**
+ * Read-your-writes con réplica de lectura
+ * Guarda el último X-Last-Write recibido y lo repite en cada request, para que
+ * la API lea del primario justo después de una escritura. La API corre en otro
+ * origen, así que no se depende de la cookie last_write; igual se envían
+ * credenciales para los despliegues que sí la usan.
+ */
+@Injectable()
+export class ReadYourWritesInterceptor implements HttpInterceptor {
+  private lastWrite: string | null = null;
+
+  intercept(req: HttpRequest<unknown>, next: HttpHandler): Observable<HttpEvent<unknown>> {
+    const request = req.clone({
+      withCredentials: true,
+      setHeaders: this.lastWrite ? { [LAST_WRITE_HEADER]: this.lastWrite } : {}
+    });
+
+    return next.handle(request).pipe(
+      tap(event => {
+        if (event instanceof HttpResponse) {
+          const lastWrite = event.headers.get(LAST_WRITE_HEADER);
+          if (lastWrite) {
+            this.lastWrite = lastWrite;
+          }
+        }
+      })
+    );
+  }
+}
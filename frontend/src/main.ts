@@ -1,14 +1,16 @@
 import { bootstrapApplication } from '@angular/platform-browser';
 import { AppComponent } from './app/app.component';
 import { importProvidersFrom } from '@angular/core';
-import { HttpClientModule } from '@angular/common/http';
+import { HTTP_INTERCEPTORS, HttpClientModule } from '@angular/common/http';
 import { FormsModule } from '@angular/forms';
 import { CommonModule } from '@angular/common';
 import { ApiService } from './app/services/api.service';
+import { ReadYourWritesInterceptor } from './app/services/read-your-writes.interceptor';
 
 bootstrapApplication(AppComponent, {
   providers: [
     importProvidersFrom(HttpClientModule, FormsModule, CommonModule),
-    ApiService
+    ApiService,
+    { provide: HTTP_INTERCEPTORS, useClass: ReadYourWritesInterceptor, multi: true }
   ]
 }).catch(err => console.error(err));
\ No newline at end of file
@@ -18,40 +18,8 @@ CREATE TABLE IF NOT EXISTS employees (
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- Tabla de datos importados (auditoría)
-CREATE TABLE IF NOT EXISTS data_imported (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    filename VARCHAR(500) NOT NULL,
-    sheet_name VARCHAR(255) NOT NULL,
-    total_records INT NOT NULL DEFAULT 0,
-    successful_records INT NOT NULL DEFAULT 0,
-    failed_records INT NOT NULL DEFAULT 0,
-    import_status ENUM('pending', 'processing', 'completed', 'failed') NOT NULL DEFAULT 'pending',
-    user_info JSON,
-    metadata JSON,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    completed_at TIMESTAMP NULL,
-    INDEX idx_filename (filename),
-    INDEX idx_status (import_status),
-    INDEX idx_created_at (created_at)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Tabla de errores de importación
-CREATE TABLE IF NOT EXISTS data_errors (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    import_id INT,
-    sheet_name VARCHAR(255) NOT NULL,
-    row_num INT NOT NULL,
-    column_name VARCHAR(255),
-    error_type VARCHAR(100) NOT NULL,
-    error_message TEXT NOT NULL,
-    row_data JSON,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (import_id) REFERENCES data_imported(id) ON DELETE CASCADE,
-    INDEX idx_import_id (import_id),
-    INDEX idx_sheet_name (sheet_name),
-    INDEX idx_error_type (error_type)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- data_imported, data_errors y el resto de las tablas las crea la aplicación al
+-- arrancar (app/migrations.py) con las columnas de sus modelos
 
 -- Insertar datos de ejemplo
 INSERT INTO employees (nombre, edad, sexo, cargo, sueldo) VALUES